@@ -12,6 +12,7 @@ const CONJOINT_UPLOAD_LIMIT = typeof window !== 'undefined' && typeof window.MAX
 // Pyodide state
 let pyodide = null;
 let pyodideReady = false;
+let validationEngine = null; // Promise for the conjoint_validation module
 let pyodideLoading = false;
 
 // Application state
@@ -28,6 +29,9 @@ let noneAlternative = null;
 let competitorAlternatives = [];
 let estimationResult = null;
 let segmentationResult = null;
+let loadedModelArtifact = false; // Study reopened from a saved model (.npz), without data rows
+let studyColumnCounts = {}; // {attr: {values, counts}} from the saved model, in place of the rows
+let studyCompetitorProfiles = {}; // {alt_id: {attr: value}} from the saved model
 let modifiedDate = new Date().toLocaleDateString();
 
 // Track current scenario
@@ -74,8 +78,14 @@ import numpy as np
 import pandas as pd
 from scipy.optimize import minimize
 from collections import defaultdict
+from contextlib import contextmanager, nullcontext
 import json
+import os
+import platform
+import struct
+import sys
 import time
+import zipfile
 
 def safe_float(val):
     """Convert value to JSON-safe float."""
@@ -180,6 +190,7 @@ def estimate_respondent_mnl(X, y, resp_data, reg_strength=1.0, max_iter=100):
     )
     
     method_used = 'BFGS'
+    n_evaluations = int(result.nfev)
     if not result.success:
         result = minimize(
             conditional_logit_ll,
@@ -189,6 +200,7 @@ def estimate_respondent_mnl(X, y, resp_data, reg_strength=1.0, max_iter=100):
             options={'maxiter': max_iter, 'disp': False}
         )
         method_used = 'Nelder-Mead'
+        n_evaluations += int(result.nfev)
     
     coefficients = result.x
     ll = -result.fun
@@ -205,7 +217,8 @@ def estimate_respondent_mnl(X, y, resp_data, reg_strength=1.0, max_iter=100):
     convergence = {
         'converged': bool(result.success),
         'method': method_used,
-        'iterations': int(result.nit) if hasattr(result, 'nit') else None
+        'iterations': int(result.nit) if hasattr(result, 'nit') else None,
+        'function_evaluations': n_evaluations
     }
     
     return coefficients, pseudo_r2, ll, ll_null, convergence
@@ -235,47 +248,209 @@ def compute_attribute_importance(coefficients, feature_names, attribute_metadata
     
     return importance
 
-def run_conjoint_estimation(data_json, attribute_metadata_json, none_alt_id, competitor_alt_ids_json, reg_strength):
-    """Main estimation function called from JavaScript."""
-    start_time = time.time()
+def dirichlet_weights(n_bootstrap, n_respondents, rng):
+    """Bayesian-bootstrap weight matrix: each row is a flat Dirichlet draw over respondents."""
+    W = rng.standard_gamma(1.0, size=(n_bootstrap, n_respondents))
+    W /= W.sum(axis=1, keepdims=True)
+    return W
+
+def bootstrap_mean_intervals(W, values, level=0.95):
+    """Intervals for column means of an (n_respondents x m) matrix under weights W.
+
+    Missing entries (NaN) are dropped per replicate by renormalizing the
+    weights over the respondents that have a value, so the whole bootstrap is
+    two matrix products. Returns (mean, lower, upper) arrays of length m.
+    """
+    V = np.asarray(values, dtype=float)
+    if V.ndim == 1:
+        V = V[:, None]
+    present = ~np.isnan(V)
+    V0 = np.where(present, V, 0.0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        replicates = (W @ V0) / (W @ present)
+        mean = V0.sum(axis=0) / present.sum(axis=0)
+    
+    alpha = (1.0 - level) / 2.0
+    lower, upper = np.nanquantile(replicates, [alpha, 1.0 - alpha], axis=0)
+    return mean, lower, upper
+
+def _interval_records(names, mean, lower, upper):
+    return {
+        name: {"mean": safe_float(mean[j]), "lower": safe_float(lower[j]), "upper": safe_float(upper[j])}
+        for j, name in enumerate(names)
+    }
+
+def bootstrap_importance_intervals(respondents_results, n_bootstrap=1000, level=0.95, seed=None):
+    """Bayesian-bootstrap intervals for mean attribute importance across respondents."""
+    attrs = []
+    for resp in respondents_results:
+        for attr in resp['attribute_importance'].keys():
+            if attr not in attrs:
+                attrs.append(attr)
+    if not respondents_results or not attrs:
+        return {}
+    
+    V = np.full((len(respondents_results), len(attrs)), np.nan)
+    for i, resp in enumerate(respondents_results):
+        for j, attr in enumerate(attrs):
+            val = resp['attribute_importance'].get(attr)
+            if val is not None:
+                V[i, j] = val
+    
+    W = dirichlet_weights(n_bootstrap, V.shape[0], np.random.default_rng(seed))
+    return _interval_records(attrs, *bootstrap_mean_intervals(W, V, level))
+
+def bootstrap_intervals_json(payload_json):
+    """Bootstrap intervals for simulator outputs, called from JavaScript.
+
+    payload holds named (n_respondents x m) matrices under "matrices" (null
+    marks a missing value), plus optional n_bootstrap, level and seed. Every
+    matrix is resampled with the same Dirichlet weights, so the intervals
+    describe one consistent set of bootstrap populations.
+    """
+    payload = json.loads(payload_json)
+    matrices = payload.get('matrices', {})
+    n_bootstrap = int(payload.get('n_bootstrap', 1000))
+    level = float(payload.get('level', 0.95))
+    
+    n_resp = max((len(rows) for rows in matrices.values()), default=0)
+    if n_resp == 0:
+        return json.dumps({"success": True, "intervals": {}})
+    W = dirichlet_weights(n_bootstrap, n_resp, np.random.default_rng(payload.get('seed')))
+    
+    intervals = {}
+    for name, rows in matrices.items():
+        V = np.array([[np.nan if v is None else v for v in row] for row in rows], dtype=float)
+        mean, lower, upper = bootstrap_mean_intervals(W, V, level)
+        intervals[name] = [
+            {"mean": safe_float(mean[j]), "lower": safe_float(lower[j]), "upper": safe_float(upper[j])}
+            for j in range(len(mean))
+        ]
+    
+    return json.dumps({"success": True, "level": level, "n_bootstrap": n_bootstrap, "intervals": intervals})
+
+class EstimationTrace:
+    """Opt-in instrumentation for one estimation run: phase timings and spans.
     
-    data_raw = json.loads(data_json)
-    attribute_metadata = json.loads(attribute_metadata_json)
-    competitor_alt_ids = json.loads(competitor_alt_ids_json)
+    span_callback, if given, receives one JSON string per finished span
+    ({"phase", "respondent_id", "duration_ms"}), so the page can show progress.
+    """
     
-    data = pd.DataFrame(data_raw)
-    respondent_ids = data['respondent_id'].unique()
+    def __init__(self, span_callback=None):
+        self.phases = defaultdict(float)
+        self.respondent_seconds = defaultdict(float)
+        self.span_callback = span_callback
+    
+    def __bool__(self):
+        return True
+    
+    @contextmanager
+    def span(self, phase, respondent_id=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.phases[phase] += duration
+            if respondent_id is not None:
+                self.respondent_seconds[respondent_id] += duration
+            if self.span_callback is not None:
+                self.span_callback(json.dumps({
+                    "phase": phase,
+                    "respondent_id": respondent_id,
+                    "duration_ms": 1000 * duration
+                }))
+
+class _NoTrace:
+    """Stand-in when instrumentation is off: every span is the same no-op context."""
+    _span = nullcontext()
+    
+    def __bool__(self):
+        return False
+    
+    def span(self, phase, respondent_id=None):
+        return self._span
+
+NO_TRACE = _NoTrace()
+
+def optimizer_statistics(respondents_results, failed_respondents):
+    """Iteration, function-evaluation and fallback counts over all fitted respondents."""
+    convergence = [r['convergence'] for r in respondents_results]
+    iterations = [c['iterations'] for c in convergence if c.get('iterations') is not None]
+    evaluations = [c['function_evaluations'] for c in convergence if c.get('function_evaluations') is not None]
+    return {
+        "respondents": len(convergence),
+        "failed_respondents": len(failed_respondents),
+        "not_converged": sum(1 for c in convergence if not c['converged']),
+        "nelder_mead_fallbacks": sum(1 for c in convergence if c['method'] == 'Nelder-Mead'),
+        "iterations_total": int(sum(iterations)),
+        "iterations_mean": safe_float(np.mean(iterations)) if iterations else None,
+        "iterations_max": int(max(iterations)) if iterations else None,
+        "function_evaluations_total": int(sum(evaluations)),
+        "function_evaluations_mean": safe_float(np.mean(evaluations)) if evaluations else None,
+        "function_evaluations_max": int(max(evaluations)) if evaluations else None
+    }
+
+def profile_records(profiler, top=25):
+    """The top functions of a cProfile run by cumulative time, as JSON-friendly records."""
+    import pstats
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{func[2]} ({os.path.basename(func[0])}:{func[1]})",
+            "calls": int(nc),
+            "primitive_calls": int(cc),
+            "total_seconds": safe_float(tt),
+            "cumulative_seconds": safe_float(ct)
+        }
+        for func, (cc, nc, tt, ct, _) in rows
+    ]
+
+def fit_respondent(resp_id, X, y, feature_names, resp_data, attribute_metadata, reg_strength):
+    """Fit one respondent's design matrix; returns the per-respondent result record."""
+    coefficients, pseudo_r2, ll, ll_null, convergence = estimate_respondent_mnl(
+        X, y, resp_data, reg_strength=reg_strength
+    )
+    
+    coef_dict = {fn: safe_float(coefficients[i]) for i, fn in enumerate(feature_names)}
+    importance = compute_attribute_importance(coefficients, feature_names, attribute_metadata)
+    n_tasks = resp_data['task_id'].nunique()
+    
+    return {
+        "respondent_id": str(resp_id),
+        "coefficients": coef_dict,
+        "attribute_importance": {k: safe_float(v) for k, v in importance.items()},
+        "fit": {
+            "log_likelihood": safe_float(ll),
+            "null_log_likelihood": safe_float(ll_null),
+            "pseudo_r2": safe_float(pseudo_r2),
+            "n_tasks": int(n_tasks),
+            "n_observations": int(len(y))
+        },
+        "convergence": convergence
+    }
+
+def estimate_respondents(data, attribute_metadata, none_alt_id, competitor_alt_ids, reg_strength, trace=NO_TRACE,
+                         respondent_ids=None):
+    """Fit every respondent in data (or only respondent_ids); returns (respondents_results, failed_respondents)."""
+    if respondent_ids is None:
+        respondent_ids = data['respondent_id'].unique()
     
     respondents_results = []
     failed_respondents = []
     
-    for i, resp_id in enumerate(respondent_ids):
+    for resp_id in respondent_ids:
         try:
-            X, y, feature_names, resp_data = build_design_matrix(
-                data, attribute_metadata, resp_id, none_alt_id, competitor_alt_ids
-            )
-            
-            coefficients, pseudo_r2, ll, ll_null, convergence = estimate_respondent_mnl(
-                X, y, resp_data, reg_strength=reg_strength
-            )
-            
-            coef_dict = {fn: safe_float(coefficients[i]) for i, fn in enumerate(feature_names)}
-            importance = compute_attribute_importance(coefficients, feature_names, attribute_metadata)
-            n_tasks = resp_data['task_id'].nunique()
-            
-            respondents_results.append({
-                "respondent_id": str(resp_id),
-                "coefficients": coef_dict,
-                "attribute_importance": {k: safe_float(v) for k, v in importance.items()},
-                "fit": {
-                    "log_likelihood": safe_float(ll),
-                    "null_log_likelihood": safe_float(ll_null),
-                    "pseudo_r2": safe_float(pseudo_r2),
-                    "n_tasks": int(n_tasks),
-                    "n_observations": int(len(y))
-                },
-                "convergence": convergence
-            })
+            with trace.span('design', str(resp_id)):
+                X, y, feature_names, resp_data = build_design_matrix(
+                    data, attribute_metadata, resp_id, none_alt_id, competitor_alt_ids
+                )
+            with trace.span('fit', str(resp_id)):
+                respondents_results.append(
+                    fit_respondent(resp_id, X, y, feature_names, resp_data, attribute_metadata, reg_strength)
+                )
         
         except Exception as e:
             failed_respondents.append({
@@ -284,16 +459,14 @@ def run_conjoint_estimation(data_json, attribute_metadata_json, none_alt_id, com
             })
             continue
     
-    # Compute aggregates
+    return respondents_results, failed_respondents
+
+def _mean_summaries(respondents_results):
+    """Mean attribute importance and per-level utility statistics across respondents."""
     all_importances = defaultdict(list)
     all_utilities = defaultdict(lambda: defaultdict(list))
-    all_pseudo_r2 = []
-    all_tasks = []
     
     for resp in respondents_results:
-        all_pseudo_r2.append(resp['fit']['pseudo_r2'])
-        all_tasks.append(resp['fit']['n_tasks'])
-        
         for attr, imp in resp['attribute_importance'].items():
             all_importances[attr].append(imp)
         
@@ -322,6 +495,20 @@ def run_conjoint_estimation(data_json, attribute_metadata_json, none_alt_id, com
                 "max": safe_float(np.max(vals))
             }
     
+    return mean_attribute_importance, mean_utilities
+
+def summarize_estimation(respondents_results, failed_respondents, start_time, n_bootstrap=1000, trace=NO_TRACE):
+    """Aggregate per-respondent fits into the result structure returned to JavaScript."""
+    with trace.span('aggregate'):
+        mean_attribute_importance, mean_utilities = _mean_summaries(respondents_results)
+    
+    with trace.span('bootstrap'):
+        importance_intervals = (
+            bootstrap_importance_intervals(respondents_results, n_bootstrap) if n_bootstrap else {}
+        )
+    
+    all_pseudo_r2 = [resp['fit']['pseudo_r2'] for resp in respondents_results]
+    all_tasks = [resp['fit']['n_tasks'] for resp in respondents_results]
     estimation_time = time.time() - start_time
     
     result = {
@@ -330,6 +517,7 @@ def run_conjoint_estimation(data_json, attribute_metadata_json, none_alt_id, com
         "failed_respondents": failed_respondents,
         "aggregate_summaries": {
             "mean_attribute_importance": mean_attribute_importance,
+            "importance_intervals": importance_intervals,
             "mean_utilities": mean_utilities
         },
         "mean_pseudo_r2": safe_float(np.mean(all_pseudo_r2)) if all_pseudo_r2 else 0,
@@ -337,7 +525,767 @@ def run_conjoint_estimation(data_json, attribute_metadata_json, none_alt_id, com
         "estimation_time_seconds": safe_float(estimation_time)
     }
     
-    return json.dumps(result)
+    return result
+
+def run_conjoint_estimation(data_json, attribute_metadata_json, none_alt_id, competitor_alt_ids_json, reg_strength,
+                            n_bootstrap=1000, options_json='{}', span_callback=None):
+    """Main estimation function called from JavaScript.
+    
+    options_json may set "instrument" (add an "instrumentation" block with
+    per-phase seconds, optimizer statistics and the slowest respondents),
+    "profile" (also a cProfile summary of the top "profile_top" functions).
+    Passing span_callback turns instrumentation on and reports every span as
+    it finishes. With none of these the run is not instrumented.
+    """
+    start_time = time.time()
+    options = json.loads(options_json)
+    profile = bool(options.get('profile'))
+    trace = EstimationTrace(span_callback) if (options.get('instrument') or profile or span_callback) else NO_TRACE
+    
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    with trace.span('ingest'):
+        data_raw = json.loads(data_json)
+        attribute_metadata = json.loads(attribute_metadata_json)
+        competitor_alt_ids = json.loads(competitor_alt_ids_json)
+        
+        data = pd.DataFrame(data_raw)
+    respondents_results, failed_respondents = estimate_respondents(
+        data, attribute_metadata, none_alt_id, competitor_alt_ids, reg_strength, trace
+    )
+    result = summarize_estimation(respondents_results, failed_respondents, start_time, n_bootstrap, trace)
+    
+    with trace.span('serialize'):
+        result_json = json.dumps(result)
+    if profiler is not None:
+        profiler.disable()
+    if not trace:
+        return result_json
+    
+    slowest = sorted(trace.respondent_seconds.items(), key=lambda item: item[1], reverse=True)[:5]
+    instrumentation = {
+        "phases": {phase: safe_float(seconds) for phase, seconds in trace.phases.items()},
+        "optimizer": optimizer_statistics(respondents_results, failed_respondents),
+        "slowest_respondents": [{"respondent_id": r, "seconds": safe_float(sec)} for r, sec in slowest]
+    }
+    if profiler is not None:
+        instrumentation["profile"] = profile_records(profiler, int(options.get('profile_top', 25)))
+    # The result is already encoded (and timed); append the block instead of encoding twice
+    return result_json[:-1] + ', "instrumentation": ' + json.dumps(instrumentation) + '}'
+
+BENCHMARK_PHASES = ['ingest', 'design', 'fit', 'aggregate', 'bootstrap', 'serialize']
+
+def benchmark_estimation_json(data_json, attribute_metadata_json, none_alt_id, competitor_alt_ids_json,
+                              reg_strength=1.0, n_bootstrap=1000, repeat=1):
+    """Engine-only timing of run_conjoint_estimation, the same in CPython and Pyodide.
+    
+    Runs the estimation repeat times with instrumentation and keeps the
+    fastest time of each phase. The page's benchmarkConjointEngine and
+    scenarios/benchmark_engine.py --engine-only both call this, so browser
+    and local numbers for one CSV come from the same code.
+    """
+    runs = []
+    for _ in range(max(int(repeat), 1)):
+        result = json.loads(run_conjoint_estimation(
+            data_json, attribute_metadata_json, none_alt_id, competitor_alt_ids_json, reg_strength,
+            n_bootstrap, '{"instrument": true}'
+        ))
+        runs.append(result['instrumentation'])
+    
+    phases = {phase: safe_float(min(run['phases'].get(phase, 0.0) for run in runs)) for phase in BENCHMARK_PHASES}
+    optimizer = runs[0]['optimizer']
+    n_respondents = optimizer['respondents'] + optimizer['failed_respondents']
+    return json.dumps({
+        "runtime": {
+            "implementation": platform.python_implementation(),
+            "python": platform.python_version(),
+            "platform": sys.platform,
+            "numpy": np.__version__,
+            "pandas": pd.__version__
+        },
+        "respondents": n_respondents,
+        "repeat": len(runs),
+        "phases": phases,
+        "per_respondent_ms": {
+            phase: safe_float(1000 * phases[phase] / n_respondents) if n_respondents else None
+            for phase in ('design', 'fit')
+        },
+        "optimizer": optimizer
+    })
+
+SEGMENTATION_MINIBATCH_THRESHOLD = 20000
+
+def build_coefficient_matrix(coefficient_dicts, exclude_asc=True):
+    """Stack respondent coefficient dicts into an (n_respondents x n_features) matrix.
+
+    Respondents whose design lacked a level get 0.0 (the baseline) for it, so
+    every row lines up on the union of feature names.
+    """
+    feature_names = []
+    seen = set()
+    for coefs in coefficient_dicts:
+        for name in coefs.keys():
+            if name in seen or (exclude_asc and name.startswith('ASC_')):
+                continue
+            seen.add(name)
+            feature_names.append(name)
+    
+    column = {name: j for j, name in enumerate(feature_names)}
+    M = np.zeros((len(coefficient_dicts), len(feature_names)))
+    for i, coefs in enumerate(coefficient_dicts):
+        for name, val in coefs.items():
+            j = column.get(name)
+            if j is not None and val is not None:
+                M[i, j] = val
+    
+    return M, feature_names
+
+def standardize_columns(M):
+    """Z-score each column (population std); constant columns are only centered."""
+    means = M.mean(axis=0)
+    stds = M.std(axis=0)
+    stds[stds == 0] = 1.0
+    return (M - means) / stds
+
+def squared_distances(X, C, x_sq=None):
+    """Squared Euclidean distances from rows of X to rows of C via one matrix product."""
+    if x_sq is None:
+        x_sq = np.einsum('ij,ij->i', X, X)
+    c_sq = np.einsum('ij,ij->i', C, C)
+    d = x_sq[:, None] - 2.0 * (X @ C.T) + c_sq[None, :]
+    np.maximum(d, 0.0, out=d)
+    return d
+
+def kmeans_plus_plus(X, k, rng, x_sq=None):
+    """Pick k seed rows by k-means++ (D-squared weighting).
+
+    Seeding is sequential, so the first j seeds of a k_max run are a valid
+    k-means++ seeding for every j <= k_max. Returns the seed indices and the
+    (n x k) matrix of squared distances to each seed.
+    """
+    n = X.shape[0]
+    if x_sq is None:
+        x_sq = np.einsum('ij,ij->i', X, X)
+    
+    seeds = np.empty(k, dtype=int)
+    seed_dist = np.empty((n, k))
+    seeds[0] = rng.integers(n)
+    seed_dist[:, 0] = squared_distances(X, X[seeds[:1]], x_sq)[:, 0]
+    closest = seed_dist[:, 0].copy()
+    
+    for j in range(1, k):
+        total = closest.sum()
+        if total > 0:
+            seeds[j] = min(np.searchsorted(np.cumsum(closest), rng.random() * total, side='right'), n - 1)
+        else:
+            seeds[j] = rng.integers(n)
+        seed_dist[:, j] = squared_distances(X, X[seeds[j:j + 1]], x_sq)[:, 0]
+        np.minimum(closest, seed_dist[:, j], out=closest)
+    
+    return seeds, seed_dist
+
+def _cluster_means(X, labels, centroids):
+    """Recompute centroids as cluster means; empty clusters keep their old centroid."""
+    k = centroids.shape[0]
+    counts = np.bincount(labels, minlength=k)
+    one_hot = np.zeros((X.shape[0], k))
+    one_hot[np.arange(X.shape[0]), labels] = 1.0
+    sums = one_hot.T @ X
+    nonempty = counts > 0
+    new_centroids = centroids.copy()
+    new_centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return new_centroids, counts
+
+def kmeans_lloyd(X, centroids, x_sq, labels=None, max_iter=100, tol=1e-6):
+    """Lloyd iterations from the given centroids; returns labels, centroids, WCSS, iterations."""
+    centroids = centroids.copy()
+    n_iter = 0
+    for n_iter in range(1, max_iter + 1):
+        d = squared_distances(X, centroids, x_sq)
+        new_labels = d.argmin(axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        new_centroids, counts = _cluster_means(X, labels, centroids)
+        
+        # Re-seed an empty cluster at the point currently worst served
+        for c in np.where(counts == 0)[0]:
+            far = int(d[np.arange(X.shape[0]), labels].argmax())
+            new_centroids[c] = X[far]
+            labels[far] = c
+            d[far, :] = 0.0
+        
+        shift = np.sum((new_centroids - centroids) ** 2)
+        centroids = new_centroids
+        if shift <= tol:
+            break
+    
+    d = squared_distances(X, centroids, x_sq)
+    labels = d.argmin(axis=1)
+    wcss = float(d[np.arange(X.shape[0]), labels].sum())
+    return labels, centroids, wcss, n_iter
+
+def kmeans_minibatch(X, centroids, x_sq, rng, batch_size=1024, max_iter=100, tol=1e-6):
+    """Mini-batch k-means (Sculley 2010) with per-centroid learning rates."""
+    n = X.shape[0]
+    k = centroids.shape[0]
+    centroids = centroids.copy()
+    seen = np.zeros(k)
+    batch_size = min(batch_size, n)
+    n_iter = 0
+    
+    for n_iter in range(1, max_iter + 1):
+        batch = rng.integers(0, n, size=batch_size)
+        Xb = X[batch]
+        labels = squared_distances(Xb, centroids, x_sq[batch]).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        one_hot = np.zeros((batch_size, k))
+        one_hot[np.arange(batch_size), labels] = 1.0
+        sums = one_hot.T @ Xb
+        
+        hit = counts > 0
+        seen[hit] += counts[hit]
+        eta = counts[hit] / seen[hit]
+        new_centroids = centroids.copy()
+        new_centroids[hit] += eta[:, None] * (sums[hit] / counts[hit, None] - centroids[hit])
+        
+        shift = np.sum((new_centroids - centroids) ** 2)
+        centroids = new_centroids
+        if shift <= tol:
+            break
+    
+    d = squared_distances(X, centroids, x_sq)
+    labels = d.argmin(axis=1)
+    wcss = float(d[np.arange(n), labels].sum())
+    return labels, centroids, wcss, n_iter
+
+def detect_elbow(k_values, wcss_values):
+    """Elbow = point farthest from the chord joining the first and last (normalized) WCSS points."""
+    k = np.asarray(k_values, dtype=float)
+    w = np.asarray(wcss_values, dtype=float)
+    if len(k) < 3:
+        return int(k_values[0])
+    
+    k_norm = (k - k.min()) / (k.max() - k.min())
+    w_range = w.max() - w.min()
+    w_norm = (w - w.min()) / (w_range if w_range > 0 else 1.0)
+    
+    x1, y1, x2, y2 = k_norm[0], w_norm[0], k_norm[-1], w_norm[-1]
+    dist = np.abs((y2 - y1) * k_norm - (x2 - x1) * w_norm + x2 * y1 - y2 * x1) / np.hypot(y2 - y1, x2 - x1)
+    return int(k_values[int(np.argmax(dist[1:-1])) + 1])
+
+def run_segmentation(coef_matrix, k_values=range(2, 9), n_init=3, method='auto',
+                     batch_size=1024, max_iter=100, seed=None, standardize=True):
+    """Fit k-means for every k in k_values in one call.
+
+    One k-means++ seeding pass to max(k) per restart serves every k (its seed
+    prefixes), and the seed-distance matrix from that pass provides each k's
+    initial assignment. method is 'full' (Lloyd), 'minibatch', or 'auto'
+    (mini-batch above SEGMENTATION_MINIBATCH_THRESHOLD respondents).
+    """
+    X = np.asarray(coef_matrix, dtype=float)
+    if standardize:
+        X = standardize_columns(X)
+    n = X.shape[0]
+    k_values = [int(k) for k in k_values if 1 <= int(k) <= n]
+    if not k_values:
+        raise ValueError(f"No valid k for {n} respondents")
+    if method == 'auto':
+        method = 'minibatch' if n >= SEGMENTATION_MINIBATCH_THRESHOLD else 'full'
+    
+    rng = np.random.default_rng(seed)
+    x_sq = np.einsum('ij,ij->i', X, X)
+    k_max = max(k_values)
+    best = {}
+    
+    for _ in range(max(1, n_init)):
+        seeds, seed_dist = kmeans_plus_plus(X, k_max, rng, x_sq)
+        for k in k_values:
+            init_centroids = X[seeds[:k]]
+            if method == 'minibatch':
+                fit = kmeans_minibatch(X, init_centroids, x_sq, rng, batch_size, max_iter)
+            else:
+                init_labels = seed_dist[:, :k].argmin(axis=1)
+                init_centroids, _ = _cluster_means(X, init_labels, init_centroids)
+                fit = kmeans_lloyd(X, init_centroids, x_sq, None, max_iter)
+            if k not in best or fit[2] < best[k][2]:
+                best[k] = fit
+    
+    wcss_values = [best[k][2] for k in k_values]
+    return {
+        "method": method,
+        "k_values": k_values,
+        "wcss_values": wcss_values,
+        "optimal_k": detect_elbow(k_values, wcss_values),
+        "labels": {k: best[k][0] for k in k_values},
+        "centroids": {k: best[k][1] for k in k_values},
+        "iterations": {k: best[k][3] for k in k_values}
+    }
+
+def run_segmentation_json(coefficients_json, options_json='{}'):
+    """Segmentation entry point called from JavaScript.
+
+    coefficients_json is a list of per-respondent coefficient dicts. options
+    may set k (fixed) or k_min/k_max (elbow search), n_init, method and seed.
+    """
+    start_time = time.time()
+    coefficient_dicts = json.loads(coefficients_json)
+    options = json.loads(options_json) if options_json else {}
+    
+    M, feature_names = build_coefficient_matrix(coefficient_dicts)
+    if options.get('k'):
+        k_values = [int(options['k'])]
+    else:
+        k_values = range(int(options.get('k_min', 2)), int(options.get('k_max', 8)) + 1)
+    
+    seg = run_segmentation(
+        M, k_values,
+        n_init=int(options.get('n_init', 3)),
+        method=options.get('method', 'auto'),
+        seed=options.get('seed')
+    )
+    chosen_k = int(options['k']) if options.get('k') else seg['optimal_k']
+    
+    return json.dumps({
+        "success": True,
+        "method": seg['method'],
+        "feature_names": feature_names,
+        "k_values": seg['k_values'],
+        "wcss_values": [safe_float(w) for w in seg['wcss_values']],
+        "optimal_k": seg['optimal_k'],
+        "k": chosen_k,
+        "assignments": seg['labels'][chosen_k].tolist(),
+        "segmentation_time_seconds": safe_float(time.time() - start_time)
+    })
+
+MODEL_ARTIFACT_FORMAT = 'conjoint-utilities'
+MODEL_ARTIFACT_VERSION = 1
+FIT_STAT_NAMES = ['log_likelihood', 'null_log_likelihood', 'pseudo_r2', 'n_tasks', 'n_observations']
+
+def save_model_artifact(path, result, attribute_metadata, none_alt_id=None, competitor_alt_ids=(), study=None):
+    """Write an estimation result to a versioned, uncompressed .npz model artifact.
+
+    Members are stored uncompressed so load_model_artifact can memory-map
+    them in place. Strings are fixed-width unicode arrays (no pickling).
+    study may carry the source data's level summary ("column_counts":
+    {attr: {"values", "counts"}}) and "competitor_profiles" ({alt_id:
+    {attr: value}}), so a reopened study can fill the simulator and
+    optimizer without the rows.
+    """
+    study = study or {}
+    respondents = result['respondents']
+    coefficients, feature_names = build_coefficient_matrix(
+        [r['coefficients'] for r in respondents], exclude_asc=False
+    )
+    attribute_names = [attr for attr in attribute_metadata.keys()]
+    
+    importance = np.full((len(respondents), len(attribute_names)), np.nan)
+    fit_stats = np.full((len(respondents), len(FIT_STAT_NAMES)), np.nan)
+    for i, resp in enumerate(respondents):
+        for j, attr in enumerate(attribute_names):
+            val = resp['attribute_importance'].get(attr)
+            if val is not None:
+                importance[i, j] = val
+        for j, stat in enumerate(FIT_STAT_NAMES):
+            val = resp['fit'].get(stat)
+            if val is not None:
+                fit_stats[i, j] = val
+    
+    meta = {
+        "format": MODEL_ARTIFACT_FORMAT,
+        "version": MODEL_ARTIFACT_VERSION,
+        "attribute_metadata": attribute_metadata,
+        "none_alternative_id": none_alt_id,
+        "competitor_alternative_ids": list(competitor_alt_ids),
+        "aggregate_summaries": result.get('aggregate_summaries', {}),
+        "failed_respondents": result.get('failed_respondents', []),
+        "mean_pseudo_r2": result.get('mean_pseudo_r2'),
+        "mean_tasks_per_respondent": result.get('mean_tasks_per_respondent'),
+        "estimation_time_seconds": result.get('estimation_time_seconds'),
+        "column_counts": study.get('column_counts', {}),
+        "competitor_profiles": study.get('competitor_profiles', {})
+    }
+    
+    np.savez(
+        path,
+        meta_json=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+        respondent_ids=np.array([str(r['respondent_id']) for r in respondents], dtype=str),
+        feature_names=np.array(feature_names, dtype=str),
+        coefficients=coefficients,
+        attribute_names=np.array(attribute_names, dtype=str),
+        importance=importance,
+        fit_stat_names=np.array(FIT_STAT_NAMES, dtype=str),
+        fit_stats=fit_stats
+    )
+
+def _memmap_npz_member(path, info):
+    """Memory-map one stored (uncompressed) .npy member of a zip archive in place."""
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        local_header = f.read(30)
+        name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    
+    if dtype.hasobject or int(np.prod(shape)) == 0:
+        return None
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+def _load_npz_members(path, mmap=True):
+    """Read every member of an .npz, memory-mapping the stored ones when mmap is set."""
+    members = {}
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            array = None
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                try:
+                    array = _memmap_npz_member(path, info)
+                except (OSError, ValueError):
+                    array = None
+            if array is None:
+                with zf.open(info) as member:
+                    array = np.lib.format.read_array(member, allow_pickle=False)
+            members[name] = array
+    return members
+
+def load_model_artifact(path, mmap=True):
+    """Open a model artifact written by save_model_artifact.
+
+    With mmap=True the arrays are read-only memory maps into the file, so
+    reopening a study costs I/O only. Members that cannot be mapped (or
+    platforms without mmap) fall back to a normal read.
+    """
+    model = _load_npz_members(path, mmap)
+    
+    meta = json.loads(bytes(model.pop('meta_json')).decode('utf-8'))
+    if meta.get('format') != MODEL_ARTIFACT_FORMAT:
+        raise ValueError(f"Not a conjoint model artifact: {path}")
+    if meta.get('version', 0) > MODEL_ARTIFACT_VERSION:
+        raise ValueError(
+            f"Model artifact version {meta.get('version')} is newer than supported ({MODEL_ARTIFACT_VERSION})"
+        )
+    model['meta'] = meta
+    model['feature_index'] = {str(name): j for j, name in enumerate(model['feature_names'])}
+    return model
+
+def model_artifact_to_result(model):
+    """Rebuild the run_conjoint_estimation result structure from a loaded artifact."""
+    meta = model['meta']
+    feature_names = [str(n) for n in model['feature_names']]
+    attribute_names = [str(n) for n in model['attribute_names']]
+    stat_names = [str(n) for n in model['fit_stat_names']]
+    
+    respondents = []
+    for i, resp_id in enumerate(model['respondent_ids']):
+        fit = {stat: safe_float(model['fit_stats'][i, j]) for j, stat in enumerate(stat_names)}
+        for stat in ('n_tasks', 'n_observations'):
+            if fit.get(stat) is not None:
+                fit[stat] = int(fit[stat])
+        respondents.append({
+            "respondent_id": str(resp_id),
+            "coefficients": {fn: safe_float(model['coefficients'][i, j]) for j, fn in enumerate(feature_names)},
+            "attribute_importance": {
+                attr: safe_float(model['importance'][i, j]) for j, attr in enumerate(attribute_names)
+            },
+            "fit": fit
+        })
+    
+    return {
+        "success": True,
+        "respondents": respondents,
+        "failed_respondents": meta.get('failed_respondents', []),
+        "aggregate_summaries": meta.get('aggregate_summaries', {}),
+        "mean_pseudo_r2": meta.get('mean_pseudo_r2'),
+        "mean_tasks_per_respondent": meta.get('mean_tasks_per_respondent'),
+        "estimation_time_seconds": meta.get('estimation_time_seconds')
+    }
+
+def product_design_matrix(model, products):
+    """Encode product dicts as rows over the artifact's feature index.
+
+    Each product has "attributes" ({attr: level}) and optionally
+    "is_none": True or "competitor_id" to switch on the matching ASC.
+    """
+    feature_index = model['feature_index']
+    attribute_metadata = model['meta']['attribute_metadata']
+    X = np.zeros((len(products), len(feature_index)))
+    
+    for p, product in enumerate(products):
+        if product.get('is_none'):
+            j = feature_index.get('ASC_None')
+            if j is not None:
+                X[p, j] = 1.0
+            continue
+        if product.get('competitor_id') is not None:
+            j = feature_index.get(f"ASC_Competitor_{product['competitor_id']}")
+            if j is not None:
+                X[p, j] = 1.0
+        
+        for attr, value in product.get('attributes', {}).items():
+            attr_type = attribute_metadata.get(attr, {}).get('type')
+            if attr_type is None or value is None or value == '':
+                continue
+            if attr_type == 'categorical':
+                j = feature_index.get(f"{attr}_{value}")
+                if j is not None:
+                    X[p, j] = 1.0
+                continue
+            num = float(value)
+            if attr in feature_index:
+                X[p, feature_index[attr]] = num
+            if attr_type == 'numeric_quadratic' and f"{attr}_sq" in feature_index:
+                X[p, feature_index[f"{attr}_sq"]] = num ** 2
+    
+    return X
+
+def simulate_shares(model, products):
+    """Logit shares of preference for a product set, straight from the artifact.
+
+    Returns (mean shares, per-respondent probability matrix).
+    """
+    U = np.asarray(model['coefficients']) @ product_design_matrix(model, products).T
+    U -= U.max(axis=1, keepdims=True)
+    probs = np.exp(U)
+    probs /= probs.sum(axis=1, keepdims=True)
+    return probs.mean(axis=0), probs
+
+def optimize_product(model, attribute_levels, fixed_attributes=None, competitors=(),
+                     metric='share', unit_cost=0.0, price_attribute='price',
+                     top_n=10, chunk_cells=4000000):
+    """Brute-force product search against the artifact's coefficient matrix.
+
+    Each candidate configuration competes against the fixed competitor set
+    (None / competitor products). Candidate rows are built by summing
+    per-attribute level encodings, and utilities are evaluated in chunks of
+    at most chunk_cells respondent x candidate cells.
+    """
+    B = np.asarray(model['coefficients'])
+    fixed_attributes = fixed_attributes or {}
+    attrs = list(attribute_levels.keys())
+    
+    base = product_design_matrix(model, [{"attributes": fixed_attributes}])[0]
+    level_rows = [
+        product_design_matrix(model, [{"attributes": {attr: lvl}} for lvl in attribute_levels[attr]])
+        for attr in attrs
+    ]
+    grid = np.indices([len(attribute_levels[a]) for a in attrs]).reshape(len(attrs), -1).T
+    X = np.tile(base, (grid.shape[0], 1))
+    for a, rows in enumerate(level_rows):
+        X += rows[grid[:, a]]
+    
+    # log-sum-exp of the competitor utilities, per respondent
+    if competitors:
+        Uk = B @ product_design_matrix(model, list(competitors)).T
+        k_max = Uk.max(axis=1)
+        log_denom = k_max + np.log(np.exp(Uk - k_max[:, None]).sum(axis=1))
+    else:
+        log_denom = np.full(B.shape[0], -np.inf)
+    
+    shares = np.empty(grid.shape[0])
+    chunk = max(1, chunk_cells // max(1, B.shape[0]))
+    for start in range(0, grid.shape[0], chunk):
+        Uc = B @ X[start:start + chunk].T
+        shares[start:start + chunk] = (1.0 / (1.0 + np.exp(log_denom[:, None] - Uc))).mean(axis=0) * 100
+    
+    prices = np.zeros(grid.shape[0])
+    if price_attribute in attribute_levels:
+        a = attrs.index(price_attribute)
+        prices = np.asarray(attribute_levels[price_attribute], dtype=float)[grid[:, a]]
+    elif price_attribute in fixed_attributes:
+        prices[:] = float(fixed_attributes[price_attribute])
+    profits = shares * (prices - unit_cost) if metric == 'profit' else np.zeros(grid.shape[0])
+    
+    order = np.argsort(-(profits if metric == 'profit' else shares), kind='stable')[:top_n]
+    return [
+        {
+            "config": dict(fixed_attributes, **{a: attribute_levels[a][grid[c, i]] for i, a in enumerate(attrs)}),
+            "share": safe_float(shares[c]),
+            "profit": safe_float(profits[c]),
+            "price": safe_float(prices[c])
+        }
+        for c in order
+    ]
+
+def export_model_artifact(result_json, attribute_metadata_json, none_alt_id, competitor_alt_ids_json,
+                          path='/tmp/conjoint_model.npz', study_json='{}'):
+    """Save the current estimation result from JavaScript; returns the artifact path."""
+    save_model_artifact(
+        path, json.loads(result_json), json.loads(attribute_metadata_json),
+        none_alt_id or None, json.loads(competitor_alt_ids_json), json.loads(study_json)
+    )
+    return path
+
+LOADED_MODEL = None
+
+def open_model_artifact(path):
+    """Make an uploaded artifact the page's current model; returns the study to restore, as JSON."""
+    global LOADED_MODEL
+    LOADED_MODEL = load_model_artifact(path)
+    meta = LOADED_MODEL['meta']
+    return json.dumps({
+        "result": model_artifact_to_result(LOADED_MODEL),
+        "attribute_metadata": meta['attribute_metadata'],
+        "none_alternative_id": meta.get('none_alternative_id'),
+        "competitor_alternative_ids": meta.get('competitor_alternative_ids', []),
+        "column_counts": meta.get('column_counts', {}),
+        "competitor_profiles": meta.get('competitor_profiles', {})
+    })
+
+def simulate_shares_json(products_json):
+    """simulate_shares on the opened artifact; returns mean shares and per-respondent probabilities."""
+    shares, probs = simulate_shares(LOADED_MODEL, json.loads(products_json))
+    return json.dumps({"shares": shares.tolist(), "respondent_probs": probs.tolist()})
+
+def optimize_product_json(payload_json):
+    """optimize_product on the opened artifact; the payload holds its keyword arguments."""
+    return json.dumps({"results": optimize_product(LOADED_MODEL, **json.loads(payload_json))})
+
+CBC_STORE_FORMAT = 'cbc-columnar'
+CBC_STORE_VERSION = 1
+
+def _format_store_float(value):
+    """Shortest text for a float, as it would appear in a CSV ('599', '6.5', '19.99')."""
+    return np.format_float_positional(value, trim='-')
+
+def _encode_store_column(values):
+    """Narrowest lossless coding for a column of CSV strings: int, float or dictionary codes.
+
+    Float columns may have empty cells (attributes of the None alternative),
+    stored as NaN. A pandas Categorical of strings is coded from its own
+    codes and categories, without factorizing every row.
+    """
+    if isinstance(values, pd.Categorical):
+        codes, levels = values.codes, values.categories.to_numpy()
+    else:
+        codes, levels = pd.factorize(values if values.dtype == object else values.astype(str), sort=True)
+    levels = np.asarray(levels, dtype=str)
+    missing = levels == ''
+    try:
+        numbers = np.where(missing, 'nan', levels).astype(np.float64)
+    except ValueError:
+        numbers = None
+    
+    if numbers is not None and np.all(np.isfinite(numbers[~missing])):
+        if (not missing.any() and np.all(numbers == np.round(numbers))
+                and np.all(np.abs(numbers) < 2 ** 31)):
+            as_int = numbers.astype(np.int64)
+            if all(str(n) == lvl for n, lvl in zip(as_int, levels)):
+                return 'int', as_int.astype(np.int32)[codes], None
+        if all(_format_store_float(n) == lvl for n, lvl in zip(numbers[~missing], levels[~missing])):
+            return 'float', numbers[codes], None
+    
+    # Anything that would not print back identically keeps its text in the dictionary
+    code_dtype = np.int16 if len(levels) < 2 ** 15 else np.int32
+    return 'dictionary', codes.astype(code_dtype), levels
+
+def save_cbc_store(path, data):
+    """Write long-format CBC data (DataFrame of CSV strings) as a columnar store.
+
+    Rows are regrouped by respondent in order of first appearance, and
+    respondent_offsets[r]:respondent_offsets[r + 1] are respondent r's rows.
+    A path ending in .npz gives one uncompressed archive; any other path is
+    a directory of .npy files plus meta.json. Both can be memory-mapped.
+    """
+    resp_codes, respondent_ids = pd.factorize(data['respondent_id'])
+    if np.any(resp_codes[1:] < resp_codes[:-1]):
+        data = data.iloc[np.argsort(resp_codes, kind='stable')]
+    counts = np.bincount(resp_codes, minlength=len(respondent_ids))
+    
+    arrays = {"respondent_offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)}
+    columns = []
+    for name in data.columns:
+        column = data[name]
+        kind, values, levels = _encode_store_column(
+            column.array if isinstance(column.dtype, pd.CategoricalDtype) else column.to_numpy()
+        )
+        arrays[f"col_{name}"] = values
+        if levels is not None:
+            arrays[f"dict_{name}"] = levels
+        columns.append({"name": name, "kind": kind})
+    
+    meta = {
+        "format": CBC_STORE_FORMAT,
+        "version": CBC_STORE_VERSION,
+        "n_rows": int(len(data)),
+        "n_respondents": int(len(respondent_ids)),
+        "columns": columns
+    }
+    
+    if str(path).endswith('.npz'):
+        np.savez(path, meta_json=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8), **arrays)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+def load_cbc_store(path, mmap=True):
+    """Open a store written by save_cbc_store; arrays are read-only memory maps when mmap is set."""
+    if os.path.isdir(path):
+        members = {
+            fname[:-4]: np.load(os.path.join(path, fname), mmap_mode='r' if mmap else None, allow_pickle=False)
+            for fname in os.listdir(path) if fname.endswith('.npy')
+        }
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    else:
+        members = _load_npz_members(path, mmap)
+        meta = json.loads(bytes(members.pop('meta_json')).decode('utf-8'))
+    
+    if meta.get('format') != CBC_STORE_FORMAT:
+        raise ValueError(f"Not a CBC columnar store: {path}")
+    if meta.get('version', 0) > CBC_STORE_VERSION:
+        raise ValueError(f"CBC store version {meta.get('version')} is newer than supported ({CBC_STORE_VERSION})")
+    
+    return {
+        "meta": meta,
+        "columns": {c['name']: members[f"col_{c['name']}"] for c in meta['columns']},
+        "dictionaries": {c['name']: members[f"dict_{c['name']}"] for c in meta['columns'] if c['kind'] == 'dictionary'},
+        "kinds": {c['name']: c['kind'] for c in meta['columns']},
+        "respondent_offsets": members['respondent_offsets']
+    }
+
+def cbc_store_column(store, name, rows=slice(None)):
+    """Decode rows of one store column back to the CSV strings."""
+    values = np.asarray(store['columns'][name][rows])
+    kind = store['kinds'][name]
+    if kind == 'dictionary':
+        return store['dictionaries'][name].astype(object)[values]
+    # Format each distinct number once, then gather
+    uniques, inverse = np.unique(values, return_inverse=True)
+    if kind == 'int':
+        text = uniques.astype(str).astype(object)
+    else:
+        text = np.array(['' if np.isnan(v) else _format_store_float(v) for v in uniques], dtype=object)
+    return text[inverse.reshape(-1)]
+
+def cbc_store_to_frame(store, columns=None, rows=slice(None)):
+    """DataFrame of CSV strings (as read with dtype=str) for the engine's estimation functions."""
+    names = columns or list(store['columns'].keys())
+    return pd.DataFrame({name: cbc_store_column(store, name, rows) for name in names})
+
+def run_conjoint_estimation_store(path, attribute_metadata_json, none_alt_id, competitor_alt_ids_json,
+                                  reg_strength, n_bootstrap=1000):
+    """run_conjoint_estimation for a columnar store instead of JSON rows."""
+    start_time = time.time()
+    attribute_metadata = json.loads(attribute_metadata_json)
+    data = cbc_store_to_frame(load_cbc_store(path))
+    respondents_results, failed_respondents = estimate_respondents(
+        data, attribute_metadata, none_alt_id, json.loads(competitor_alt_ids_json), reg_strength
+    )
+    return json.dumps(summarize_estimation(respondents_results, failed_respondents, start_time, n_bootstrap))
 `;
 
 
@@ -712,6 +1660,13 @@ function setupFileUpload() {
   const templateBtn = document.getElementById('conjoint-template-download');
   templateBtn?.addEventListener('click', downloadTemplate);
   
+  const modelInput = document.getElementById('conjoint-model-input');
+  document.getElementById('conjoint-open-model')?.addEventListener('click', () => modelInput?.click());
+  modelInput?.addEventListener('change', (e) => {
+    if (e.target.files.length > 0) openModelArtifact(e.target.files[0]);
+    e.target.value = '';
+  });
+  
   const demoSmallBtn = document.getElementById('conjoint-load-demo-small');
   demoSmallBtn?.addEventListener('click', () => loadDemoDataset('small'));
   
@@ -883,7 +1838,7 @@ function autoDetectColumns() {
 /**
  * Confirm column mapping and proceed to attribute configuration
  */
-function confirmMapping() {
+async function confirmMapping() {
   columnMapping.respondent = document.getElementById('conjoint-respondent-col').value;
   columnMapping.task = document.getElementById('conjoint-task-col').value;
   columnMapping.alternative = document.getElementById('conjoint-alternative-col').value;
@@ -904,7 +1859,7 @@ function confirmMapping() {
   attributeColumns = conjointDataset.headers.filter(h => !requiredCols.includes(h));
   
   // Validate data
-  const validation = validateConjointData();
+  const validation = await validateConjointData();
   if (!validation.valid) {
     alert(`Data validation failed:\n${validation.errors.join('\n')}`);
     return;
@@ -919,10 +1874,88 @@ function confirmMapping() {
   updateWorkflowStep(3);
 }
 
+/**
+ * Import the single-pass validator (conjoint_validation.py) into Pyodide once.
+ * Resolves to the module proxy, or null while Pyodide is not loaded; a failed
+ * load stays cached so each validation does not re-fetch the file.
+ */
+async function initValidationEngine() {
+  if (!pyodideReady) return null;
+  if (!validationEngine) {
+    validationEngine = (async () => {
+      const response = await fetch('conjoint_validation.py');
+      if (!response.ok) throw new Error(`Failed to fetch conjoint_validation.py (${response.status})`);
+      
+      // Import under its own name; running the file as __main__ would start its CLI
+      pyodide.FS.writeFile('/home/pyodide/conjoint_validation.py', await response.text());
+      const module = pyodide.pyimport('conjoint_validation');
+      
+      // Check the browser entry point on a one-task table before relying on it
+      const profileFn = module.profile_table_json;
+      try {
+        const check = JSON.parse(profileFn(
+          '["r","t","a","c"]',
+          '[["1","1","1","1"],["1","1","2","0"]]',
+          '{"respondent":"r","task":"t","alternative":"a","chosen":"c"}'
+        ));
+        if (!check.valid || check.profile.n_tasks !== 1) {
+          throw new Error('conjoint_validation.profile_table_json failed its load check');
+        }
+      } finally {
+        profileFn.destroy();
+      }
+      return module;
+    })();
+  }
+  return validationEngine;
+}
+
 /**
  * Validate conjoint data structure
+ * Uses the Python profiler (one pass: choices per task, grouping, level balance) when
+ * Pyodide is loaded, otherwise the basic JavaScript checks.
+ */
+async function validateConjointData() {
+  try {
+    const validator = await initValidationEngine();
+    if (validator) {
+      const { headers, rows } = conjointDataset;
+      
+      // The profiler streams rows task by task, so hand it rows grouped by respondent and task
+      const respIdx = headers.indexOf(columnMapping.respondent);
+      const taskIdx = headers.indexOf(columnMapping.task);
+      const compare = (x, y) => (x < y ? -1 : x > y ? 1 : 0);
+      const groupedRows = rows.slice().sort((a, b) =>
+        compare(a[respIdx], b[respIdx]) || compare(a[taskIdx], b[taskIdx])
+      );
+      
+      const profileFn = validator.profile_table_json;
+      const reportJson = profileFn(
+        JSON.stringify(headers),
+        JSON.stringify(groupedRows),
+        JSON.stringify({
+          respondent: columnMapping.respondent,
+          task: columnMapping.task,
+          alternative: columnMapping.alternative,
+          chosen: columnMapping.chosen
+        })
+      );
+      profileFn.destroy();
+      
+      const report = JSON.parse(reportJson);
+      report.warnings.forEach(w => console.warn(`Data check: ${w}`));
+      return { valid: report.valid, errors: report.errors, warnings: report.warnings, profile: report.profile };
+    }
+  } catch (error) {
+    console.warn('Python data validation failed, using JavaScript checks:', error);
+  }
+  return validateConjointDataJS();
+}
+
+/**
+ * Basic validation without Pyodide
  */
-function validateConjointData() {
+function validateConjointDataJS() {
   const errors = [];
   const { headers, rows } = conjointDataset;
   
@@ -931,11 +1964,9 @@ function validateConjointData() {
   const altIdx = headers.indexOf(columnMapping.alternative);
   const chosenIdx = headers.indexOf(columnMapping.chosen);
   
-  // Check chosen values are 0/1
-  const chosenValues = new Set(rows.map(r => r[chosenIdx]));
-  if (!chosenValues.has('0') && !chosenValues.has('1')) {
-    errors.push('Chosen column must contain 0 and 1 values.');
-  }
+  // Check chosen values are 0/1 in a form the engine parses (conjoint_validation.CHOSEN_PATTERN)
+  const chosenPattern = /^([01])(\.0*)?$/;
+  let invalidChosen = 0;
   
   // Check each task has exactly one chosen alternative
   const taskMap = {};
@@ -943,9 +1974,15 @@ function validateConjointData() {
     const key = `${row[respIdx]}_${row[taskIdx]}`;
     if (!taskMap[key]) taskMap[key] = { total: 0, chosen: 0 };
     taskMap[key].total++;
-    if (row[chosenIdx] === '1') taskMap[key].chosen++;
+    const match = String(row[chosenIdx] ?? '').trim().match(chosenPattern);
+    if (!match) invalidChosen++;
+    else if (match[1] === '1') taskMap[key].chosen++;
   });
   
+  if (invalidChosen > 0) {
+    errors.push(`${invalidChosen} rows have a chosen value other than 0/1.`);
+  }
+  
   const badTasks = Object.entries(taskMap).filter(([_, v]) => v.chosen !== 1);
   if (badTasks.length > 0) {
     errors.push(`${badTasks.length} tasks do not have exactly one chosen alternative.`);
@@ -1010,7 +2047,11 @@ function populateAttributeConfiguration() {
 function getColumnValues(columnName) {
   const { headers, rows } = conjointDataset;
   const idx = headers.indexOf(columnName);
-  if (idx === -1) return [];
+  if (idx === -1) {
+    // A study reopened from a saved model keeps per-level row counts instead of rows
+    const summary = loadedModelArtifact ? studyColumnCounts[columnName] : null;
+    return summary ? summary.values.flatMap((v, i) => Array(summary.counts[i]).fill(v)) : [];
+  }
   return rows.map(r => r[idx]);
 }
 
@@ -1130,19 +2171,41 @@ async function runEstimation() {
     const noneAltId = payload.none_alternative_id || '';
     const regStrength = payload.model_options?.reg_strength || 1.0;
     
+    // Optional instrumentation. Estimation runs synchronously on the main thread, so the
+    // page cannot repaint mid-run; fit spans are collected and summarized afterwards.
+    const profile = document.getElementById('conjoint-profile')?.checked || false;
+    const instrument = profile || document.getElementById('conjoint-instrument')?.checked || false;
+    const fitSpans = [];
+    pyodide.globals.set('conjoint_span_callback', instrument ? (spanJson) => {
+      const span = JSON.parse(spanJson);
+      if (span.phase === 'fit') fitSpans.push(span);
+    } : null);
+    
     // Call Python function
-    const resultJson = await pyodide.runPythonAsync(`
-      run_conjoint_estimation(
-        '''${dataJson.replace(/'/g, "\\'")}''',
-        '''${attrMetaJson.replace(/'/g, "\\'")}''',
-        '${noneAltId}' if '${noneAltId}' else None,
-        '''${competitorsJson.replace(/'/g, "\\'")}''',
-        ${regStrength}
-      )
-    `);
+    let resultJson;
+    try {
+      resultJson = await pyodide.runPythonAsync(`
+        run_conjoint_estimation(
+          '''${dataJson.replace(/'/g, "\\'")}''',
+          '''${attrMetaJson.replace(/'/g, "\\'")}''',
+          '${noneAltId}' if '${noneAltId}' else None,
+          '''${competitorsJson.replace(/'/g, "\\'")}''',
+          ${regStrength},
+          1000,
+          '${JSON.stringify({ instrument, profile })}',
+          conjoint_span_callback
+        )
+      `);
+    } finally {
+      pyodide.globals.delete('conjoint_span_callback');
+    }
     
     const result = JSON.parse(resultJson);
     const browserTime = (performance.now() - startTime) / 1000;
+    if (result.instrumentation) {
+      result.instrumentation.fit_spans = fitSpans;
+      console.table(result.instrumentation.phases);
+    }
     
     if (!result.success) {
       let errorMsg = result.detail || 'Estimation failed';
@@ -1160,6 +2223,7 @@ async function runEstimation() {
     
     estimationResult = result;
     hasSuccessfulRun = true;
+    loadedModelArtifact = false;
     
     // Hide loading modal
     loadingOverlay.setAttribute('aria-hidden', 'true');
@@ -1181,25 +2245,7 @@ async function runEstimation() {
       );
     }
     
-    // Display results
-    displayEstimationResults(result);
-    
-    // Show results sections
-    document.getElementById('conjoint-results-section').style.display = 'block';
-    document.getElementById('conjoint-test-results').style.display = 'block';
-    document.getElementById('conjoint-diagnostics').style.display = 'block';
-    document.getElementById('conjoint-segmentation').style.display = 'block';
-    document.getElementById('conjoint-simulation').style.display = 'block';
-    document.getElementById('conjoint-optimization').style.display = 'block';
-    
-    // Populate incremental costs UI now that we have estimation results
-    populateIncrementalCostsUI();
-    
-    // Populate optimization attribute checkboxes
-    populateOptimizationAttributes();
-    
-    // Update workflow stepper to step 4 (Analyze Results)
-    updateWorkflowStep(4);
+    showEstimationResults(result);
     
   } catch (error) {
     console.error('Estimation error:', error);
@@ -1213,9 +2259,65 @@ async function runEstimation() {
   }
 }
 
+/**
+ * Display an estimation result and open the results, simulation and optimization sections
+ */
+function showEstimationResults(result) {
+  // Display results
+  displayEstimationResults(result);
+  
+  // Show results sections
+  document.getElementById('conjoint-results-section').style.display = 'block';
+  document.getElementById('conjoint-test-results').style.display = 'block';
+  document.getElementById('conjoint-diagnostics').style.display = 'block';
+  document.getElementById('conjoint-segmentation').style.display = 'block';
+  document.getElementById('conjoint-simulation').style.display = 'block';
+  document.getElementById('conjoint-optimization').style.display = 'block';
+  
+  // Populate incremental costs UI now that we have estimation results
+  populateIncrementalCostsUI();
+  
+  // Populate optimization attribute checkboxes
+  populateOptimizationAttributes();
+  
+  // Update workflow stepper to step 4 (Analyze Results)
+  updateWorkflowStep(4);
+}
+
 /**
  * Build payload for estimation API
  */
+/**
+ * Engine-only timing in the browser, on the loaded dataset (run from the console).
+ * Calls the same benchmark_estimation_json as scenarios/benchmark_engine.py --engine-only,
+ * so the phase times can be compared with CPython on the same CSV.
+ */
+async function benchmarkConjointEngine(repeat = 1) {
+  if (!pyodideReady) {
+    await initPyodide();
+  }
+  const payload = buildEstimationPayload();
+  
+  const benchmarkFn = pyodide.globals.get('benchmark_estimation_json');
+  let timing;
+  try {
+    timing = JSON.parse(benchmarkFn(
+      JSON.stringify(payload.data),
+      JSON.stringify(payload.attribute_metadata),
+      payload.none_alternative_id || null,
+      JSON.stringify(payload.competitor_alternative_ids || []),
+      payload.model_options.reg_strength,
+      1000,
+      repeat
+    ));
+  } finally {
+    benchmarkFn.destroy();
+  }
+  
+  console.table(timing.phases);
+  return timing;
+}
+
 function buildEstimationPayload() {
   const { headers, rows } = conjointDataset;
   const respIdx = headers.indexOf(columnMapping.respondent);
@@ -1274,7 +2376,10 @@ function displayEstimationResults(result) {
   document.getElementById('conjoint-estimation-time').textContent = `${result.estimation_time_seconds?.toFixed(1) || '?'}s`;
   
   // Render charts
-  renderImportanceChart(result.aggregate_summaries.mean_attribute_importance);
+  renderImportanceChart(
+    result.aggregate_summaries.mean_attribute_importance,
+    result.aggregate_summaries.importance_intervals
+  );
   renderPartWorthChart(result.aggregate_summaries.mean_utilities);
   renderPriceDistributionChart(result);
   
@@ -1295,7 +2400,7 @@ function displayEstimationResults(result) {
 /**
  * Render attribute importance chart
  */
-function renderImportanceChart(importance) {
+function renderImportanceChart(importance, intervals = null) {
   const data = [{
     x: Object.values(importance),
     y: Object.keys(importance),
@@ -1304,6 +2409,18 @@ function renderImportanceChart(importance) {
     marker: { color: '#4A90E2' }
   }];
   
+  // 95% Bayesian-bootstrap interval as asymmetric error bars
+  if (intervals && Object.keys(intervals).length > 0) {
+    const attrs = Object.keys(importance);
+    data[0].error_x = {
+      type: 'data',
+      symmetric: false,
+      array: attrs.map(a => intervals[a] ? intervals[a].upper - importance[a] : 0),
+      arrayminus: attrs.map(a => intervals[a] ? importance[a] - intervals[a].lower : 0),
+      color: '#1F3B57'
+    };
+  }
+  
   const layout = {
     title: '',
     xaxis: { title: 'Importance (%)', range: [0, 100] },
@@ -1609,9 +2726,55 @@ function populateDiagnostics(result) {
   
   html += '</ul>';
   
+  if (result.instrumentation) {
+    html += renderEstimationTiming(result.instrumentation);
+  }
+  
   container.innerHTML = html;
 }
 
+/**
+ * Render the optional per-phase timing breakdown returned by run_conjoint_estimation
+ */
+function renderEstimationTiming(instrumentation) {
+  const phases = instrumentation.phases || {};
+  const total = Object.values(phases).reduce((sum, s) => sum + (s || 0), 0);
+  const opt = instrumentation.optimizer || {};
+  
+  let html = '<h4>Estimation Timing</h4><ul>';
+  Object.entries(phases).forEach(([phase, seconds]) => {
+    const share = total > 0 ? (seconds / total * 100).toFixed(1) : '0.0';
+    html += `<li><strong>${phase}:</strong> ${seconds.toFixed(3)}s (${share}%)</li>`;
+  });
+  html += `<li><strong>Optimizer:</strong> ${opt.iterations_total ?? '?'} iterations, ${opt.function_evaluations_total ?? '?'} function evaluations `;
+  html += `(mean ${opt.function_evaluations_mean?.toFixed(0) ?? '?'} per respondent); ${opt.nelder_mead_fallbacks ?? 0} Nelder-Mead fallbacks, ${opt.failed_respondents ?? 0} failed</li>`;
+  
+  const fitMs = (instrumentation.fit_spans || []).map(span => span.duration_ms).sort((a, b) => a - b);
+  if (fitMs.length > 0) {
+    const at = q => fitMs[Math.max(Math.ceil(q * fitMs.length) - 1, 0)];
+    html += `<li><strong>Fit time per respondent:</strong> median ${at(0.5).toFixed(0)} ms, 90th percentile ${at(0.9).toFixed(0)} ms, `;
+    html += `max ${fitMs[fitMs.length - 1].toFixed(0)} ms (${fitMs.length} respondents)</li>`;
+  }
+  
+  const slowest = instrumentation.slowest_respondents || [];
+  if (slowest.length > 0) {
+    html += `<li><strong>Slowest respondents:</strong> ${slowest.map(r => `${r.respondent_id} (${r.seconds.toFixed(2)}s)`).join(', ')}</li>`;
+  }
+  html += '</ul>';
+  
+  const profile = instrumentation.profile || [];
+  if (profile.length > 0) {
+    html += '<h4>Python Profile (top functions by cumulative time)</h4>';
+    html += '<table class="summary-table"><thead><tr><th>Function</th><th>Calls</th><th>Own (s)</th><th>Cumulative (s)</th></tr></thead><tbody>';
+    profile.slice(0, 15).forEach(row => {
+      html += `<tr><td>${escapeHtml(row.function)}</td><td>${row.calls}</td>`;
+      html += `<td>${(row.total_seconds ?? 0).toFixed(3)}</td><td>${(row.cumulative_seconds ?? 0).toFixed(3)}</td></tr>`;
+    });
+    html += '</tbody></table>';
+  }
+  return html;
+}
+
 /**
  * Setup individual respondent viewer
  */
@@ -1741,44 +2904,44 @@ function runSegmentation() {
   const autoK = document.getElementById('conjoint-auto-k')?.checked || false;
   
   try {
-    // Extract utility vectors (exclude ASCs for clustering)
-    const utilityVectors = estimationResult.respondents.map(r => {
-      const vec = [];
-      Object.entries(r.coefficients).forEach(([key, val]) => {
-        if (!key.startsWith('ASC_')) {
-          vec.push(val || 0);
-        }
-      });
-      return vec;
-    });
-    
-    // Normalize
-    const normalized = normalizeVectors(utilityVectors);
-    
     let k;
-    
-    if (autoK) {
-      // Run elbow method to find optimal k
-      statusEl.textContent = 'Finding optimal number of segments (Elbow Method)...';
-      const maxK = Math.min(8, Math.floor(normalized.length / 5)); // At least 5 respondents per cluster
-      const elbowResult = findOptimalK(normalized, maxK);
-      k = elbowResult.optimalK;
+    let clusters;
+    
+    if (pyodideReady) {
+      // Python engine: k-means++ seeding, vectorized distances, whole k range in one call
+      const maxK = Math.min(8, Math.floor(estimationResult.respondents.length / 5)); // At least 5 respondents per cluster
+      const options = autoK
+        ? { k_min: 2, k_max: Math.max(2, maxK) }
+        : { k: parseInt(document.getElementById('conjoint-n-clusters')?.value || 3) };
+      
+      statusEl.textContent = autoK
+        ? 'Finding optimal number of segments (Elbow Method)...'
+        : `Running k-means with ${options.k} clusters...`;
       
-      // Display elbow chart
-      displayElbowChart(elbowResult);
-      document.getElementById('conjoint-elbow-results').style.display = 'block';
+      const segmentFn = pyodide.globals.get('run_segmentation_json');
+      const segResult = JSON.parse(segmentFn(
+        JSON.stringify(estimationResult.respondents.map(r => r.coefficients)),
+        JSON.stringify(options)
+      ));
+      segmentFn.destroy();
       
-      statusEl.textContent = `Optimal k=${k} found. Running final segmentation...`;
+      k = segResult.k;
+      clusters = segResult.assignments;
+      
+      if (autoK) {
+        displayElbowChart({
+          kValues: segResult.k_values,
+          wcssValues: segResult.wcss_values,
+          optimalK: segResult.optimal_k
+        });
+        document.getElementById('conjoint-elbow-results').style.display = 'block';
+      } else {
+        document.getElementById('conjoint-elbow-results').style.display = 'none';
+      }
     } else {
-      k = parseInt(document.getElementById('conjoint-n-clusters')?.value || 3);
-      document.getElementById('conjoint-elbow-results').style.display = 'none';
+      ({ k, clusters } = runSegmentationJS(autoK, statusEl));
     }
     
-    statusEl.textContent = `Running k-means with ${k} clusters...`;
-    
-    // Run k-means with the chosen k
-    const clusters = kMeans(normalized, k);
-    
     // Assign to respondents
     estimationResult.respondents.forEach((r, i) => {
       r.segment = clusters[i];
@@ -1799,6 +2962,51 @@ function runSegmentation() {
   }
 }
 
+/**
+ * Fallback k-means segmentation in plain JS (used when Pyodide is not loaded)
+ */
+function runSegmentationJS(autoK, statusEl) {
+  // Extract utility vectors (exclude ASCs for clustering)
+  const utilityVectors = estimationResult.respondents.map(r => {
+    const vec = [];
+    Object.entries(r.coefficients).forEach(([key, val]) => {
+      if (!key.startsWith('ASC_')) {
+        vec.push(val || 0);
+      }
+    });
+    return vec;
+  });
+  
+  // Normalize
+  const normalized = normalizeVectors(utilityVectors);
+  
+  let k;
+  
+  if (autoK) {
+    // Run elbow method to find optimal k
+    statusEl.textContent = 'Finding optimal number of segments (Elbow Method)...';
+    const maxK = Math.min(8, Math.floor(normalized.length / 5)); // At least 5 respondents per cluster
+    const elbowResult = findOptimalK(normalized, maxK);
+    k = elbowResult.optimalK;
+    
+    // Display elbow chart
+    displayElbowChart(elbowResult);
+    document.getElementById('conjoint-elbow-results').style.display = 'block';
+    
+    statusEl.textContent = `Optimal k=${k} found. Running final segmentation...`;
+  } else {
+    k = parseInt(document.getElementById('conjoint-n-clusters')?.value || 3);
+    document.getElementById('conjoint-elbow-results').style.display = 'none';
+  }
+  
+  statusEl.textContent = `Running k-means with ${k} clusters...`;
+  
+  // Run k-means with the chosen k
+  const clusters = kMeans(normalized, k);
+  
+  return { k, clusters };
+}
+
 /**
  * Find optimal K using Elbow Method (WCSS)
  */
@@ -2552,6 +3760,12 @@ function calculateProductCost(product) {
  * Get competitor attributes from original data
  */
 function getCompetitorAttributesFromData(competitorId) {
+  if (loadedModelArtifact) {
+    const attributes = studyCompetitorProfiles[competitorId];
+    if (!attributes) return null;
+    const priceAttr = attributeColumns.find(attr => attr.toLowerCase() === 'price');
+    return { attributes, price: priceAttr ? (parseFloat(attributes[priceAttr]) || 0) : 0 };
+  }
   if (!conjointDataset || !conjointDataset.rows) return null;
   
   const { headers, rows } = conjointDataset;
@@ -2636,24 +3850,37 @@ function runSimulation() {
     }
     
     // For each respondent, compute utilities for each product
-    const shares = allProducts.map(() => 0);
-    
-    estimationResult.respondents.forEach(resp => {
-      const utilities = allProducts.map(prod => {
-        if (prod.isNone) {
-          // None option uses ASC_None coefficient
-          return resp.coefficients['ASC_None'] || 0;
-        } else {
-          return computeUtility(prod, resp.coefficients);
-        }
+    let shares = allProducts.map(() => 0);
+    let respondentProbs = [];
+    
+    if (loadedModelArtifact) {
+      // Reopened study: shares come straight from the saved coefficient matrix
+      const simulateFn = pyodide.globals.get('simulate_shares_json');
+      const simulated = JSON.parse(simulateFn(JSON.stringify(allProducts.map(prod =>
+        prod.isNone ? { is_none: true } : { attributes: prod.attributes }
+      ))));
+      simulateFn.destroy();
+      shares = simulated.shares;
+      respondentProbs = simulated.respondent_probs;
+    } else {
+      estimationResult.respondents.forEach(resp => {
+        const utilities = allProducts.map(prod => {
+          if (prod.isNone) {
+            // None option uses ASC_None coefficient
+            return resp.coefficients['ASC_None'] || 0;
+          } else {
+            return computeUtility(prod, resp.coefficients);
+          }
+        });
+        const probs = softmax(utilities);
+        probs.forEach((p, i) => shares[i] += p);
+        respondentProbs.push(probs);
       });
-      const probs = softmax(utilities);
-      probs.forEach((p, i) => shares[i] += p);
-    });
-    
-    // Average shares
-    const nResp = estimationResult.respondents.length;
-    shares.forEach((_, i) => shares[i] /= nResp);
+      
+      // Average shares
+      const nResp = estimationResult.respondents.length;
+      shares.forEach((_, i) => shares[i] /= nResp);
+    }
     
     // Compute profits
     const results = allProducts.map((prod, i) => {
@@ -2688,6 +3915,11 @@ function runSimulation() {
       wtpData = calculateWTP();
     }
     
+    // Bayesian-bootstrap intervals for shares and WTP (computed in the Python engine)
+    if (pyodideReady) {
+      addBootstrapIntervals(results, respondentProbs, wtpData);
+    }
+    
     // Display
     displaySimulationResults(results, wtpData);
     statusEl.textContent = '✓ Simulation complete.';
@@ -2702,6 +3934,32 @@ function runSimulation() {
   }
 }
 
+/**
+ * Attach 95% Bayesian-bootstrap intervals to simulation shares and WTP rows.
+ * All statistics share one Dirichlet weight matrix drawn in the engine.
+ */
+function addBootstrapIntervals(results, respondentProbs, wtpData) {
+  const matrices = { shares: respondentProbs };
+  if (wtpData && wtpData.length > 0) {
+    matrices.wtp = estimationResult.respondents.map((_, i) => wtpData.map(w => w.respondentValues[i]));
+  }
+  
+  const bootstrapFn = pyodide.globals.get('bootstrap_intervals_json');
+  const boot = JSON.parse(bootstrapFn(JSON.stringify({ matrices, n_bootstrap: 1000, level: 0.95 })));
+  bootstrapFn.destroy();
+  
+  boot.intervals.shares.forEach((ci, i) => {
+    results[i].shareLower = ci.lower * 100;
+    results[i].shareUpper = ci.upper * 100;
+  });
+  if (boot.intervals.wtp) {
+    boot.intervals.wtp.forEach((ci, j) => {
+      wtpData[j].lowerWTP = ci.lower;
+      wtpData[j].upperWTP = ci.upper;
+    });
+  }
+}
+
 /**
  * Calculate Willingness-to-Pay (WTP) for each attribute level
  */
@@ -2727,14 +3985,16 @@ function calculateWTP() {
         const key = `${attr}_${level}`;
         
         // Calculate WTP across all respondents
-        const wtpValues = estimationResult.respondents.map(resp => {
+        const respondentValues = estimationResult.respondents.map(resp => {
           const utility = resp.coefficients[key] || 0;
           const priceCoef = resp.coefficients[priceAttr] || -0.01; // Default small negative value
           
           // WTP = -Δutility / price_coefficient
           // Negative sign because price coefficient is typically negative
-          return -utility / priceCoef;
-        }).filter(v => isFinite(v) && Math.abs(v) < 10000); // Filter out extreme values
+          const wtp = -utility / priceCoef;
+          return isFinite(wtp) && Math.abs(wtp) < 10000 ? wtp : null; // Filter out extreme values
+        });
+        const wtpValues = respondentValues.filter(v => v !== null);
         
         if (wtpValues.length > 0) {
           const mean = wtpValues.reduce((a, b) => a + b, 0) / wtpValues.length;
@@ -2745,18 +4005,21 @@ function calculateWTP() {
             attribute: attr,
             level: level,
             meanWTP: mean,
-            stdDevWTP: stdDev
+            stdDevWTP: stdDev,
+            respondentValues
           });
         }
       });
     }
     // For numeric attributes, WTP is the coefficient ratio
     else {
-      const wtpValues = estimationResult.respondents.map(resp => {
+      const respondentValues = estimationResult.respondents.map(resp => {
         const utility = resp.coefficients[attr] || 0;
         const priceCoef = resp.coefficients[priceAttr] || -0.01;
-        return -utility / priceCoef;
-      }).filter(v => isFinite(v) && Math.abs(v) < 10000);
+        const wtp = -utility / priceCoef;
+        return isFinite(wtp) && Math.abs(wtp) < 10000 ? wtp : null;
+      });
+      const wtpValues = respondentValues.filter(v => v !== null);
       
       if (wtpValues.length > 0) {
         const mean = wtpValues.reduce((a, b) => a + b, 0) / wtpValues.length;
@@ -2767,7 +4030,8 @@ function calculateWTP() {
           attribute: attr,
           level: 'per unit',
           meanWTP: mean,
-          stdDevWTP: stdDev
+          stdDevWTP: stdDev,
+          respondentValues
         });
       }
     }
@@ -2833,6 +4097,16 @@ function displaySimulationResults(results, wtpData = null) {
     marker: { color: colors }
   }];
   
+  if (results.every(r => r.shareLower != null)) {
+    shareData[0].error_y = {
+      type: 'data',
+      symmetric: false,
+      array: results.map(r => r.shareUpper - r.share),
+      arrayminus: results.map(r => r.share - r.shareLower),
+      color: '#1F3B57'
+    };
+  }
+  
   Plotly.newPlot('chart-sim-share', shareData, {
     title: '',
     xaxis: { title: 'Product' },
@@ -2867,9 +4141,13 @@ function displaySimulationResults(results, wtpData = null) {
       rowStyle = ' style="background-color: #fff3e0;"';
     }
     
+    const shareCI = r.shareLower != null
+      ? `<br><small>95% CI ${r.shareLower.toFixed(1)}–${r.shareUpper.toFixed(1)}%</small>`
+      : '';
+    
     row.innerHTML = `
       <td${rowStyle}>${escapeHtml(r.name)}</td>
-      <td${rowStyle}>${r.share.toFixed(2)}%</td>
+      <td${rowStyle}>${r.share.toFixed(2)}%${shareCI}</td>
       <td${rowStyle}>${r.customers.toLocaleString()}</td>
       <td${rowStyle}>$${r.price.toFixed(2)}</td>
       <td${rowStyle}>$${r.cost.toFixed(2)}</td>
@@ -2888,10 +4166,13 @@ function displaySimulationResults(results, wtpData = null) {
     
     wtpData.forEach(wtp => {
       const row = wtpTbody.insertRow();
+      const wtpCI = wtp.lowerWTP != null
+        ? `<br><small>95% CI $${wtp.lowerWTP.toFixed(2)} – $${wtp.upperWTP.toFixed(2)}</small>`
+        : '';
       row.innerHTML = `
         <td>${escapeHtml(wtp.attribute)}</td>
         <td>${escapeHtml(wtp.level)}</td>
-        <td>$${wtp.meanWTP.toFixed(2)}</td>
+        <td>$${wtp.meanWTP.toFixed(2)}${wtpCI}</td>
         <td>$${wtp.stdDevWTP.toFixed(2)}</td>
       `;
     });
@@ -3064,42 +4345,62 @@ function runBruteForceOptimization() {
       }
     });
     
-    combinations.forEach((combo, idx) => {
-      // Build full product configuration
-      const product = { ...fixedAttrs, ...combo };
-      
-      // Get price
-      const priceAttr = attributeColumns.find(a => a.toLowerCase() === 'price');
-      const price = priceAttr ? (parseFloat(product[priceAttr]) || 0) : 0;
-      
-      // Calculate market share
-      const share = calculateConfigurationShare(product, competitorProducts);
-      
-      // Calculate profit
-      const profit = metric === 'profit' ? share * (price - unitCost) : 0;
-      
-      results.push({
-        config: product,
-        share: share,
-        profit: profit,
-        price: price
+    const priceAttr = attributeColumns.find(a => a.toLowerCase() === 'price');
+    let topResults;
+    
+    if (loadedModelArtifact) {
+      // Reopened study: search against the saved coefficient matrix in the Python engine
+      const optimizeFn = pyodide.globals.get('optimize_product_json');
+      topResults = JSON.parse(optimizeFn(JSON.stringify({
+        attribute_levels: attrLevels,
+        fixed_attributes: fixedAttrs,
+        competitors: competitorProducts.map(comp =>
+          comp.isNone ? { is_none: true } : { attributes: comp.attributes, competitor_id: comp.id }
+        ),
+        metric,
+        unit_cost: unitCost,
+        price_attribute: priceAttr || 'price',
+        top_n: 10
+      }))).results;
+      optimizeFn.destroy();
+    } else {
+      combinations.forEach((combo, idx) => {
+        // Build full product configuration
+        const product = { ...fixedAttrs, ...combo };
+        
+        // Get price
+        const price = priceAttr ? (parseFloat(product[priceAttr]) || 0) : 0;
+        
+        // Calculate market share
+        const share = calculateConfigurationShare(product, competitorProducts);
+        
+        // Calculate profit
+        const profit = metric === 'profit' ? share * (price - unitCost) : 0;
+        
+        results.push({
+          config: product,
+          share: share,
+          profit: profit,
+          price: price
+        });
+        
+        // Progress update every 1000
+        if (idx % 1000 === 0 && idx > 0) {
+          statusEl.textContent = `Evaluated ${idx.toLocaleString()} of ${combinations.length.toLocaleString()}...`;
+        }
       });
       
-      // Progress update every 1000
-      if (idx % 1000 === 0 && idx > 0) {
-        statusEl.textContent = `Evaluated ${idx.toLocaleString()} of ${combinations.length.toLocaleString()}...`;
+      // Sort by optimization metric
+      if (metric === 'profit') {
+        results.sort((a, b) => b.profit - a.profit);
+      } else {
+        results.sort((a, b) => b.share - a.share);
       }
-    });
-    
-    // Sort by optimization metric
-    if (metric === 'profit') {
-      results.sort((a, b) => b.profit - a.profit);
-    } else {
-      results.sort((a, b) => b.share - a.share);
+      topResults = results.slice(0, 10);
     }
     
     // Display top 10
-    displayOptimizationResults(results.slice(0, 10), metric);
+    displayOptimizationResults(topResults, metric);
     
     statusEl.textContent = `✓ Evaluated ${combinations.length.toLocaleString()} configurations. Top 10 shown below.`;
     document.getElementById('conjoint-optimization-results').style.display = 'block';
@@ -3355,6 +4656,9 @@ function setupDownloadButtons() {
   const utilBtn = document.getElementById('conjoint-download-utilities');
   utilBtn?.addEventListener('click', downloadUtilities);
   
+  const modelBtn = document.getElementById('conjoint-download-model');
+  modelBtn?.addEventListener('click', downloadModelArtifact);
+  
   const simBtn = document.getElementById('conjoint-download-simulation');
   simBtn?.addEventListener('click', downloadSimulation);
 }
@@ -3381,6 +4685,113 @@ function downloadUtilities() {
   link.click();
 }
 
+/**
+ * Download the estimated model as a binary artifact (.npz) written by the Python engine.
+ * The artifact holds the coefficient matrix, feature index, attribute metadata and fit stats.
+ */
+function downloadModelArtifact() {
+  if (!estimationResult || !pyodideReady) return;
+  
+  const attributeMetadata = {};
+  Object.keys(attributeConfig).forEach(attrName => {
+    attributeMetadata[attrName] = { type: attributeConfig[attrName].type };
+  });
+  
+  const exportFn = pyodide.globals.get('export_model_artifact');
+  const path = exportFn(
+    JSON.stringify(estimationResult),
+    JSON.stringify(attributeMetadata),
+    noneAlternative || '',
+    JSON.stringify(competitorAlternatives),
+    '/tmp/conjoint_model.npz',
+    JSON.stringify(buildStudySummary())
+  );
+  exportFn.destroy();
+  
+  const blob = new Blob([pyodide.FS.readFile(path)], { type: 'application/octet-stream' });
+  const link = document.createElement('a');
+  link.href = URL.createObjectURL(blob);
+  link.download = 'conjoint_model.npz';
+  link.click();
+}
+
+/**
+ * Level counts per attribute and competitor profiles, saved with the model so a
+ * reopened study can fill the simulator and optimizer without the data rows
+ */
+function buildStudySummary() {
+  const columnCounts = {};
+  attributeColumns.forEach(attr => {
+    const freq = new Map();
+    getColumnValues(attr).forEach(v => freq.set(v, (freq.get(v) || 0) + 1));
+    columnCounts[attr] = { values: [...freq.keys()], counts: [...freq.values()] };
+  });
+  
+  const competitorProfiles = {};
+  competitorAlternatives.forEach(compId => {
+    const comp = getCompetitorAttributesFromData(compId);
+    if (comp) competitorProfiles[compId] = comp.attributes;
+  });
+  
+  return { column_counts: columnCounts, competitor_profiles: competitorProfiles };
+}
+
+/**
+ * Reopen a study from a model artifact (.npz) saved by downloadModelArtifact. The
+ * coefficient matrix is memory-mapped in the engine; results, simulator and optimizer
+ * run on it without re-estimating.
+ */
+async function openModelArtifact(file) {
+  const feedbackEl = document.getElementById('conjoint-upload-feedback');
+  try {
+    feedbackEl.textContent = pyodideReady
+      ? 'Opening saved model...'
+      : 'Loading Python engine to open the saved model...';
+    if (!pyodideReady) {
+      await initPyodide();
+    }
+    
+    const path = '/tmp/conjoint_model_upload.npz';
+    pyodide.FS.writeFile(path, new Uint8Array(await file.arrayBuffer()));
+    const openFn = pyodide.globals.get('open_model_artifact');
+    let study;
+    try {
+      study = JSON.parse(openFn(path));
+    } finally {
+      openFn.destroy();
+    }
+    
+    // Restore the study state the results, simulator and optimizer read
+    attributeColumns = Object.keys(study.attribute_metadata);
+    attributeConfig = {};
+    attributeColumns.forEach(attr => {
+      attributeConfig[attr] = { type: study.attribute_metadata[attr].type };
+    });
+    noneAlternative = study.none_alternative_id || null;
+    competitorAlternatives = study.competitor_alternative_ids || [];
+    conjointDataset = { headers: [], rows: [] };
+    studyColumnCounts = study.column_counts || {};
+    studyCompetitorProfiles = study.competitor_profiles || {};
+    loadedModelArtifact = true;
+    estimationResult = study.result;
+    hasSuccessfulRun = true;
+    currentScenarioName = null;
+    
+    document.getElementById('conjoint-column-mapping').style.display = 'none';
+    document.getElementById('conjoint-attribute-config').style.display = 'none';
+    document.getElementById('conjoint-estimation-controls').style.display = 'none';
+    showEstimationResults(estimationResult);
+    
+    feedbackEl.textContent = `✓ Reopened saved model (${estimationResult.respondents.length} respondents, ${attributeColumns.length} attributes).`;
+    if (Object.keys(studyColumnCounts).length === 0) {
+      feedbackEl.textContent += ' It has no level summary, so simulator and optimizer choices are unavailable.';
+    }
+  } catch (error) {
+    feedbackEl.textContent = `Error opening model: ${error.message}`;
+    console.error('Model open error:', error);
+  }
+}
+
 /**
  * Download simulation results
  */
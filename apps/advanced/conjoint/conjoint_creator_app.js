@@ -12,6 +12,11 @@ let designConfig = {
 };
 let generatedDesign = null;
 
+// Pyodide state (design evaluation engine, loaded on first use)
+let pyodide = null;
+let designEngineReady = false;
+let designEngine = null; // Promise for the conjoint_design module; a failed load stays cached
+
 // Initialize
 function initCreatorApp() {
   setupAttributeManagement();
@@ -363,7 +368,7 @@ function setupDesignGeneration() {
 // Step 3: Design Generation
 // ========================================
 
-function generateDesign() {
+async function generateDesign() {
   const feedback = document.getElementById('design-generation-feedback');
   
   // Track run attempt
@@ -377,6 +382,7 @@ function generateDesign() {
     designConfig.numAlternatives = parseInt(document.getElementById('num-alternatives').value);
     designConfig.includeNone = document.getElementById('include-none').checked;
     designConfig.fullFactorial = document.getElementById('create-full-factorial').checked;
+    designConfig.optimizeDesign = document.getElementById('optimize-d-efficiency')?.checked || false;
     designConfig.populateSynthetic = document.getElementById('populate-synthetic-data').checked;
     designConfig.numRespondents = parseInt(document.getElementById('num-respondents').value) || 50;
     
@@ -407,8 +413,27 @@ function generateDesign() {
       }
     }
     
+    // Optionally search for a D-optimal design (coordinate exchange in the Python engine)
+    let optimizedLevels = null;
+    if (designConfig.optimizeDesign && !designConfig.fullFactorial) {
+      feedback.innerHTML = '<div class="info-message">Optimizing design (coordinate exchange)... First run loads the Python engine.</div>';
+      const design = await initDesignEngine();
+      const optimizeFn = design.generate_optimal_design_json;
+      const optimized = JSON.parse(optimizeFn(JSON.stringify({
+        attributes,
+        n_tasks: designConfig.numTasks,
+        n_alternatives: designConfig.numAlternatives,
+        include_none: designConfig.includeNone,
+        prior: readDesignPrior(),
+        n_restarts: 4
+      })));
+      optimizeFn.destroy();
+      optimizedLevels = optimized.levels;
+      console.log(`Optimized design: D-error ${optimized.d_error?.toFixed(4)}, D-efficiency ${optimized.d_efficiency?.toFixed(1)}%`);
+    }
+    
     // Generate fractional factorial design
-    generatedDesign = createFractionalFactorialDesign();
+    generatedDesign = createFractionalFactorialDesign(optimizedLevels);
     
     // Populate with synthetic data if requested
     if (designConfig.populateSynthetic) {
@@ -449,7 +474,7 @@ function generateDesign() {
   }
 }
 
-function createFractionalFactorialDesign() {
+function createFractionalFactorialDesign(optimizedLevels = null) {
   // Calculate design parameters
   const totalLevels = attributes.reduce((sum, attr) => sum * attr.levels.length, 1);
   const alternativesPerTask = designConfig.numAlternatives;
@@ -461,7 +486,17 @@ function createFractionalFactorialDesign() {
   
   // Generate candidate profiles
   let profiles;
-  if (useFullFactorial) {
+  if (optimizedLevels) {
+    // Coordinate-exchange design: profiles already laid out task by task
+    profiles = optimizedLevels.flat().map(levelIdx => {
+      const profile = {};
+      attributes.forEach((attr, idx) => {
+        profile[attr.name] = attr.levels[levelIdx[idx]];
+      });
+      return profile;
+    });
+    console.log(`Using coordinate-exchange design: ${profiles.length} profiles`);
+  } else if (useFullFactorial) {
     profiles = generateFullFactorialProfiles();
     console.log(`Using full factorial: ${profiles.length} profiles`);
   } else {
@@ -1025,7 +1060,9 @@ function setupDesignScenarioButton() {
     
     btn.disabled = true;
     btn.textContent = 'Computing scenarios...';
-    statusEl.textContent = 'Generating and evaluating 64 alternative design configurations. This may take 10-30 seconds...';
+    statusEl.textContent = designEngineReady
+      ? 'Generating and evaluating alternative design configurations...'
+      : 'Loading the Python design engine, then evaluating alternative design configurations. First run may take 10-20 seconds...';
     statusEl.style.color = '#ff9800';
     
     // Use setTimeout to allow UI update before heavy computation
@@ -1049,29 +1086,87 @@ function setupDesignScenarioButton() {
   };
 }
 
+/**
+ * Load Pyodide + NumPy and the design evaluation module (conjoint_design.py)
+ */
+async function initDesignEngine() {
+  if (!designEngine) {
+    designEngine = (async () => {
+      pyodide = await loadPyodide();
+      await pyodide.loadPackage(['numpy']);
+      const response = await fetch('conjoint_design.py');
+      if (!response.ok) throw new Error(`Failed to fetch conjoint_design.py (${response.status})`);
+      
+      // Import under its own name; running the file as __main__ would start its CLI
+      pyodide.FS.writeFile('/home/pyodide/conjoint_design.py', await response.text());
+      const module = pyodide.pyimport('conjoint_design');
+      designEngineReady = true;
+      return module;
+    })();
+  }
+  return designEngine;
+}
+
+/**
+ * Build a (tasks x alternatives x attributes) level-index design for the trade-off grid
+ */
+function buildScenarioDesign(numTasks, numAlts) {
+  const profiles = generateOrthogonalProfiles(numTasks * numAlts);
+  const design = [];
+  let profileIndex = 0;
+  
+  for (let taskId = 1; taskId <= numTasks; taskId++) {
+    const task = [];
+    for (let altIdx = 0; altIdx < numAlts; altIdx++) {
+      if (profileIndex >= profiles.length) profileIndex = 0;
+      const profile = profiles[profileIndex];
+      task.push(attributes.map(attr => attr.levels.indexOf(profile[attr.name])));
+      profileIndex++;
+    }
+    design.push(task);
+  }
+  
+  return design;
+}
+
 async function computeAndDisplayDesignTradeoffs() {
   const currentTasks = designConfig.numTasks;
   const currentAlts = designConfig.numAlternatives;
   
-  // Vary tasks (5 to 20)
+  // Vary tasks (5 to 20) and alternatives per task (2 to 6)
   const taskRange = [];
-  const taskEfficiency = [];
-  
-  for (let tasks = 5; tasks <= 20; tasks++) {
-    taskRange.push(tasks);
-    // Generate design and compute true D-efficiency
-    const efficiency = await computeScenarioEfficiency(tasks, currentAlts);
-    taskEfficiency.push(efficiency);
-  }
-  
-  // Vary alternatives per task (2 to 6)
+  for (let tasks = 5; tasks <= 20; tasks++) taskRange.push(tasks);
   const altRange = [];
-  const altEfficiency = [];
+  for (let alts = 2; alts <= 6; alts++) altRange.push(alts);
   
-  for (let alts = 2; alts <= 6; alts++) {
-    altRange.push(alts);
-    const efficiency = await computeScenarioEfficiency(currentTasks, alts);
-    altEfficiency.push(efficiency);
+  const prior = readDesignPrior();
+  let taskEfficiency;
+  let altEfficiency;
+  
+  try {
+    // Evaluate the whole grid as one stacked batch in the Python engine
+    const design = await initDesignEngine();
+    const designs = [
+      ...taskRange.map(tasks => buildScenarioDesign(tasks, currentAlts)),
+      ...altRange.map(alts => buildScenarioDesign(currentTasks, alts))
+    ];
+    
+    const evaluateFn = design.evaluate_designs_json;
+    const evaluation = JSON.parse(evaluateFn(JSON.stringify({
+      attributes,
+      designs,
+      prior,
+      include_none: designConfig.includeNone
+    })));
+    evaluateFn.destroy();
+    
+    const dEff = evaluation.d_efficiency.map(v => v ?? 0);
+    taskEfficiency = dEff.slice(0, taskRange.length);
+    altEfficiency = dEff.slice(taskRange.length);
+  } catch (error) {
+    console.warn('Design engine unavailable, falling back to JS evaluation:', error);
+    taskEfficiency = taskRange.map(tasks => designDEfficiency(buildScenarioDesign(tasks, currentAlts), prior));
+    altEfficiency = altRange.map(alts => designDEfficiency(buildScenarioDesign(currentTasks, alts), prior));
   }
   
   // Create traces for Plotly
@@ -1121,7 +1216,7 @@ async function computeAndDisplayDesignTradeoffs() {
   
   const layout = {
     title: {
-      text: 'Design Efficiency Trade-offs (True D-Efficiency)',
+      text: `Design Efficiency Trade-offs (MNL D-Efficiency, ${prior ? 'prior part-worths' : 'zero prior'})`,
       font: { size: 16, color: 'var(--app-text, #1f2a37)' }
     },
     grid: { rows: 1, columns: 2, pattern: 'independent' },
@@ -1132,7 +1227,7 @@ async function computeAndDisplayDesignTradeoffs() {
     },
     yaxis: {
       title: 'D-Efficiency (%)',
-      range: [0, 100],
+      rangemode: 'tozero',
       showgrid: true,
       gridcolor: '#e0e0e0'
     },
@@ -1143,7 +1238,7 @@ async function computeAndDisplayDesignTradeoffs() {
     },
     yaxis2: {
       title: 'D-Efficiency (%)',
-      range: [0, 100],
+      rangemode: 'tozero',
       showgrid: true,
       gridcolor: '#e0e0e0'
     },
@@ -1159,105 +1254,121 @@ async function computeAndDisplayDesignTradeoffs() {
   Plotly.newPlot('design-tradeoffs-chart', data, layout, { responsive: true, displayModeBar: false });
 }
 
-async function computeScenarioEfficiency(numTasks, numAlts) {
-  // Generate a design with specified parameters
-  const tempConfig = {
-    numTasks: numTasks,
-    numAlternatives: numAlts,
-    includeNone: designConfig.includeNone,
-    fullFactorial: false // Always use fractional for scenarios
-  };
-  
-  // Generate orthogonal profiles
-  const profiles = generateOrthogonalProfiles(numTasks * numAlts);
-  
-  // Build design matrix for D-efficiency calculation
-  const X = [];
-  let profileIndex = 0;
-  
-  for (let taskId = 1; taskId <= numTasks; taskId++) {
-    for (let altIdx = 0; altIdx < numAlts; altIdx++) {
-      if (profileIndex >= profiles.length) profileIndex = 0;
-      
-      const profile = profiles[profileIndex];
-      const row = [];
-      
-      // Encode categorical attributes as dummy variables
-      attributes.forEach(attr => {
-        if (attr.type === 'categorical') {
-          const sortedLevels = [...attr.levels].sort();
-          sortedLevels.slice(1).forEach(level => { // Skip baseline
-            row.push(profile[attr.name] === level ? 1 : 0);
-          });
-        } else {
-          // Numeric attribute
-          row.push(parseFloat(profile[attr.name]) || 0);
-        }
-      });
-      
-      X.push(row);
-      profileIndex++;
+/**
+ * Coded parameter names in the design engine's order (conjoint_design.coding_tables):
+ * non-baseline levels of categorical attributes (baseline = alphabetically first level),
+ * one column per numeric attribute, then ASC_None when None is included
+ */
+function designParameterNames() {
+  const names = [];
+  attributes.forEach(attr => {
+    if (attr.type === 'numeric') {
+      names.push(attr.name);
+      return;
     }
+    [...attr.levels].sort().slice(1).forEach(level => names.push(`${attr.name}_${level}`));
+  });
+  if (designConfig.includeNone) names.push('ASC_None');
+  return names;
+}
+
+/**
+ * Optional prior part-worths from the design settings; null means a zero prior
+ */
+function readDesignPrior() {
+  const text = document.getElementById('design-prior')?.value.trim() || '';
+  if (!text) return null;
+  
+  const prior = text.split(',').map(v => parseFloat(v.trim()));
+  const names = designParameterNames();
+  if (prior.length !== names.length || prior.some(v => !Number.isFinite(v))) {
+    throw new Error(`Prior part-worths need ${names.length} numbers, in this order: ${names.join(', ')}`);
   }
-  
-  // Compute D-efficiency: det(X'X)^(1/k) / n
-  // Where k = number of parameters, n = number of observations
-  if (X.length === 0 || X[0].length === 0) return 0;
-  
-  const XtX = multiplyMatrices(transposeMatrix(X), X);
-  const det = matrixDeterminant(XtX);
-  
-  if (det <= 0) return 0; // Singular matrix
-  
-  const k = X[0].length;
-  const n = X.length;
-  const dEfficiency = Math.pow(det, 1 / k) / n * 100;
-  
-  return Math.min(100, Math.max(0, dEfficiency));
+  return prior;
 }
 
-// Matrix operations for D-efficiency calculation
-function transposeMatrix(matrix) {
-  const rows = matrix.length;
-  const cols = matrix[0].length;
-  const result = Array(cols).fill(0).map(() => Array(rows).fill(0));
-  
-  for (let i = 0; i < rows; i++) {
-    for (let j = 0; j < cols; j++) {
-      result[j][i] = matrix[i][j];
+/**
+ * Per-attribute coding tables (levels x parameters), matching conjoint_design.coding_tables:
+ * dummy coding for categorical attributes, numeric levels mapped linearly onto [-1, 1]
+ */
+function designCodingTables(numParams) {
+  let col = 0;
+  return attributes.map(attr => {
+    const table = attr.levels.map(() => new Array(numParams).fill(0));
+    if (attr.type === 'numeric') {
+      const values = attr.levels.map(v => parseFloat(v));
+      const min = Math.min(...values);
+      const max = Math.max(...values);
+      const span = max - min;
+      values.forEach((v, i) => {
+        table[i][col] = span > 0 ? (v - (max + min) / 2) / (span / 2) : 0;
+      });
+      col += 1;
+    } else {
+      [...attr.levels].sort().slice(1).forEach(level => {
+        table[attr.levels.indexOf(level)][col] = 1;
+        col += 1;
+      });
     }
-  }
-  return result;
+    return table;
+  });
 }
 
-function multiplyMatrices(A, B) {
-  const rowsA = A.length;
-  const colsA = A[0].length;
-  const colsB = B[0].length;
-  const result = Array(rowsA).fill(0).map(() => Array(colsB).fill(0));
-  
-  for (let i = 0; i < rowsA; i++) {
-    for (let j = 0; j < colsB; j++) {
-      let sum = 0;
-      for (let k = 0; k < colsA; k++) {
-        sum += A[i][k] * B[k][j];
-      }
-      result[i][j] = sum;
+/**
+ * JavaScript fallback for conjoint_design.evaluate_designs: MNL-information D-efficiency,
+ * 100 * det(I / S)^(1/K), of a level-index design under the prior (zero when null)
+ */
+function designDEfficiency(design, prior) {
+  const K = designParameterNames().length;
+  const tables = designCodingTables(K);
+  const beta = prior || new Array(K).fill(0);
+  const info = Array.from({ length: K }, () => new Array(K).fill(0));
+  
+  design.forEach(task => {
+    const X = task.map(levels => {
+      const row = new Array(K).fill(0);
+      levels.forEach((level, a) => {
+        if (level >= 0) tables[a][level].forEach((v, k) => { row[k] += v; });
+      });
+      return row;
+    });
+    if (designConfig.includeNone) {
+      const noneRow = new Array(K).fill(0);
+      noneRow[K - 1] = 1;
+      X.push(noneRow);
     }
-  }
-  return result;
+    
+    // Logit probabilities under the prior, then this task's term X_s' (diag(p) - p p') X_s
+    const utilities = X.map(row => row.reduce((sum, v, k) => sum + v * beta[k], 0));
+    const maxUtility = Math.max(...utilities);
+    const expU = utilities.map(u => Math.exp(u - maxUtility));
+    const total = expU.reduce((sum, e) => sum + e, 0);
+    const p = expU.map(e => e / total);
+    
+    const mean = new Array(K).fill(0);
+    X.forEach((row, j) => row.forEach((v, k) => { mean[k] += p[j] * v; }));
+    X.forEach((row, j) => {
+      const centered = row.map((v, k) => v - mean[k]);
+      for (let k = 0; k < K; k++) {
+        for (let l = 0; l < K; l++) {
+          info[k][l] += p[j] * centered[k] * centered[l];
+        }
+      }
+    });
+  });
+  
+  const { sign, logDet } = matrixLogDeterminant(info.map(row => row.map(v => v / design.length)));
+  return sign > 0 && Number.isFinite(logDet) ? 100 * Math.exp(logDet / K) : 0;
 }
 
-function matrixDeterminant(matrix) {
+/**
+ * Sign and log of |det| by LU decomposition with partial pivoting (like numpy.linalg.slogdet)
+ */
+function matrixLogDeterminant(matrix) {
   const n = matrix.length;
-  
-  if (n === 1) return matrix[0][0];
-  if (n === 2) return matrix[0][0] * matrix[1][1] - matrix[0][1] * matrix[1][0];
-  
-  // Use LU decomposition for larger matrices (more efficient)
-  // This is a simplified version - for production, use a proper linear algebra library
-  let det = 1;
   const LU = matrix.map(row => [...row]); // Copy matrix
+  let sign = 1;
+  let logDet = 0;
   
   for (let i = 0; i < n; i++) {
     // Partial pivoting
@@ -1270,12 +1381,13 @@ function matrixDeterminant(matrix) {
     
     if (maxRow !== i) {
       [LU[i], LU[maxRow]] = [LU[maxRow], LU[i]];
-      det *= -1;
+      sign = -sign;
     }
     
-    if (Math.abs(LU[i][i]) < 1e-10) return 0; // Singular matrix
+    if (LU[i][i] === 0) return { sign: 0, logDet: -Infinity }; // Singular matrix
     
-    det *= LU[i][i];
+    sign *= Math.sign(LU[i][i]);
+    logDet += Math.log(Math.abs(LU[i][i]));
     
     // Eliminate below
     for (let k = i + 1; k < n; k++) {
@@ -1286,7 +1398,7 @@ function matrixDeterminant(matrix) {
     }
   }
   
-  return det;
+  return { sign, logDet };
 }
 
 function displayDesignTradeoffs() {
@@ -0,0 +1,302 @@
+"""
+Single-pass validation and profiling of long-format CBC choice data.
+
+One walk over the rows accumulates everything the app and the generators
+check: rows, respondents and tasks, tasks per respondent, alternatives per
+task, exactly-one-chosen per task, invalid chosen values, duplicate
+alternatives within a task, none-choice rate, level balance (how often each
+attribute level is shown) and choice share per level.
+
+Rows must be grouped by respondent and, within a respondent, by task (the
+layout every generator and the app's export use). A task or respondent is
+summarized as soon as its id changes, so only the current task and the
+per-level counters are held and memory does not grow with the file. With
+check_grouping=True (the default) the ids of finished respondents are also
+kept, to report data that is not grouped; that set is the only state that
+grows with the number of respondents.
+
+The module is pure Python (csv, json), so the analysis page can load it into
+Pyodide and scripts can import it. Run it directly to profile a file:
+
+    python conjoint_validation.py scenarios/smartphone_cbc.csv --none None
+"""
+
+import argparse
+import csv
+import json
+import re
+from collections import Counter, defaultdict
+
+MAX_EXAMPLES = 10
+
+# Chosen values the engine reads as 0/1 (build_design_matrix's pd.to_numeric); the
+# app's JS fallback (validateConjointDataJS) accepts the same pattern
+CHOSEN_PATTERN = re.compile(r'([01])(\.0*)?')
+
+
+class ChoiceDataProfiler:
+    """Accumulates validation results and a profile over rows fed one at a time."""
+
+    def __init__(self, headers, respondent='respondent_id', task='task_id', alternative='alternative_id',
+                 chosen='chosen', none_alternative=None, attributes=None, check_grouping=True):
+        self.headers = list(headers)
+        missing = [c for c in (respondent, task, alternative, chosen) if c not in self.headers]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        self.resp_idx = self.headers.index(respondent)
+        self.task_idx = self.headers.index(task)
+        self.alt_idx = self.headers.index(alternative)
+        self.chosen_idx = self.headers.index(chosen)
+        required = {respondent, task, alternative, chosen}
+        self.attributes = list(attributes) if attributes else [h for h in self.headers if h not in required]
+        self.attr_idx = [self.headers.index(a) for a in self.attributes]
+        self.none_alternative = none_alternative
+
+        self.n_rows = 0
+        self.n_respondents = 0
+        self.n_tasks = 0
+        self.tasks_per_respondent = Counter()
+        self.alternatives_per_task = Counter()
+        self.tasks_without_choice = 0
+        self.tasks_with_multiple_choices = 0
+        self.invalid_chosen = 0
+        self.duplicate_alternatives = 0
+        self.none_choices = 0
+        self.shown = [Counter() for _ in self.attributes]
+        self.chosen_counts = [Counter() for _ in self.attributes]
+        self.examples = defaultdict(list)
+
+        self.check_grouping = check_grouping
+        self.finished_respondents = set()
+        self.ungrouped_respondents = 0
+        self.ungrouped_tasks = 0
+
+        self._resp = None
+        self._task = None
+        self._resp_tasks = set()
+        self._task_rows = 0
+        self._task_chosen = 0
+        self._task_alts = set()
+
+    def _example(self, kind, value):
+        if len(self.examples[kind]) < MAX_EXAMPLES:
+            self.examples[kind].append(value)
+
+    def _close_task(self):
+        if self._task is None:
+            return
+        self.n_tasks += 1
+        self.alternatives_per_task[self._task_rows] += 1
+        if self._task_chosen == 0:
+            self.tasks_without_choice += 1
+            self._example('tasks_without_choice', f"{self._resp}/{self._task}")
+        elif self._task_chosen > 1:
+            self.tasks_with_multiple_choices += 1
+            self._example('tasks_with_multiple_choices', f"{self._resp}/{self._task}")
+        self._task = None
+
+    def _close_respondent(self):
+        self._close_task()
+        if self._resp is None:
+            return
+        self.n_respondents += 1
+        self.tasks_per_respondent[len(self._resp_tasks)] += 1
+        if self.check_grouping:
+            self.finished_respondents.add(self._resp)
+        self._resp = None
+        self._resp_tasks = set()
+
+    def update(self, row):
+        """Add one row (a sequence aligned with headers)."""
+        self.n_rows += 1
+        resp, task, alt = row[self.resp_idx], row[self.task_idx], row[self.alt_idx]
+
+        if resp != self._resp:
+            self._close_respondent()
+            if self.check_grouping and resp in self.finished_respondents:
+                self.ungrouped_respondents += 1
+                self._example('ungrouped_respondents', resp)
+            self._resp = resp
+        if task != self._task:
+            self._close_task()
+            if task in self._resp_tasks:
+                self.ungrouped_tasks += 1
+                self._example('ungrouped_tasks', f"{resp}/{task}")
+            self._resp_tasks.add(task)
+            self._task = task
+            self._task_rows = 0
+            self._task_chosen = 0
+            self._task_alts = set()
+
+        self._task_rows += 1
+        if alt in self._task_alts:
+            self.duplicate_alternatives += 1
+            self._example('duplicate_alternatives', f"{resp}/{task}/{alt}")
+        self._task_alts.add(alt)
+
+        chosen = str(row[self.chosen_idx]).strip()
+        match = CHOSEN_PATTERN.fullmatch(chosen)
+        if match:
+            is_chosen = match.group(1) == '1'
+        else:
+            self.invalid_chosen += 1
+            self._example('invalid_chosen', f"row {self.n_rows}: {chosen!r}")
+            is_chosen = False
+        self._task_chosen += is_chosen
+
+        levels = [str(row[i]) for i in self.attr_idx]
+        if self.none_alternative is not None:
+            is_none = str(alt) == str(self.none_alternative)
+        else:
+            # Without an explicit id, an alternative with no attribute values is the opt-out
+            is_none = all(lvl == '' for lvl in levels)
+        if is_none:
+            self.none_choices += is_chosen
+            return
+
+        for j, level in enumerate(levels):
+            if level == '':
+                continue
+            self.shown[j][level] += 1
+            if is_chosen:
+                self.chosen_counts[j][level] += 1
+
+    def result(self):
+        """Close the last respondent and return the profile with errors and warnings."""
+        self._close_respondent()
+
+        errors, warnings = [], []
+        if self.n_rows == 0:
+            errors.append("No data rows.")
+        if self.invalid_chosen:
+            errors.append(f"{self.invalid_chosen} rows have a chosen value other than 0/1.")
+        if self.tasks_without_choice or self.tasks_with_multiple_choices:
+            errors.append(
+                f"{self.tasks_without_choice + self.tasks_with_multiple_choices} tasks do not have exactly "
+                f"one chosen alternative ({self.tasks_without_choice} none, "
+                f"{self.tasks_with_multiple_choices} several)."
+            )
+        if self.ungrouped_respondents or self.ungrouped_tasks:
+            # Estimation still works, but per-task and per-respondent counts are per block
+            warnings.append(
+                f"Rows are not grouped by respondent and task ({self.ungrouped_respondents} respondents and "
+                f"{self.ungrouped_tasks} tasks appear in more than one block); task counts are per block."
+            )
+        if self.duplicate_alternatives:
+            warnings.append(f"{self.duplicate_alternatives} rows repeat an alternative id within a task.")
+        if len(self.tasks_per_respondent) > 1:
+            warnings.append("Respondents completed different numbers of tasks.")
+        if len(self.alternatives_per_task) > 1:
+            warnings.append("Tasks have different numbers of alternatives.")
+
+        levels = {}
+        for attr, shown, chosen in zip(self.attributes, self.shown, self.chosen_counts):
+            total_shown = sum(shown.values())
+            levels[attr] = {
+                level: {
+                    "shown": count,
+                    "shown_share": count / total_shown,
+                    "chosen": chosen[level],
+                    "choice_rate": chosen[level] / count
+                }
+                for level, count in sorted(shown.items())
+            }
+            if shown and min(shown.values()) < 0.5 * max(shown.values()):
+                warnings.append(f"Levels of {attr} are unbalanced (shown {min(shown.values())} to "
+                                f"{max(shown.values())} times).")
+
+        return {
+            "valid": not errors,
+            "errors": errors,
+            "warnings": warnings,
+            "examples": dict(self.examples),
+            "profile": {
+                "n_rows": self.n_rows,
+                "n_respondents": self.n_respondents,
+                "n_tasks": self.n_tasks,
+                "tasks_per_respondent": {str(k): v for k, v in sorted(self.tasks_per_respondent.items())},
+                "alternatives_per_task": {str(k): v for k, v in sorted(self.alternatives_per_task.items())},
+                "none_choices": self.none_choices,
+                "none_choice_rate": self.none_choices / self.n_tasks if self.n_tasks else 0.0,
+                "levels": levels
+            }
+        }
+
+
+def profile_rows(headers, rows, **options):
+    """Profile any iterable of row sequences aligned with headers."""
+    profiler = ChoiceDataProfiler(headers, **options)
+    for row in rows:
+        profiler.update(row)
+    return profiler.result()
+
+
+def profile_csv(path, **options):
+    """Profile a CSV file, streaming it row by row."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        return profile_rows(headers, (row for row in reader if row), **options)
+
+
+def profile_columns(columns, **options):
+    """Profile column arrays (dict of equal-length sequences, e.g. NumPy arrays or a CBC store frame)."""
+    headers = list(columns.keys())
+    return profile_rows(headers, zip(*(columns[h] for h in headers)), **options)
+
+
+def profile_table_json(headers_json, rows_json, options_json='{}'):
+    """Pyodide entry point: headers and rows as parsed by the app, returns the report as JSON."""
+    return json.dumps(profile_rows(json.loads(headers_json), json.loads(rows_json), **json.loads(options_json)))
+
+
+def format_report(report):
+    """Human-readable report for the command line."""
+    p = report['profile']
+    lines = [
+        f"Rows: {p['n_rows']}  Respondents: {p['n_respondents']}  Tasks: {p['n_tasks']}",
+        f"Tasks per respondent: {p['tasks_per_respondent']}",
+        f"Alternatives per task: {p['alternatives_per_task']}",
+        f"None/opt-out choices: {p['none_choices']}/{p['n_tasks']} ({100 * p['none_choice_rate']:.1f}%)"
+    ]
+    for attr, levels in p['levels'].items():
+        lines.append(f"{attr}:")
+        for level, stats in levels.items():
+            lines.append(f"  {level:<28} shown {stats['shown']:>7} ({100 * stats['shown_share']:5.1f}%)  "
+                         f"chosen {stats['chosen']:>6} ({100 * stats['choice_rate']:5.1f}% of shows)")
+    for message in report['errors']:
+        lines.append(f"✗ {message}")
+    for message in report['warnings']:
+        lines.append(f"⚠ {message}")
+    for kind, examples in report['examples'].items():
+        lines.append(f"  e.g. {kind}: {', '.join(examples)}")
+    lines.append("✓ Valid" if report['valid'] else "✗ Invalid")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and profile a long-format CBC file in one pass.")
+    parser.add_argument('csv')
+    parser.add_argument('--respondent', default='respondent_id')
+    parser.add_argument('--task', default='task_id')
+    parser.add_argument('--alternative', default='alternative_id')
+    parser.add_argument('--chosen', default='chosen')
+    parser.add_argument('--none', dest='none_alternative', default=None,
+                        help='Alternative id of the opt-out (default: rows with no attribute values)')
+    parser.add_argument('--no-grouping-check', action='store_true',
+                        help='Do not remember finished respondents (strictly constant memory)')
+    parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+    args = parser.parse_args()
+
+    report = profile_csv(
+        args.csv, respondent=args.respondent, task=args.task, alternative=args.alternative,
+        chosen=args.chosen, none_alternative=args.none_alternative,
+        check_grouping=not args.no_grouping_check
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    raise SystemExit(0 if report['valid'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,452 @@
+"""
+Benchmark suite for the conjoint estimation engine (CONJOINT_PYTHON_CODE).
+
+Studies of increasing size are generated with generate_smartphone_data
+(respondents x tasks x attributes) and pushed through the same steps as
+run_conjoint_estimation, timing each phase separately:
+
+    ingest     JSON rows -> DataFrame (the browser path); studies above
+               JSON_INGEST_MAX_RESPONDENTS load a columnar store instead
+    design     build_design_matrix for every fitted respondent
+    fit        fit_respondent for every fitted respondent
+    aggregate  summarize_estimation (means, bootstrap intervals)
+    serialize  json.dumps of the result returned to JavaScript
+
+It also records optimizer iterations per respondent and the traced peak
+memory (tracemalloc, which includes NumPy buffers) of a second pass.
+
+A full fit of 100k respondents takes hours, so large cases fit an evenly
+spaced sample of respondents (fit_sample). Design and fit are then reported
+per respondent, the sampled results are copied up to the full study size
+before aggregate and serialize, and projected_total_seconds scales the
+sample to the whole study.
+
+Every run is appended to a JSON history. Each case is compared with the
+median of its last BASELINE_RUNS runs on the same runtime, and slowdowns
+beyond REGRESSION_THRESHOLDS are reported (exit code 1 with --check).
+
+Design and fit are timed inside the engine's estimate_respondents by its
+EstimationTrace spans, so the suite measures the code the app runs.
+
+The suite runs in CPython: it loads the engine through conjoint_engine,
+generates studies with generate_smartphone_data and writes columnar stores
+to a temporary directory. Each run records its interpreter, platform and
+package versions, and is compared only with runs on the same runtime.
+
+To compare with the browser, --engine-only times one scenario CSV through
+the engine's benchmark_estimation_json; calling benchmarkConjointEngine()
+in the conjoint page's console, with the same CSV loaded, runs that
+function in Pyodide and prints the same phases.
+
+Usage:
+    python benchmark_engine.py                      # quick suite
+    python benchmark_engine.py --suite standard --repeat 3 --check
+    python benchmark_engine.py --suite full --fit-sample 0   # fit everyone (slow)
+    python benchmark_engine.py --engine-only smartphone_cbc.csv --repeat 3
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import scipy
+
+import conjoint_engine
+import generate_smartphone_data
+from studies import STUDIES
+
+HISTORY_FORMAT = 'conjoint-benchmark-history'
+HISTORY_VERSION = 1
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_history.json')
+
+PHASES = ['ingest', 'design', 'fit', 'aggregate', 'serialize']
+
+# Larger studies do not fit in memory as JSON rows; they are read from a columnar store
+JSON_INGEST_MAX_RESPONDENTS = 10000
+
+# Most informative attributes first, so smaller studies keep the main effects
+ATTRIBUTE_ORDER = ['brand', 'price', 'storage', 'camera', 'battery_life', 'screen_size']
+
+# Relative increase over the baseline that counts as a regression
+REGRESSION_THRESHOLDS = {
+    "time": 0.15,
+    "peak_memory_mb": 0.10,
+    "iterations": 0.05
+}
+# Timing differences below this many seconds are treated as noise
+MIN_TIME_DELTA = 0.005
+BASELINE_RUNS = 5
+
+
+def case(respondents, tasks=12, attributes=6, fit_sample=None):
+    return {
+        "name": f"r{respondents}_t{tasks}_a{attributes}",
+        "respondents": respondents,
+        "tasks": tasks,
+        "attributes": attributes,
+        "fit_sample": fit_sample
+    }
+
+
+SUITES = {
+    "quick": [
+        case(100, fit_sample=25)
+    ],
+    "standard": [
+        case(100),
+        case(1000, fit_sample=100),
+        case(1000, tasks=6, fit_sample=100),
+        case(1000, tasks=24, fit_sample=100),
+        case(1000, attributes=3, fit_sample=100)
+    ],
+    "full": [
+        case(100),
+        case(1000),
+        case(1000, tasks=6),
+        case(1000, tasks=24),
+        case(1000, attributes=3),
+        case(10000, fit_sample=500),
+        case(100000, fit_sample=500)
+    ]
+}
+
+
+def generate_study(respondents, tasks=12, attributes=6, seed=42):
+    """Generate a smartphone CBC study as columns of CSV strings plus its estimation settings.
+
+    Rows are produced one respondent at a time and repeated values share
+    one string object, so 100k respondents fit in memory.
+    """
+    keep = ATTRIBUTE_ORDER[:attributes]
+    names = ['respondent_id', 'task_id', 'alternative_id', 'chosen'] + keep
+    columns = {name: [] for name in names}
+    shared = {}
+
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(1, respondents + 1):
+            rows, _ = generate_smartphone_data.generate_respondent_data(f'R{i:03d}', tasks)
+            for row in rows:
+                for name in names:
+                    value = row[name]
+                    columns[name].append(shared.setdefault(value, value))
+
+    settings = STUDIES['smartphone_cbc.csv']
+    metadata = {k: v for k, v in settings['attribute_metadata'].items() if k in keep}
+    return columns, {
+        "attribute_metadata": metadata,
+        "none_alternative_id": settings['none_alternative_id'],
+        "competitor_alternative_ids": settings['competitor_alternative_ids']
+    }
+
+
+def columns_to_json(columns):
+    """JSON rows, as the app passes them to run_conjoint_estimation."""
+    names = list(columns)
+    return json.dumps([dict(zip(names, values)) for values in zip(*(columns[n] for n in names))])
+
+
+def fit_sample_ids(respondent_ids, fit_sample):
+    """Evenly spaced respondents to fit (all of them when fit_sample is falsy or large enough)."""
+    if not fit_sample or fit_sample >= len(respondent_ids):
+        return list(respondent_ids)
+    positions = np.linspace(0, len(respondent_ids) - 1, fit_sample).round().astype(int)
+    return [respondent_ids[p] for p in positions]
+
+
+def run_pipeline(source, settings, fit_ids, n_respondents, reg_strength=1.0, n_bootstrap=1000):
+    """Run the engine's estimation steps once; returns (phase seconds, respondents_results, failed_respondents).
+
+    Design and fit are the engine's own estimate_respondents, timed by its
+    EstimationTrace spans, so a change to the engine shows up here.
+    """
+    trace = conjoint_engine.EstimationTrace()
+
+    with trace.span('ingest'):
+        if source['kind'] == 'json':
+            data = pd.DataFrame(json.loads(source['data_json']))
+        else:
+            data = conjoint_engine.cbc_store_to_frame(conjoint_engine.load_cbc_store(source['path']))
+
+    respondents_results, failed_respondents = conjoint_engine.estimate_respondents(
+        data, settings['attribute_metadata'], settings['none_alternative_id'],
+        settings['competitor_alternative_ids'], reg_strength, trace, respondent_ids=fit_ids
+    )
+    del data
+
+    # A fitted sample stands in for the whole study in the aggregate steps
+    fitted = respondents_results
+    if respondents_results and len(fit_ids) < n_respondents:
+        scale = n_respondents / len(fit_ids)
+        fitted = [copy.deepcopy(respondents_results[i % len(respondents_results)])
+                  for i in range(int(round(len(respondents_results) * scale)))]
+
+    result = conjoint_engine.summarize_estimation(fitted, failed_respondents, time.time(), n_bootstrap, trace)
+    with trace.span('serialize'):
+        json.dumps(result)
+
+    phases = {phase: trace.phases[phase] for phase in PHASES}
+    # summarize_estimation spans the bootstrap separately; the aggregate phase is both
+    phases['aggregate'] += trace.phases['bootstrap']
+    return phases, respondents_results, failed_respondents
+
+
+def engine_only(csv_path, repeat=1, n_bootstrap=1000):
+    """Time the engine on a scenario CSV with the entry point the browser uses.
+
+    Rows are passed as the page's buildEstimationPayload builds them, to
+    conjoint_engine.benchmark_estimation_json; benchmarkConjointEngine()
+    in the page's console runs the same function in Pyodide on the same file.
+    """
+    settings = STUDIES[os.path.basename(csv_path)]
+    attributes = list(settings['attribute_metadata'])
+    data = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    data['chosen'] = pd.to_numeric(data['chosen']).astype(int)
+    data_json = data[['respondent_id', 'task_id', 'alternative_id', 'chosen'] + attributes].to_json(orient='records')
+    return json.loads(conjoint_engine.benchmark_estimation_json(
+        data_json, json.dumps(settings['attribute_metadata']), settings['none_alternative_id'],
+        json.dumps(settings['competitor_alternative_ids']), 1.0, n_bootstrap, repeat
+    ))
+
+
+def run_case(spec, repeat=1, fit_sample=None, n_bootstrap=1000, measure_memory=True, seed=42):
+    """Benchmark one case; returns its metrics record."""
+    columns, settings = generate_study(spec['respondents'], spec['tasks'], spec['attributes'], seed)
+    respondent_ids = list(dict.fromkeys(columns['respondent_id']))
+    n_rows = len(columns['respondent_id'])
+    fit_ids = fit_sample_ids(respondent_ids, spec.get('fit_sample') if fit_sample is None else fit_sample)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(respondent_ids) <= JSON_INGEST_MAX_RESPONDENTS:
+            source = {"kind": "json", "data_json": columns_to_json(columns)}
+        else:
+            source = {"kind": "store", "path": os.path.join(tmp, 'study.npz')}
+            conjoint_engine.save_cbc_store(source['path'], pd.DataFrame(columns))
+        del columns
+
+        runs = []
+        for _ in range(repeat):
+            runs.append(run_pipeline(source, settings, fit_ids, len(respondent_ids), n_bootstrap=n_bootstrap))
+        # Fastest repeat per phase: the least disturbed by the rest of the machine
+        phases = {p: min(run[0][p] for run in runs) for p in PHASES}
+        _, results, failed = runs[0]
+
+        peak_memory_mb = None
+        if measure_memory:
+            tracemalloc.start()
+            run_pipeline(source, settings, fit_ids, len(respondent_ids), n_bootstrap=n_bootstrap)
+            peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+
+    n_fit = len(fit_ids)
+    iterations = [r['convergence']['iterations'] for r in results if r['convergence']['iterations'] is not None]
+    per_respondent_ms = {p: 1000 * phases[p] / n_fit for p in ('design', 'fit')}
+    projected = (phases['ingest'] + phases['aggregate'] + phases['serialize']
+                 + (phases['design'] + phases['fit']) * len(respondent_ids) / n_fit)
+
+    return {
+        "respondents": len(respondent_ids),
+        "tasks": spec['tasks'],
+        "attributes": spec['attributes'],
+        "rows": n_rows,
+        "ingest_source": source['kind'],
+        "fitted_respondents": n_fit,
+        "failed_respondents": len(failed),
+        "repeat": repeat,
+        "phases": phases,
+        "per_respondent_ms": per_respondent_ms,
+        "projected_total_seconds": projected,
+        "iterations": {
+            "mean": float(np.mean(iterations)) if iterations else None,
+            "median": float(np.median(iterations)) if iterations else None,
+            "max": int(max(iterations)) if iterations else None
+        },
+        "converged_share": float(np.mean([r['convergence']['converged'] for r in results])) if results else None,
+        "nelder_mead_share": float(np.mean([r['convergence']['method'] == 'Nelder-Mead' for r in results]))
+        if results else None,
+        "peak_memory_mb": peak_memory_mb
+    }
+
+
+def runtime_info():
+    """Where the numbers come from; only runs with the same key are compared."""
+    info = {
+        "implementation": platform.python_implementation(),
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "pandas": pd.__version__
+    }
+    info["key"] = f"{info['implementation']}-{info['python']}-{info['platform']}-{info['machine']}"
+    return info
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None  # not a git checkout, or git not installed
+
+
+def load_history(path):
+    try:
+        with open(path) as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        return {"format": HISTORY_FORMAT, "version": HISTORY_VERSION, "runs": []}
+    if history.get('format') != HISTORY_FORMAT:
+        raise ValueError(f"{path} is not a conjoint benchmark history")
+    return history
+
+
+def save_history(history, path):
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def comparable_metrics(metrics):
+    """Flat metric name -> (kind, value) used for regression checks."""
+    values = {
+        "ingest": ("time", metrics['phases']['ingest']),
+        "aggregate": ("time", metrics['phases']['aggregate']),
+        "serialize": ("time", metrics['phases']['serialize']),
+        # Design and fit per respondent stay comparable when the fit sample changes
+        "design_per_respondent": ("time", metrics['per_respondent_ms']['design'] / 1000),
+        "fit_per_respondent": ("time", metrics['per_respondent_ms']['fit'] / 1000),
+        "projected_total": ("time", metrics['projected_total_seconds']),
+        "iterations_mean": ("iterations", metrics['iterations']['mean']),
+        "peak_memory_mb": ("peak_memory_mb", metrics['peak_memory_mb'])
+    }
+    return {name: kv for name, kv in values.items() if kv[1] is not None}
+
+
+def find_regressions(history, run):
+    """Compare each case of run with the median of its last BASELINE_RUNS runs on the same runtime."""
+    regressions = []
+    for name, metrics in run['cases'].items():
+        previous = [r['cases'][name] for r in history['runs']
+                    if r['runtime']['key'] == run['runtime']['key'] and name in r['cases']][-BASELINE_RUNS:]
+        if not previous:
+            continue
+        current = comparable_metrics(metrics)
+        for metric, (kind, value) in current.items():
+            past = [comparable_metrics(p).get(metric) for p in previous]
+            past = [v for _, v in filter(None, past)]
+            if not past:
+                continue
+            baseline = statistics.median(past)
+            if baseline <= 0 or (kind == 'time' and value - baseline < MIN_TIME_DELTA):
+                continue
+            change = value / baseline - 1
+            if change > REGRESSION_THRESHOLDS[kind]:
+                regressions.append({
+                    "case": name, "metric": metric, "baseline": baseline, "value": value, "change": change
+                })
+    return regressions
+
+
+def run_suite(cases, repeat=1, fit_sample=None, n_bootstrap=1000, measure_memory=True, log=print):
+    """Run the given case specs; returns a history run record (not saved)."""
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "commit": git_commit(),
+        "runtime": runtime_info(),
+        "settings": {"repeat": repeat, "n_bootstrap": n_bootstrap},
+        "cases": {}
+    }
+    for spec in cases:
+        log(f"{spec['name']}: generating and timing...")
+        metrics = run_case(spec, repeat, fit_sample, n_bootstrap, measure_memory)
+        run['cases'][spec['name']] = metrics
+        log(format_case(spec['name'], metrics))
+    return run
+
+
+def format_case(name, m):
+    lines = [
+        f"  {name}: {m['rows']} rows, fitted {m['fitted_respondents']}/{m['respondents']} "
+        f"({m['ingest_source']} ingest)",
+        "    " + '  '.join(f"{p} {m['phases'][p]:.3f}s" for p in PHASES),
+        f"    per respondent: design {m['per_respondent_ms']['design']:.1f} ms, "
+        f"fit {m['per_respondent_ms']['fit']:.1f} ms"
+    ]
+    if m['iterations']['mean'] is not None:
+        lines[-1] += f", {m['iterations']['mean']:.1f} iterations"
+    memory = f"{m['peak_memory_mb']:.0f} MB" if m['peak_memory_mb'] is not None else 'n/a'
+    lines.append(f"    projected total {m['projected_total_seconds']:.1f}s, peak memory {memory}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conjoint estimation engine phase by phase.")
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--cases', nargs='+', default=None, help='Only run these case names from the suite')
+    parser.add_argument('--repeat', type=int, default=1, help='Repeats per case (fastest phase times are kept)')
+    parser.add_argument('--fit-sample', type=int, default=None,
+                        help="Respondents to fit per case (0 = all; default: the suite's setting)")
+    parser.add_argument('--bootstrap', type=int, default=1000, help='Bootstrap draws in the aggregate phase')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced peak-memory pass')
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--no-record', action='store_true', help='Do not append this run to the history')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 if any metric regressed')
+    parser.add_argument('--engine-only', default=None, metavar='CSV',
+                        help='Only time the engine on this scenario CSV, as benchmarkConjointEngine() does in the browser')
+    args = parser.parse_args()
+
+    if args.engine_only:
+        timing = engine_only(args.engine_only, args.repeat, args.bootstrap)
+        runtime = timing['runtime']
+        print(f"{args.engine_only}: {timing['respondents']} respondents on {runtime['implementation']} "
+              f"{runtime['python']} ({runtime['platform']}), fastest of {timing['repeat']}")
+        print("  " + '  '.join(f"{phase} {seconds:.3f}s" for phase, seconds in timing['phases'].items()))
+        print(f"  per respondent: design {timing['per_respondent_ms']['design']:.1f} ms, "
+              f"fit {timing['per_respondent_ms']['fit']:.1f} ms")
+        return
+
+    cases = SUITES[args.suite]
+    if args.cases:
+        unknown = set(args.cases) - {c['name'] for c in cases}
+        if unknown:
+            parser.error(f"Unknown cases for suite {args.suite}: {', '.join(sorted(unknown))}")
+        cases = [c for c in cases if c['name'] in args.cases]
+
+    history = load_history(args.history)
+    run = run_suite(cases, args.repeat, args.fit_sample, args.bootstrap, not args.no_memory)
+    run['suite'] = args.suite
+
+    regressions = find_regressions(history, run)
+    for r in regressions:
+        print(f"✗ {r['case']} {r['metric']}: {r['value']:.4g} vs baseline {r['baseline']:.4g} "
+              f"(+{100 * r['change']:.0f}%)")
+    if not regressions:
+        print("✓ No regressions against the history")
+
+    if not args.no_record:
+        history['runs'].append(run)
+        save_history(history, args.history)
+        print(f"✓ Recorded run in {args.history}")
+
+    if args.check and regressions:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Convert CBC studies between CSV and the engine's memory-mappable columnar store.
+
+The store format (save_cbc_store / load_cbc_store in CONJOINT_PYTHON_CODE)
+keeps int, float and dictionary-coded columns as .npy arrays, either in an
+uncompressed .npz or in a directory, plus respondent row offsets. Loading
+only maps the files, so several processes reading the same study share the
+page cache instead of each parsing the CSV.
+
+Usage:
+    python cbc_store.py smartphone_cbc.csv smartphone_cbc.npz   # CSV -> store
+    python cbc_store.py smartphone_cbc.npz smartphone_cbc.csv   # store -> CSV
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+import conjoint_engine
+
+
+def rows_to_frame(rows, columns=None):
+    """DataFrame of CSV text from generator rows (dicts) or a DataFrame, as csv/to_csv would write it."""
+    frame = pd.DataFrame(rows, columns=columns)
+    return frame.astype(object).where(frame.notna(), '').astype(str)
+
+
+def write_cbc_store(rows, path, columns=None):
+    """Write generator output straight to a store next to the CSV."""
+    frame = rows_to_frame(rows, columns)
+    conjoint_engine.save_cbc_store(path, frame)
+    print(f"✓ Saved {len(frame)} rows to {path}")
+
+
+def is_store(path):
+    return str(path).endswith('.npz') or os.path.isdir(path)
+
+
+def csv_to_store(csv_path, store_path):
+    data = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    conjoint_engine.save_cbc_store(store_path, data)
+    return len(data)
+
+
+def store_to_csv(store_path, csv_path):
+    data = conjoint_engine.cbc_store_to_frame(conjoint_engine.load_cbc_store(store_path))
+    data.to_csv(csv_path, index=False)
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert CBC data between CSV and the columnar store.")
+    parser.add_argument('source', help='CSV file, .npz store or store directory')
+    parser.add_argument('target', help='Output path; .csv writes CSV, .npz or a directory writes a store')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if is_store(args.source):
+        n_rows = store_to_csv(args.source, args.target)
+    else:
+        n_rows = csv_to_store(args.source, args.target)
+    print(f"✓ Converted {n_rows} rows: {args.source} -> {args.target} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
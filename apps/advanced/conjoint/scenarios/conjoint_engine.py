@@ -0,0 +1,32 @@
+"""
+Load the browser conjoint estimation engine into CPython.
+
+The engine lives in conjoint_app.js as the CONJOINT_PYTHON_CODE template
+string that Pyodide runs in the browser. This module extracts that exact
+source and executes it into its own namespace, so local scripts (the
+estimation service, benchmarks) run the same code the students run:
+
+    import conjoint_engine
+    result_json = conjoint_engine.run_conjoint_estimation(...)
+
+Requires numpy, scipy and pandas (the packages the app loads into Pyodide).
+"""
+
+import re
+from pathlib import Path
+
+ENGINE_JS_PATH = Path(__file__).resolve().parent.parent / 'conjoint_app.js'
+
+_ENGINE_PATTERN = re.compile(r"const CONJOINT_PYTHON_CODE = `(.*?)`;", re.S)
+
+
+def load_engine_source(js_path=ENGINE_JS_PATH):
+    """Return the Python source embedded in conjoint_app.js."""
+    text = Path(js_path).read_text(encoding='utf-8')
+    match = _ENGINE_PATTERN.search(text)
+    if match is None:
+        raise RuntimeError(f"CONJOINT_PYTHON_CODE not found in {js_path}")
+    return match.group(1)
+
+
+exec(compile(load_engine_source(), str(ENGINE_JS_PATH), 'exec'), globals())
@@ -1,14 +1,14 @@
 import pandas as pd
 
-# Read the full dataset
-df = pd.read_csv('smartphone_cbc.csv')
+from respondent_index import load_index, write_respondents
 
-# Get first 20 respondents
-respondent_ids = [f'R{str(i).zfill(3)}' for i in range(1, 21)]
-small = df[df['respondent_id'].isin(respondent_ids)]
+# Index respondents' byte ranges (one pass, cached in smartphone_cbc.csv.idx.json)
+index = load_index('smartphone_cbc.csv')
 
-# Save to new file
-small.to_csv('smartphone_cbc_small.csv', index=False)
+# Copy the first 20 respondents' rows straight from their offsets
+respondent_ids = [f'R{str(i).zfill(3)}' for i in range(1, 21)]
+write_respondents('smartphone_cbc.csv', respondent_ids, 'smartphone_cbc_small.csv', index)
+small = pd.read_csv('smartphone_cbc_small.csv')
 
 print(f'Created small dataset:')
 print(f'  - Total rows: {len(small)}')
@@ -1,19 +1,43 @@
 """
 Generate realistic CBC (Choice-Based Conjoint) datasets for teaching conjoint analysis.
 Creates two scenarios: smartphone choice and streaming service choice.
+
+Run without options to recreate the classroom files from the global seed.
+With --chunked, respondents are split into fixed-size chunks, each drawn
+from its own generators seeded by SeedSequence(seed).spawn(); chunks are
+generated in a process pool and streamed to the CSV in order. The output
+depends only on --seed and --chunk-size (not on --workers), memory stays
+at a few chunks, and adding respondents leaves the earlier chunks unchanged:
+
+    python generate_cbc_data.py --chunked --study smartphone --respondents 100000 --workers 4
 """
+import argparse
 import random
 import csv
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-from itertools import product
+
+from ground_truth import save_truth, truth_path, truth_record
 
 random.seed(42)  # For reproducibility
 np.random.seed(42)
 
-def generate_smartphone_cbc():
+SMARTPHONE_FIELDS = ['respondent_id', 'task_id', 'alternative_id', 'chosen', 'brand',
+                     'screen_size', 'storage', 'battery_life', 'camera', 'price']
+STREAMING_FIELDS = ['respondent_id', 'task_id', 'alternative_id', 'chosen', 'library_size',
+                    'original_content', 'ad_experience', 'simultaneous_streams', 'video_quality', 'price']
+
+def generate_smartphone_cbc(n_respondents=150, py_rng=random, np_rng=np.random, first_id=1, truth=None):
     """
     Generate smartphone CBC study data.
     150 respondents, 12 tasks each, 3-4 alternatives per task.
+    
+    py_rng and np_rng default to the global random and np.random state;
+    chunked generation passes its own random.Random and np.random.Generator.
+    If truth is a list, each respondent's true parameters are appended to it.
     """
     
     # Define attribute levels
@@ -55,17 +79,33 @@ def generate_smartphone_cbc():
     
     data = []
     
-    for resp_id in range(1, 151):  # 150 respondents
+    for resp_id in range(first_id, first_id + n_respondents):
         # Add individual heterogeneity
         individual_utils = {}
         for key, val in base_utilities.items():
             if key == 'price_coef':
                 # Price sensitivity varies (more negative = more sensitive)
-                individual_utils[key] = val + random.gauss(0, 0.0015)
+                individual_utils[key] = val + py_rng.gauss(0, 0.0015)
             elif key.startswith('ASC_'):
-                individual_utils[key] = val + random.gauss(0, 1.0)
+                individual_utils[key] = val + py_rng.gauss(0, 1.0)
             else:
-                individual_utils[key] = val + random.gauss(0, 0.3)
+                individual_utils[key] = val + py_rng.gauss(0, 0.3)
+        if truth is not None:
+            # Brand lookups use 'brand_<level>' keys, which base_utilities lacks,
+            # so every brand contributes BrandX's utility
+            truth.append(truth_record(
+                f'R{resp_id:03d}', None,
+                partworths={
+                    'brand': {b: individual_utils['BrandX'] for b in brands},
+                    'screen_size': {str(x): individual_utils.get(f"screen_{x}", 0) for x in screens},
+                    'storage': {str(x): individual_utils.get(f"storage_{x}", 0) for x in storage},
+                    'battery_life': {str(x): individual_utils.get(f"battery_{x}", 0) for x in battery},
+                    'camera': {c: individual_utils.get(f"camera_{c}", 0) for c in camera}
+                },
+                slopes={'price': individual_utils['price_coef']},
+                constants={'None': individual_utils['ASC_None'],
+                           **{c['brand']: individual_utils[f"ASC_{c['brand']}"] for c in competitors}}
+            ))
         
         for task_id in range(1, 13):  # 12 tasks
             # Generate 3 experimental alternatives
@@ -76,17 +116,17 @@ def generate_smartphone_cbc():
                     'respondent_id': f'R{resp_id:03d}',
                     'task_id': task_id,
                     'alternative_id': alt_id,
-                    'brand': random.choice(brands),
-                    'screen_size': random.choice(screens),
-                    'storage': random.choice(storage),
-                    'battery_life': random.choice(battery),
-                    'camera': random.choice(camera),
-                    'price': random.choice(prices)
+                    'brand': py_rng.choice(brands),
+                    'screen_size': py_rng.choice(screens),
+                    'storage': py_rng.choice(storage),
+                    'battery_life': py_rng.choice(battery),
+                    'camera': py_rng.choice(camera),
+                    'price': py_rng.choice(prices)
                 }
                 alternatives.append(alt)
             
             # Sometimes include None option
-            if random.random() < 0.7:
+            if py_rng.random() < 0.7:
                 alternatives.append({
                     'respondent_id': f'R{resp_id:03d}',
                     'task_id': task_id,
@@ -100,8 +140,8 @@ def generate_smartphone_cbc():
                 })
             
             # Sometimes include a competitor
-            if random.random() < 0.3:
-                comp = random.choice(competitors)
+            if py_rng.random() < 0.3:
+                comp = py_rng.choice(competitors)
                 alternatives.append({
                     'respondent_id': f'R{resp_id:03d}',
                     'task_id': task_id,
@@ -132,7 +172,7 @@ def generate_smartphone_cbc():
                     u += individual_utils['price_coef'] * alt['price']
                 
                 # Add Gumbel noise for choice
-                u += np.random.gumbel(0, 1)
+                u += np_rng.gumbel(0, 1)
                 utilities.append(u)
             
             # Choose alternative with max utility
@@ -146,7 +186,7 @@ def generate_smartphone_cbc():
     return data
 
 
-def generate_streaming_cbc():
+def generate_streaming_cbc(n_respondents=200, py_rng=random, np_rng=np.random, first_id=1, truth=None):
     """
     Generate streaming service CBC study data.
     200 respondents, 10 tasks each, 3-4 alternatives per task.
@@ -191,16 +231,30 @@ def generate_streaming_cbc():
     
     data = []
     
-    for resp_id in range(1, 201):  # 200 respondents
+    for resp_id in range(first_id, first_id + n_respondents):
         # Add individual heterogeneity
         individual_utils = {}
         for key, val in base_utilities.items():
             if key == 'price_coef':
-                individual_utils[key] = val + random.gauss(0, 0.05)
+                individual_utils[key] = val + py_rng.gauss(0, 0.05)
             elif key.startswith('ASC_'):
-                individual_utils[key] = val + random.gauss(0, 0.8)
+                individual_utils[key] = val + py_rng.gauss(0, 0.8)
             else:
-                individual_utils[key] = val + random.gauss(0, 0.4)
+                individual_utils[key] = val + py_rng.gauss(0, 0.4)
+        if truth is not None:
+            truth.append(truth_record(
+                f'S{resp_id:03d}', None,
+                partworths={
+                    'library_size': {x: individual_utils.get(f"library_{x}", 0) for x in library_sizes},
+                    'original_content': {x: individual_utils.get(f"originals_{x}", 0) for x in originals},
+                    'ad_experience': {x: individual_utils.get(f"ad_free_{x}", 0) for x in ad_free},
+                    'simultaneous_streams': {str(x): individual_utils.get(f"streams_{x}", 0) for x in streams},
+                    'video_quality': {x: individual_utils.get(f"quality_{x}", 0) for x in quality}
+                },
+                slopes={'price': individual_utils['price_coef']},
+                constants={'None': individual_utils['ASC_None'],
+                           **{c['service']: individual_utils[f"ASC_{c['service']}"] for c in competitors}}
+            ))
         
         for task_id in range(1, 11):  # 10 tasks
             alternatives = []
@@ -211,17 +265,17 @@ def generate_streaming_cbc():
                     'respondent_id': f'S{resp_id:03d}',
                     'task_id': task_id,
                     'alternative_id': alt_id,
-                    'library_size': random.choice(library_sizes),
-                    'original_content': random.choice(originals),
-                    'ad_experience': random.choice(ad_free),
-                    'simultaneous_streams': random.choice(streams),
-                    'video_quality': random.choice(quality),
-                    'price': random.choice(prices)
+                    'library_size': py_rng.choice(library_sizes),
+                    'original_content': py_rng.choice(originals),
+                    'ad_experience': py_rng.choice(ad_free),
+                    'simultaneous_streams': py_rng.choice(streams),
+                    'video_quality': py_rng.choice(quality),
+                    'price': py_rng.choice(prices)
                 }
                 alternatives.append(alt)
             
             # Sometimes include None option
-            if random.random() < 0.8:
+            if py_rng.random() < 0.8:
                 alternatives.append({
                     'respondent_id': f'S{resp_id:03d}',
                     'task_id': task_id,
@@ -235,8 +289,8 @@ def generate_streaming_cbc():
                 })
             
             # Sometimes include a competitor
-            if random.random() < 0.25:
-                comp = random.choice(competitors)
+            if py_rng.random() < 0.25:
+                comp = py_rng.choice(competitors)
                 alternatives.append({
                     'respondent_id': f'S{resp_id:03d}',
                     'task_id': task_id,
@@ -267,7 +321,7 @@ def generate_streaming_cbc():
                     u += individual_utils['price_coef'] * alt['price']
                 
                 # Add Gumbel noise for choice
-                u += np.random.gumbel(0, 1)
+                u += np_rng.gumbel(0, 1)
                 utilities.append(u)
             
             # Choose alternative with max utility
@@ -281,6 +335,76 @@ def generate_streaming_cbc():
     return data
 
 
+STUDY_GENERATORS = {
+    'smartphone': (generate_smartphone_cbc, SMARTPHONE_FIELDS, 'smartphone_cbc.csv'),
+    'streaming': (generate_streaming_cbc, STREAMING_FIELDS, 'streaming_service_cbc.csv')
+}
+# Competitor rows carry attribute levels, but their utility is only the ASC plus price
+FIXED_PROFILE_ALTERNATIVES = {
+    'smartphone': ['iPhone', 'Samsung'],
+    'streaming': ['Netflix', 'DisneyPlus']
+}
+
+
+def chunk_generators(seed_seq):
+    """Independent random.Random and np.random.Generator for one chunk."""
+    py_seq, np_seq = seed_seq.spawn(2)
+    py_rng = random.Random(int.from_bytes(py_seq.generate_state(4).tobytes(), 'little'))
+    return py_rng, np.random.default_rng(np_seq)
+
+
+def generate_chunk(study, first_id, n_respondents, seed_seq, with_truth=False):
+    """Rows for respondents first_id .. first_id + n_respondents - 1, drawn only from seed_seq.
+    
+    Returns (rows, truth records or None).
+    """
+    generate = STUDY_GENERATORS[study][0]
+    py_rng, np_rng = chunk_generators(seed_seq)
+    truth = [] if with_truth else None
+    return generate(n_respondents, py_rng, np_rng, first_id, truth), truth
+
+
+def iter_chunks(study, n_respondents, seed=42, chunk_size=1000, n_workers=1, with_truth=False):
+    """Yield (rows, truth) chunks in respondent order; chunk k always uses child k of SeedSequence(seed)."""
+    starts = list(range(1, n_respondents + 1, chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    args = [(study, start, min(chunk_size, n_respondents + 1 - start), seed_seq, with_truth)
+            for start, seed_seq in zip(starts, seeds)]
+    
+    if n_workers <= 1:
+        for chunk_args in args:
+            yield generate_chunk(*chunk_args)
+        return
+    
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        in_flight = deque()
+        for chunk_args in args:
+            in_flight.append(pool.submit(generate_chunk, *chunk_args))
+            # Bound the finished chunks waiting to be written, keeping file order
+            if len(in_flight) >= 2 * n_workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def write_chunked(study, n_respondents, filename, seed=42, chunk_size=1000, n_workers=1, with_truth=False):
+    """Stream a chunked study to filename; returns the number of rows written."""
+    fieldnames = STUDY_GENERATORS[study][1]
+    n_rows = 0
+    truth = [] if with_truth else None
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for rows, chunk_truth in iter_chunks(study, n_respondents, seed, chunk_size, n_workers, with_truth):
+            writer.writerows(rows)
+            n_rows += len(rows)
+            if truth is not None:
+                truth.extend(chunk_truth)
+    if truth is not None:
+        save_truth(truth_path(filename), filename, truth, FIXED_PROFILE_ALTERNATIVES[study])
+    return n_rows
+
+
 def save_to_csv(data, filename, fieldnames):
     """Save data to CSV file."""
     with open(filename, 'w', newline='', encoding='utf-8') as f:
@@ -290,25 +414,67 @@ def save_to_csv(data, filename, fieldnames):
     print(f"✓ Saved {len(data)} rows to {filename}")
 
 
-if __name__ == '__main__':
-    print("Generating smartphone CBC dataset...")
-    smartphone_data = generate_smartphone_cbc()
-    save_to_csv(
-        smartphone_data,
-        'smartphone_cbc.csv',
-        ['respondent_id', 'task_id', 'alternative_id', 'chosen', 'brand', 
-         'screen_size', 'storage', 'battery_life', 'camera', 'price']
-    )
+def main():
+    parser = argparse.ArgumentParser(description="Generate the smartphone and streaming CBC datasets.")
+    parser.add_argument('--chunked', action='store_true',
+                        help='Seeded, chunked generation streamed to disk (see module docstring)')
+    parser.add_argument('--study', choices=['smartphone', 'streaming', 'both'], default='both')
+    parser.add_argument('--respondents', type=int, default=None,
+                        help='Respondents per study with --chunked (default: 150 smartphone, 200 streaming)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Respondents per chunk')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--store', action='store_true', help='Also write memory-mappable columnar copies')
+    parser.add_argument('--truth', action='store_true',
+                        help='Also write true per-respondent parameters (<study>_truth.json)')
+    args = parser.parse_args()
     
-    print("\nGenerating streaming service CBC dataset...")
-    streaming_data = generate_streaming_cbc()
-    save_to_csv(
-        streaming_data,
-        'streaming_service_cbc.csv',
-        ['respondent_id', 'task_id', 'alternative_id', 'chosen', 'library_size',
-         'original_content', 'ad_experience', 'simultaneous_streams', 'video_quality', 'price']
-    )
+    studies = ['smartphone', 'streaming'] if args.study == 'both' else [args.study]
+    
+    if args.chunked:
+        for study in studies:
+            filename = STUDY_GENERATORS[study][2]
+            n_respondents = args.respondents or {'smartphone': 150, 'streaming': 200}[study]
+            start = time.perf_counter()
+            n_rows = write_chunked(study, n_respondents, filename, args.seed, args.chunk_size, args.workers,
+                                   args.truth)
+            print(f"✓ Saved {n_rows} rows ({n_respondents} respondents) to {filename} "
+                  f"in {time.perf_counter() - start:.1f}s")
+            if args.store:
+                from cbc_store import csv_to_store
+                csv_to_store(filename, filename.replace('.csv', '.npz'))
+        return
+    
+    truth = {study: [] if args.truth else None for study in studies}
+    if 'smartphone' in studies:
+        print("Generating smartphone CBC dataset...")
+        smartphone_data = generate_smartphone_cbc(truth=truth['smartphone'])
+        save_to_csv(smartphone_data, 'smartphone_cbc.csv', SMARTPHONE_FIELDS)
+    
+    if 'streaming' in studies:
+        print("\nGenerating streaming service CBC dataset...")
+        streaming_data = generate_streaming_cbc(truth=truth['streaming'])
+        save_to_csv(streaming_data, 'streaming_service_cbc.csv', STREAMING_FIELDS)
+    
+    if args.truth:
+        for study in studies:
+            filename = STUDY_GENERATORS[study][2]
+            save_truth(truth_path(filename), filename, truth[study], FIXED_PROFILE_ALTERNATIVES[study])
+    
+    # Optional memory-mappable columnar copies (python generate_cbc_data.py --store)
+    if args.store:
+        from cbc_store import write_cbc_store
+        if 'smartphone' in studies:
+            write_cbc_store(smartphone_data, 'smartphone_cbc.npz', SMARTPHONE_FIELDS)
+        if 'streaming' in studies:
+            write_cbc_store(streaming_data, 'streaming_service_cbc.npz', STREAMING_FIELDS)
     
     print("\n✓ All datasets generated successfully!")
-    print(f"  - Smartphone: {len(smartphone_data)} observations")
-    print(f"  - Streaming: {len(streaming_data)} observations")
+    if 'smartphone' in studies:
+        print(f"  - Smartphone: {len(smartphone_data)} observations")
+    if 'streaming' in studies:
+        print(f"  - Streaming: {len(streaming_data)} observations")
+
+
+if __name__ == '__main__':
+    main()
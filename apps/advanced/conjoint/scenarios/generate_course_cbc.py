@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 import random
+import sys
+
+from ground_truth import save_truth, truth_path, truth_record
 
 # Set seed for reproducibility
 np.random.seed(42)
@@ -65,6 +68,18 @@ for i in range(n_respondents):
     
     respondent_params.append(params)
 
+# True parameters per respondent (written with --truth)
+segment_names = ['traditional', 'project_based', 'flexible_online', 'time_constrained']
+truth = [
+    truth_record(
+        f'S{str(i + 1).zfill(3)}', segment_names[i % 4],
+        partworths={'course_format': dict(p['course_format']), 'assessment_style': dict(p['assessment_style'])},
+        slopes={'weekly_hours': p['weekly_hours']},
+        constants={'None': p['asc_none']}
+    )
+    for i, p in enumerate(respondent_params)
+]
+
 # Generate CBC data
 data = []
 
@@ -132,6 +147,15 @@ df = pd.DataFrame(data)
 # Save to CSV
 df.to_csv('course_design_cbc.csv', index=False)
 
+# Optional memory-mappable columnar copy (python generate_course_cbc.py --store)
+if '--store' in sys.argv:
+    from cbc_store import write_cbc_store
+    write_cbc_store(df, 'course_design_cbc.npz')
+
+# Optional ground truth for recovery benchmarks (python generate_course_cbc.py --truth)
+if '--truth' in sys.argv:
+    save_truth(truth_path('course_design_cbc.csv'), 'course_design_cbc.csv', truth)
+
 print(f'Generated Marketing Research Course CBC dataset:')
 print(f'  - Total rows: {len(df)}')
 print(f'  - Respondents: {df["respondent_id"].nunique()}')
@@ -8,10 +8,21 @@ Key design principles:
 4. Interesting patterns for analysis - clear brand effects, price elasticity, interactions
 """
 
+import argparse
 import csv
 import random
 import math
+import sys
+import time
 from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from conjoint_validation import profile_rows
+from ground_truth import save_truth, truth_path, truth_record
 
 # Set seed for reproducibility
 random.seed(42)
@@ -211,8 +222,35 @@ def simulate_choice(alternatives, segment_props, individual_noise):
     chosen_idx = utilities.index(max(utilities))
     return chosen_idx
 
-def generate_respondent_data(respondent_id, n_tasks=12):
-    """Generate all choice data for one respondent."""
+def true_partworths(respondent_id, seg_name, segment_props, individual_noise):
+    """Ground-truth record (ground_truth.truth_record) of the utility calculate_utility applies.
+
+    Price enters as PRICE_COEF per $100 relative to $499; shifting every
+    alternative by 499 x slope leaves a plain per-dollar slope and moves the
+    offset into the None constant.
+    """
+    brand_mult = segment_props['brand_multiplier']
+    feature_mult = segment_props['feature_multiplier']
+    price_slope = PRICE_COEF / 100 * segment_props['price_multiplier'] * (1 + individual_noise['price'])
+    
+    def levels(table, mult, key):
+        return {str(level): util * mult * (1 + individual_noise[key]) for level, util in table.items()}
+    
+    return truth_record(
+        respondent_id, seg_name,
+        partworths={
+            'brand': levels(BRAND_UTILS, brand_mult, 'brand'),
+            'screen_size': levels(SCREEN_UTILS, feature_mult, 'screen'),
+            'storage': levels(STORAGE_UTILS, feature_mult, 'storage'),
+            'battery_life': levels(BATTERY_UTILS, feature_mult, 'battery'),
+            'camera': levels(CAMERA_UTILS, feature_mult, 'camera')
+        },
+        slopes={'price': price_slope},
+        constants={'None': NONE_UTILITY + 499 * price_slope}
+    )
+
+def generate_respondent_data(respondent_id, n_tasks=12, truth=None):
+    """Generate all choice data for one respondent; appends its true parameters to truth if given."""
     # Assign segment and individual heterogeneity
     seg_name, segment_props = assign_segment()
     
@@ -225,6 +263,8 @@ def generate_respondent_data(respondent_id, n_tasks=12):
         'camera': random.gauss(0, 0.2),
         'price': random.gauss(0, 0.15)
     }
+    if truth is not None:
+        truth.append(true_partworths(respondent_id, seg_name, segment_props, individual_noise))
     
     rows = []
     
@@ -255,14 +295,14 @@ def generate_respondent_data(respondent_id, n_tasks=12):
     
     return rows, seg_name
 
-def generate_dataset(n_respondents=250, n_tasks=12):
+def generate_dataset(n_respondents=250, n_tasks=12, truth=None):
     """Generate complete CBC dataset."""
     all_rows = []
     segment_counts = Counter()
     
     for i in range(1, n_respondents + 1):
         respondent_id = f'R{i:03d}'
-        rows, segment = generate_respondent_data(respondent_id, n_tasks)
+        rows, segment = generate_respondent_data(respondent_id, n_tasks, truth)
         all_rows.extend(rows)
         segment_counts[segment] += 1
         
@@ -271,59 +311,238 @@ def generate_dataset(n_respondents=250, n_tasks=12):
     
     return all_rows, segment_counts
 
+# =============================================================================
+# VECTORIZED GENERATION
+# The same model as generate_respondent_data, drawn for a whole block of
+# respondents at once: level indices are integer arrays, utilities are
+# gathers from the part-worth tables below, and choices are one argmax over
+# Gumbel-perturbed utilities. Draws come from a NumPy Generator, so the
+# output is reproducible for a seed but differs from the random-module path.
+# =============================================================================
+
+MAX_PRODUCTS = 4
+ALTERNATIVE_LABELS = ['A', 'B', 'C', 'D', 'None']  # product slots, then the opt-out
+SEGMENT_NAMES = list(SEGMENTS)
+SEGMENT_CUMULATIVE = np.cumsum([SEGMENTS[s]['proportion'] for s in SEGMENT_NAMES])
+SEGMENT_MULTIPLIERS = np.array([
+    [SEGMENTS[s]['brand_multiplier'], SEGMENTS[s]['price_multiplier'], SEGMENTS[s]['feature_multiplier']]
+    for s in SEGMENT_NAMES
+])
+NOISE_SCALES = np.array([0.2, 0.2, 0.2, 0.2, 0.2, 0.15])
+NOISE_KEYS = ['brand', 'screen', 'storage', 'battery', 'camera', 'price']  # individual_noise keys, in column order
+
+# Attribute -> (CSV level strings, part-worth per level); price is per level relative to $499
+LEVEL_TABLES = {
+    'brand': (BRANDS, [BRAND_UTILS[b] for b in BRANDS]),
+    'screen_size': ([str(x) for x in SCREEN_SIZES], [SCREEN_UTILS[x] for x in SCREEN_SIZES]),
+    'storage': ([str(x) for x in STORAGE], [STORAGE_UTILS[x] for x in STORAGE]),
+    'battery_life': ([str(x) for x in BATTERY_LIFE], [BATTERY_UTILS[x] for x in BATTERY_LIFE]),
+    'camera': (CAMERA, [CAMERA_UTILS[c] for c in CAMERA]),
+    'price': ([str(x) for x in PRICES], [PRICE_COEF * ((p - 499) / 100) for p in PRICES])
+}
+FEATURE_ATTRIBUTES = ['screen_size', 'storage', 'battery_life', 'camera']
+
+
+def simulate_choice_arrays(n_respondents, n_tasks=12, rng=None):
+    """Vectorized generate_respondent_data for n_respondents at once.
+
+    Returns arrays in task-slot layout: levels[attr] is (respondents, tasks,
+    MAX_PRODUCTS) level indices, present is (respondents, tasks, 5) with the
+    opt-out in the last slot, chosen is the chosen slot per task. segment
+    and noise (columns in NOISE_KEYS order) are each respondent's draws.
+    """
+    rng = np.random.default_rng(rng)
+    shape = (n_respondents, n_tasks, MAX_PRODUCTS)
+
+    segment = np.minimum(np.searchsorted(SEGMENT_CUMULATIVE, rng.random(n_respondents)), len(SEGMENT_NAMES) - 1)
+    brand_mult, price_mult, feature_mult = SEGMENT_MULTIPLIERS[segment].T
+    noise = rng.normal(0.0, NOISE_SCALES, size=(n_respondents, len(NOISE_SCALES)))
+
+    levels = {attr: rng.integers(0, len(names), size=shape, dtype=np.int8)
+              for attr, (names, _) in LEVEL_TABLES.items()}
+    n_products = np.where(rng.random((n_respondents, n_tasks)) < 0.25, 4, 3)
+    has_none = rng.random((n_respondents, n_tasks)) < 0.8
+
+    def partworth(attr):
+        return np.asarray(LEVEL_TABLES[attr][1])[levels[attr]]
+
+    # Per-respondent weight of each attribute: segment multiplier x (1 + individual noise)
+    weight = lambda mult, k: (mult * (1 + noise[:, k]))[:, None, None]
+    utility = partworth('brand') * weight(brand_mult, 0)
+    for k, attr in enumerate(FEATURE_ATTRIBUTES, start=1):
+        utility += partworth(attr) * weight(feature_mult, k)
+    utility += partworth('price') * weight(price_mult, 5)
+
+    none_utility = NONE_UTILITY + rng.normal(0.0, 0.5, size=(n_respondents, n_tasks))
+    utility = np.concatenate([utility, none_utility[..., None]], axis=2)
+    # Gumbel(0, 1) draws as -log of standard exponentials (cheaper than rng.gumbel)
+    utility -= np.log(rng.standard_exponential(size=utility.shape))
+
+    present = np.concatenate([np.arange(MAX_PRODUCTS) < n_products[..., None], has_none[..., None]], axis=2)
+    utility[~present] = -np.inf
+
+    return {
+        "segment": segment,
+        "noise": noise,
+        "levels": levels,
+        "present": present,
+        "chosen": utility.argmax(axis=2)
+    }
+
+
+def choice_arrays_to_frame(sim, respondent_ids, first_code=0):
+    """Long-format DataFrame (categorical columns of the CSV strings) from simulate_choice_arrays.
+
+    respondent_ids are the category labels of every respondent in the study;
+    this block's respondents are respondent_ids[first_code:].
+    """
+    n_respondents, n_tasks, n_slots = sim['present'].shape
+    idx = np.flatnonzero(sim['present'].ravel())
+    resp, task, slot = idx // (n_tasks * n_slots), (idx // n_slots) % n_tasks, idx % n_slots
+
+    def categorical(codes, categories):
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    columns = {
+        'respondent_id': categorical((resp + first_code).astype(np.int32), respondent_ids),
+        'task_id': categorical(task.astype(np.int16), [str(t) for t in range(1, n_tasks + 1)]),
+        'alternative_id': categorical(slot.astype(np.int8), ALTERNATIVE_LABELS),
+        'chosen': categorical((sim['chosen'][resp, task] == slot).astype(np.int8), ['0', '1'])
+    }
+    for attr, (names, _) in LEVEL_TABLES.items():
+        # The opt-out slot gets an extra '' level
+        padded = np.concatenate(
+            [sim['levels'][attr], np.full((n_respondents, n_tasks, 1), len(names), dtype=np.int8)], axis=2
+        )
+        columns[attr] = categorical(padded.ravel()[idx], list(names) + [''])
+    return pd.DataFrame(columns)
+
+
+def choice_arrays_truth(sim, respondent_ids, first_code=0):
+    """Ground-truth records (true_partworths) of one simulate_choice_arrays block."""
+    records = []
+    for i, (seg, noise) in enumerate(zip(sim['segment'], sim['noise'])):
+        seg_name = SEGMENT_NAMES[seg]
+        individual_noise = dict(zip(NOISE_KEYS, noise.tolist()))
+        records.append(true_partworths(respondent_ids[first_code + i], seg_name, SEGMENTS[seg_name], individual_noise))
+    return records
+
+
+def respondent_labels(n_respondents):
+    return pd.Index([f'R{i:03d}' for i in range(1, n_respondents + 1)])
+
+
+def generate_dataset_vectorized(n_respondents, n_tasks=12, seed=42, block_size=100000, truth=None):
+    """Yield (frame, segment_counts) blocks of up to block_size respondents.
+
+    Memory per block is bounded; the whole study is the concatenation of
+    the blocks, and the output depends only on seed and block_size. Each
+    block's true parameters are appended to truth if given.
+    """
+    rng = np.random.default_rng(seed)
+    respondent_ids = respondent_labels(n_respondents)
+    for start in range(0, n_respondents, block_size):
+        sim = simulate_choice_arrays(min(block_size, n_respondents - start), n_tasks, rng)
+        if truth is not None:
+            truth.extend(choice_arrays_truth(sim, respondent_ids, start))
+        counts = np.bincount(sim['segment'], minlength=len(SEGMENT_NAMES))
+        yield choice_arrays_to_frame(sim, respondent_ids, start), Counter(dict(zip(SEGMENT_NAMES, counts.tolist())))
+
+
+def write_vectorized_dataset(path, n_respondents, n_tasks=12, seed=42, block_size=100000, truth=None):
+    """Generate straight to a CSV (streamed block by block) or to a columnar store (.npz or directory)."""
+    segment_counts = Counter()
+    n_rows = 0
+    if str(path).endswith('.csv'):
+        blocks = generate_dataset_vectorized(n_respondents, n_tasks, seed, block_size, truth)
+        for i, (frame, counts) in enumerate(blocks):
+            frame.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            segment_counts += counts
+            n_rows += len(frame)
+    else:
+        import conjoint_engine
+        frames = []
+        for frame, counts in generate_dataset_vectorized(n_respondents, n_tasks, seed, block_size, truth):
+            frames.append(frame)
+            segment_counts += counts
+        data = pd.concat(frames, ignore_index=True)
+        del frames
+        n_rows = len(data)
+        conjoint_engine.save_cbc_store(path, data)
+    return n_rows, segment_counts
+
 def validate_dataset(rows):
-    """Validate the generated dataset."""
+    """Validate the generated dataset in one pass (conjoint_validation.ChoiceDataProfiler)."""
     print("\n=== Dataset Validation ===")
     
-    # Count basics
-    respondents = set(r['respondent_id'] for r in rows)
-    print(f"Total rows: {len(rows)}")
-    print(f"Unique respondents: {len(respondents)}")
-    
-    # Tasks per respondent
-    tasks_per_resp = Counter()
-    for r in rows:
-        tasks_per_resp[r['respondent_id']] = max(
-            tasks_per_resp.get(r['respondent_id'], 0),
-            int(r['task_id'])
-        )
-    print(f"Tasks per respondent: {Counter(tasks_per_resp.values())}")
+    headers = list(rows[0].keys())
+    report = profile_rows(headers, ([r[h] for h in headers] for r in rows))
+    profile = report['profile']
     
-    # Alternatives per task
-    alts_per_task = Counter()
-    for r in rows:
-        key = (r['respondent_id'], r['task_id'])
-        alts_per_task[key] = alts_per_task.get(key, 0) + 1
-    print(f"Alternatives per task distribution: {Counter(alts_per_task.values())}")
+    print(f"Total rows: {profile['n_rows']}")
+    print(f"Unique respondents: {profile['n_respondents']}")
+    print(f"Tasks per respondent: {profile['tasks_per_respondent']}")
+    print(f"Alternatives per task distribution: {profile['alternatives_per_task']}")
     
     # Choice distribution
-    choices = [r for r in rows if r['chosen'] == '1']
-    none_choices = sum(1 for c in choices if c['brand'] == '')
-    print(f"None/opt-out choices: {none_choices}/{len(choices)} ({100*none_choices/len(choices):.1f}%)")
+    none_choices = profile['none_choices']
+    print(f"None/opt-out choices: {none_choices}/{profile['n_tasks']} ({100*profile['none_choice_rate']:.1f}%)")
     
     # Brand choice distribution
-    brand_choices = Counter(c['brand'] for c in choices if c['brand'] != '')
+    brand_choices = {brand: stats['chosen'] for brand, stats in profile['levels']['brand'].items()}
     print(f"Brand choice distribution:")
     for brand, count in sorted(brand_choices.items(), key=lambda x: -x[1]):
         pct = 100 * count / sum(brand_choices.values())
         print(f"  {brand}: {count} ({pct:.1f}%)")
     
     # Price sensitivity check
-    price_choices = [int(c['price']) for c in choices if c['price'] != '']
-    avg_price = sum(price_choices) / len(price_choices) if price_choices else 0
+    price_levels = profile['levels']['price']
+    n_priced = sum(stats['chosen'] for stats in price_levels.values())
+    avg_price = sum(float(p) * stats['chosen'] for p, stats in price_levels.items()) / n_priced if n_priced else 0
     print(f"Average chosen price: ${avg_price:.0f}")
+    
+    for message in report['errors'] + report['warnings']:
+        print(f"  ! {message}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic smartphone CBC data.")
+    parser.add_argument('--respondents', type=int, default=100)
+    parser.add_argument('--tasks', type=int, default=12)
+    parser.add_argument('--vectorized', action='store_true',
+                        help='Use the NumPy generator (for large studies); writes only --output (and its truth file)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for --vectorized')
+    parser.add_argument('--output', default=None,
+                        help='With --vectorized: .csv, or .npz / directory for a columnar store')
+    parser.add_argument('--store', action='store_true', help='Also write smartphone_cbc.npz')
+    parser.add_argument('--truth', action='store_true',
+                        help='Also write the true per-respondent parameters (smartphone_cbc_truth.json)')
+    args = parser.parse_args()
+    
+    if args.vectorized:
+        output = args.output or 'smartphone_cbc.npz'
+        truth = [] if args.truth else None
+        start = time.perf_counter()
+        n_rows, segment_counts = write_vectorized_dataset(output, args.respondents, args.tasks, args.seed, truth=truth)
+        print(f"✓ Generated {args.respondents} respondents × {args.tasks} tasks ({n_rows} rows) "
+              f"in {time.perf_counter() - start:.1f}s -> {output}")
+        for seg, count in segment_counts.items():
+            print(f"  {seg}: {count} ({100*count/args.respondents:.1f}%)")
+        if truth is not None:
+            save_truth(truth_path(output), output, truth)
+        return
+    
+    n_respondents = args.respondents
     print("Generating smartphone CBC dataset...")
-    print(f"Settings: 100 respondents × 12 tasks each")
+    print(f"Settings: {n_respondents} respondents × {args.tasks} tasks each")
     print(f"Segments: {list(SEGMENTS.keys())}")
     
     # Generate data
-    rows, segment_counts = generate_dataset(n_respondents=100, n_tasks=12)
+    truth = [] if args.truth else None
+    rows, segment_counts = generate_dataset(n_respondents=n_respondents, n_tasks=args.tasks, truth=truth)
     
     print(f"\nSegment distribution:")
     for seg, count in segment_counts.items():
-        print(f"  {seg}: {count} ({100*count/100:.1f}%)")
+        print(f"  {seg}: {count} ({100*count/n_respondents:.1f}%)")
     
     # Validate
     validate_dataset(rows)
@@ -339,6 +558,8 @@ def main():
         writer.writerows(rows)
     
     print(f"\n✓ Saved to {output_file}")
+    if truth is not None:
+        save_truth(truth_path(output_file), output_file, truth)
     
     # Also create a small version for quick testing
     small_rows = [r for r in rows if int(r['respondent_id'][1:]) <= 20]
@@ -348,6 +569,11 @@ def main():
         writer.writerows(small_rows)
     
     print(f"✓ Saved small version (20 respondents) to smartphone_cbc_small.csv")
+    
+    # Optional memory-mappable columnar copy (python generate_smartphone_data.py --store)
+    if args.store:
+        from cbc_store import write_cbc_store
+        write_cbc_store(rows, 'smartphone_cbc.npz', fieldnames)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,96 @@
+"""
+True per-respondent parameters written by the CBC generators (--truth).
+
+A truth file sits next to its CSV (smartphone_cbc.csv ->
+smartphone_cbc_truth.json) and holds, for every respondent, the segment
+label and the deterministic part of the utility the generator used:
+
+    partworths   {attribute: {level as written in the CSV: utility}}
+    slopes       {attribute: utility per unit} for linear attributes (price)
+    constants    {alternative_id: utility} (e.g. the None option, competitors)
+
+Alternatives listed in fixed_profile_alternatives (study level) take only
+their constant and the slopes; their attribute levels did not enter the
+generator's utility. Utilities may be shifted by the same amount for every
+alternative of a task, since only differences drive choices.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+TRUTH_FORMAT = 'cbc-ground-truth'
+TRUTH_VERSION = 1
+
+
+def truth_path(csv_path):
+    path = Path(csv_path)
+    return path.with_name(f"{path.stem}_truth.json")
+
+
+def truth_record(respondent_id, segment, partworths, slopes=None, constants=None):
+    return {
+        "respondent_id": respondent_id,
+        "segment": segment,
+        "partworths": partworths,
+        "slopes": slopes or {},
+        "constants": constants or {}
+    }
+
+
+def save_truth(path, study, respondents, fixed_profile_alternatives=()):
+    truth = {
+        "format": TRUTH_FORMAT,
+        "version": TRUTH_VERSION,
+        "study": study,
+        "fixed_profile_alternatives": list(fixed_profile_alternatives),
+        "respondents": respondents
+    }
+    with open(path, 'w') as f:
+        json.dump(truth, f)
+    print(f"✓ Saved true parameters of {len(respondents)} respondents to {path}")
+
+
+def load_truth(path):
+    with open(path) as f:
+        truth = json.load(f)
+    if truth.get('format') != TRUTH_FORMAT:
+        raise ValueError(f"{path} is not a CBC ground-truth file")
+    return truth
+
+
+def true_utilities(record, rows, fixed_profile_alternatives=()):
+    """Deterministic utility of each row (a DataFrame of CSV strings) under one respondent's truth."""
+    alternatives = rows['alternative_id'].astype(str).to_numpy()
+    utility = np.array([record['constants'].get(a, 0.0) for a in alternatives])
+    designed = ~np.isin(alternatives, list(fixed_profile_alternatives))
+
+    for attr, levels in record['partworths'].items():
+        utility[designed] += np.array([levels.get(str(v), 0.0) for v in rows[attr].to_numpy()[designed]])
+    for attr, slope in record['slopes'].items():
+        values = np.array([float(v) if v not in ('', None) else 0.0 for v in rows[attr].to_numpy()])
+        utility += slope * values
+    return utility
+
+
+def true_coefficients(X, task_ids, utility):
+    """Coefficients of design matrix X closest to the true utilities.
+
+    Within-task differences are what a choice model identifies, so X and
+    the utilities are centered per task before the least-squares fit. When
+    the estimated model has the generator's form this is exact; otherwise it
+    is the best the model's parameterization can do.
+    """
+    task_ids = np.asarray(task_ids)
+    _, codes = np.unique(task_ids, return_inverse=True)
+    counts = np.bincount(codes)
+
+    def center(A):
+        sums = np.zeros((len(counts),) + A.shape[1:])
+        np.add.at(sums, codes, A)
+        return A - (sums / counts.reshape((-1,) + (1,) * (A.ndim - 1)))[codes]
+
+    beta, *_ = np.linalg.lstsq(center(np.asarray(X, dtype=float)), center(np.asarray(utility, dtype=float)),
+                               rcond=None)
+    return beta
@@ -0,0 +1,419 @@
+"""
+Local stand-in for the conjoint estimation backend, with an asynchronous job queue.
+
+Runs the same estimation code as the browser (CONJOINT_PYTHON_CODE, loaded
+through conjoint_engine.py). Large studies are submitted as jobs and split
+into respondent chunks on a process pool, so no HTTP request has to stay
+open for the whole estimation.
+
+Request bodies may be row-oriented JSON ({"data": [row, ...]}) or the
+columnar format built by test_backend.build_columnar_payload, optionally
+compressed with Content-Encoding: gzip or zstd. Every response carries a
+Server-Timing header with the body decode time.
+
+Routes (JSON in, JSON out):
+    POST /api/conjoint/estimate/              synchronous estimation (same as the remote endpoint)
+    POST /api/conjoint/jobs/                  submit a job -> 202 {"job_id", ...}
+    GET  /api/conjoint/jobs/<job_id>/         job status and progress
+    GET  /api/conjoint/jobs/<job_id>/partial/ result over the respondents finished so far
+    GET  /api/conjoint/jobs/<job_id>/result/  final result (202 while still running)
+
+A finished job keeps only its summarized result, and is dropped --job-ttl
+seconds after it finished (404 from then on).
+
+Usage:
+    python local_estimation_server.py --port 8000 --workers 4
+    python local_estimation_server.py --shard-workers 8   # parallel synchronous route
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import conjoint_engine
+from sharded_estimation import estimate_sharded
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COLUMNAR_FORMAT = 'columnar-v1'
+
+
+def parse_payload(payload):
+    """Pull estimation settings out of an API payload (same shape as test_backend.py sends)."""
+    return {
+        "attribute_metadata": payload['attribute_metadata'],
+        "none_alt_id": payload.get('none_alternative_id') or None,
+        "competitor_alt_ids": payload.get('competitor_alternative_ids') or [],
+        "reg_strength": float((payload.get('model_options') or {}).get('reg_strength', 1.0))
+    }
+
+
+def decompress_body(body, content_encoding):
+    """Undo Content-Encoding on a request body."""
+    encoding = (content_encoding or 'identity').strip().lower()
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd request bodies need the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if encoding != 'identity':
+        raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+    return body
+
+
+def decode_column(column, n_rows):
+    """Decode one columnar-v1 column into a NumPy array."""
+    if column['kind'] == 'numeric':
+        values = np.frombuffer(base64.b64decode(column['values']), dtype='<f8')
+    elif column['kind'] == 'dictionary':
+        codes = np.frombuffer(base64.b64decode(column['codes']), dtype='<i4')
+        # Object array of the original strings, so levels sort exactly as in row JSON
+        values = np.asarray(column['categories'], dtype=object)[codes]
+    else:
+        raise ValueError(f"Unknown column kind: {column['kind']}")
+    if len(values) != n_rows:
+        raise ValueError(f"Column has {len(values)} values, expected {n_rows}")
+    return values
+
+
+def payload_frame(payload):
+    """Long-format choice data from a row-oriented or columnar payload."""
+    if payload.get('format') == COLUMNAR_FORMAT:
+        n_rows = int(payload['n_rows'])
+        return pd.DataFrame({
+            name: decode_column(column, n_rows) for name, column in payload['columns'].items()
+        })
+    return pd.DataFrame(payload['data'])
+
+
+def split_by_respondent(data, chunk_size):
+    """Split data into frames of chunk_size respondents, keeping input order."""
+    codes, uniques = pd.factorize(data['respondent_id'])
+    order = np.argsort(codes, kind='stable')
+    chunk_of_row = codes[order] // chunk_size
+    n_chunks = -(-len(uniques) // chunk_size)
+    bounds = np.searchsorted(chunk_of_row, np.arange(n_chunks + 1))
+    return [data.iloc[order[start:end]] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def estimate_chunk(data, settings):
+    """Worker-process task: fit one chunk of respondents with the engine."""
+    return conjoint_engine.estimate_respondents(
+        data,
+        settings['attribute_metadata'],
+        settings['none_alt_id'],
+        settings['competitor_alt_ids'],
+        settings['reg_strength']
+    )
+
+
+def estimate_sync(data, settings, start_time, shard_workers=None):
+    """Synchronous estimation, same result structure as run_conjoint_estimation.
+
+    With shard_workers the study is fitted by sharded_estimation over a
+    shared-memory design instead of in the request thread.
+    """
+    if shard_workers:
+        respondents_results, failed_respondents = estimate_sharded(
+            data, settings['attribute_metadata'], settings['none_alt_id'],
+            settings['competitor_alt_ids'], settings['reg_strength'], shard_workers
+        )
+    else:
+        respondents_results, failed_respondents = estimate_chunk(data, settings)
+    return conjoint_engine.summarize_estimation(respondents_results, failed_respondents, start_time)
+
+
+class EstimationJobQueue:
+    """In-memory job store feeding respondent chunks to a shared process pool."""
+
+    def __init__(self, max_workers=None, chunk_size=10, job_ttl=3600):
+        self.pool = ProcessPoolExecutor(max_workers=max_workers)
+        self.chunk_size = chunk_size
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def _evict_expired(self):
+        """Drop jobs that finished more than job_ttl seconds ago; call with the lock held."""
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j for j, job in self.jobs.items() if job['finished_at'] and job['finished_at'] < cutoff]:
+            del self.jobs[job_id]
+
+    def submit(self, data, settings):
+        chunks = split_by_respondent(data, self.chunk_size)
+        job_id = uuid.uuid4().hex
+
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "chunks_total": len(chunks),
+            "chunks_done": 0,
+            "respondents_total": int(data['respondent_id'].nunique()),
+            "respondents_done": 0,
+            "chunk_results": [None] * len(chunks),
+            "error": None,
+            "result": None
+        }
+        with self.lock:
+            self._evict_expired()
+            self.jobs[job_id] = job
+
+        if not chunks:
+            self._finish(job_id)
+        try:
+            for idx, chunk in enumerate(chunks):
+                future = self.pool.submit(estimate_chunk, chunk, settings)
+                future.add_done_callback(lambda f, idx=idx: self._chunk_done(job_id, idx, f))
+        except Exception as e:
+            self._fail(job_id, e)
+            return job_id
+        with self.lock:
+            if job['status'] == 'queued':
+                job['status'] = 'running'
+        return job_id
+
+    def _fail(self, job_id, error):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            # Late chunks of a failed job may arrive after it was evicted
+            if job is None or job['status'] in ('failed', 'completed'):
+                return
+            job['status'] = 'failed'
+            job['error'] = f"{type(error).__name__}: {error}"
+            job['finished_at'] = time.time()
+            job['chunk_results'] = None
+
+    def _chunk_done(self, job_id, idx, future):
+        try:
+            chunk_result = future.result()
+        except Exception as e:
+            self._fail(job_id, e)
+            return
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] == 'failed':
+                return
+            job['chunk_results'][idx] = chunk_result
+            job['chunks_done'] += 1
+            job['respondents_done'] += len(chunk_result[0]) + len(chunk_result[1])
+            done = job['chunks_done'] == job['chunks_total']
+        if done:
+            self._finish(job_id)
+
+    def _collect(self, job):
+        respondents, failed = [], []
+        for chunk in job['chunk_results'] or []:
+            if chunk is not None:
+                respondents.extend(chunk[0])
+                failed.extend(chunk[1])
+        return respondents, failed
+
+    def _finish(self, job_id):
+        """Summarize a job whose chunks are all fitted; the bootstrap runs outside the lock."""
+        with self.lock:
+            job = self.jobs[job_id]
+            respondents, failed = self._collect(job)
+        try:
+            result = conjoint_engine.summarize_estimation(respondents, failed, job['submitted_at'])
+        except Exception as e:
+            self._fail(job_id, e)
+            return
+        with self.lock:
+            job['result'] = result
+            job['status'] = 'completed'
+            job['finished_at'] = time.time()
+            # The result holds everything the chunks did
+            job['chunk_results'] = None
+
+    def status(self, job_id):
+        with self.lock:
+            self._evict_expired()
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            end = job['finished_at'] or time.time()
+            return {
+                "job_id": job_id,
+                "status": job['status'],
+                "respondents_total": job['respondents_total'],
+                "respondents_done": job['respondents_done'],
+                "chunks_total": job['chunks_total'],
+                "chunks_done": job['chunks_done'],
+                "elapsed_seconds": end - job['submitted_at'],
+                "error": job['error']
+            }
+
+    def partial(self, job_id):
+        with self.lock:
+            self._evict_expired()
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job['result'] is not None:
+                return job['result']
+            respondents, failed = self._collect(job)
+        # Aggregates over the finished respondents only; skip the bootstrap for speed
+        partial = conjoint_engine.summarize_estimation(respondents, failed, job['submitted_at'], n_bootstrap=0)
+        partial['partial'] = True
+        return partial
+
+    def result(self, job_id):
+        with self.lock:
+            self._evict_expired()
+            job = self.jobs.get(job_id)
+            return None if job is None else (job['status'], job['result'], job['error'])
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_JOB_ROUTE = re.compile(r'^/api/conjoint/jobs/([0-9a-f]+)/(partial/|result/)?$')
+
+
+class EstimationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive for polling clients
+    queue = None
+    shard_workers = None
+
+    decode_seconds = None
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if self.decode_seconds is not None:
+            self.send_header('Server-Timing', f'decode;dur={self.decode_seconds * 1000:.1f}')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = decompress_body(self.rfile.read(length), self.headers.get('Content-Encoding'))
+        return json.loads(body or b'{}')
+
+    def do_POST(self):
+        start_time = time.time()
+        try:
+            payload = self._read_json()
+            if self.path not in ('/api/conjoint/estimate/', '/api/conjoint/jobs/'):
+                self._send_json(404, {"success": False, "detail": "Not found"})
+                return
+            settings = parse_payload(payload)
+            data = payload_frame(payload)
+        except (ValueError, UnicodeDecodeError, OSError, KeyError, TypeError) as e:
+            self._send_json(400, {"success": False, "detail": f"Invalid request body: {e}"})
+            return
+        self.decode_seconds = time.time() - start_time
+
+        try:
+            if self.path == '/api/conjoint/estimate/':
+                result = estimate_sync(data, settings, start_time, self.shard_workers)
+            else:
+                job_id = self.queue.submit(data, settings)
+        except Exception as e:
+            self._send_json(500, {"success": False, "detail": f"Estimation failed: {type(e).__name__}: {e}"})
+            return
+
+        if self.path == '/api/conjoint/estimate/':
+            self._send_json(200, result)
+        else:
+            self._send_json(202, {
+                "job_id": job_id,
+                "status": self.queue.status(job_id)['status'],
+                "status_url": f"/api/conjoint/jobs/{job_id}/",
+                "partial_url": f"/api/conjoint/jobs/{job_id}/partial/",
+                "result_url": f"/api/conjoint/jobs/{job_id}/result/"
+            })
+
+    def do_GET(self):
+        self.decode_seconds = None
+        match = _JOB_ROUTE.match(self.path)
+        if match is None:
+            self._send_json(404, {"success": False, "detail": "Not found"})
+            return
+
+        job_id, action = match.groups()
+        if action is None:
+            status = self.queue.status(job_id)
+            self._send_json(200 if status else 404, status or {"success": False, "detail": "Unknown job"})
+        elif action == 'partial/':
+            partial = self.queue.partial(job_id)
+            self._send_json(200 if partial else 404, partial or {"success": False, "detail": "Unknown job"})
+        else:
+            found = self.queue.result(job_id)
+            if found is None:
+                self._send_json(404, {"success": False, "detail": "Unknown job"})
+                return
+            status, result, error = found
+            if status == 'completed':
+                self._send_json(200, result)
+            elif status == 'failed':
+                self._send_json(500, {"success": False, "detail": error})
+            else:
+                self._send_json(202, self.queue.status(job_id))
+
+    def log_message(self, fmt, *args):
+        if not getattr(self.server, 'quiet', False):
+            super().log_message(fmt, *args)
+
+
+def make_server(host='127.0.0.1', port=8000, workers=None, chunk_size=10, quiet=False, shard_workers=None,
+                job_ttl=3600):
+    """Build (but do not start) the HTTP server and its job queue."""
+    handler = type('Handler', (EstimationRequestHandler,), {
+        'queue': EstimationJobQueue(max_workers=workers, chunk_size=chunk_size, job_ttl=job_ttl),
+        'shard_workers': shard_workers
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local conjoint estimation service with a job queue.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=10, help='Respondents per worker task')
+    parser.add_argument('--quiet', action='store_true', help='Do not log each request')
+    parser.add_argument('--shard-workers', type=int, default=None,
+                        help='Fit synchronous /estimate/ requests on this many processes over shared memory')
+    parser.add_argument('--job-ttl', type=float, default=3600,
+                        help='Seconds a finished job and its result are kept')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.chunk_size, args.quiet, args.shard_workers,
+                         args.job_ttl)
+    print(f"Conjoint estimation service on http://{args.host}:{args.port}/api/conjoint/ "
+          f"({args.workers} workers, {args.chunk_size} respondents per chunk)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.RequestHandlerClass.queue.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Speed versus accuracy of the conjoint estimator on data with known truth.
+
+Generate a study together with its true parameters, then run every solver
+variant on the same respondents:
+
+    python generate_smartphone_data.py --truth
+    python recovery_benchmark.py smartphone_cbc.csv --respondents 60 --holdout-tasks 2
+
+Each respondent's last --holdout-tasks tasks are left out of the fit. For
+every variant the benchmark reports fit time per respondent against:
+
+    coefficient error   RMSE / MAE / median absolute error / correlation
+                        between estimated and true coefficients (the truth
+                        projected onto the engine's design, see
+                        ground_truth.true_coefficients); the median is robust
+                        to separated respondents whose estimates diverge
+    hit rate            share of tasks whose chosen alternative has the
+                        highest estimated utility, in-sample and on holdout
+    segment recovery    adjusted Rand index between k-means segments of the
+                        estimated part-worths (k = number of true segments)
+                        and the generator's segment labels
+
+The same metrics computed from the true utilities are printed as the
+ceiling. Estimation settings come from studies.STUDIES.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import conjoint_engine
+from ground_truth import load_truth, true_coefficients, true_utilities, truth_path
+from studies import STUDIES
+
+# Solver settings passed to estimate_respondent_mnl; 'default' is what the app uses
+VARIANTS = {
+    "bfgs_10": {"max_iter": 10},
+    "bfgs_25": {"max_iter": 25},
+    "bfgs_50": {"max_iter": 50},
+    "default": {"max_iter": 100},
+    "bfgs_200": {"max_iter": 200}
+}
+
+
+def adjusted_rand_index(labels_a, labels_b):
+    """Agreement of two partitions, corrected for chance (1 = identical, ~0 = random)."""
+    _, a = np.unique(labels_a, return_inverse=True)
+    _, b = np.unique(labels_b, return_inverse=True)
+    table = np.zeros((a.max() + 1, b.max() + 1))
+    np.add.at(table, (a, b), 1)
+
+    def pairs(n):
+        return n * (n - 1) / 2
+
+    index = pairs(table).sum()
+    rows, cols, total = pairs(table.sum(axis=1)).sum(), pairs(table.sum(axis=0)).sum(), pairs(len(a))
+    expected = rows * cols / total if total else 0.0
+    max_index = (rows + cols) / 2
+    return float((index - expected) / (max_index - expected)) if max_index != expected else 1.0
+
+
+def hits(X, y, task_ids, beta_or_utility, is_utility=False):
+    """Per-task booleans: does the highest-utility alternative match the choice?"""
+    utility = beta_or_utility if is_utility else X @ beta_or_utility
+    result = []
+    for task in pd.unique(task_ids):
+        mask = task_ids == task
+        if y[mask].sum() == 1:
+            result.append(bool(y[mask][np.argmax(utility[mask])] == 1))
+    return result
+
+
+def prepare_respondents(data, truth, settings, max_respondents=None, holdout_tasks=2):
+    """Design matrices, train/holdout masks and true coefficients for each respondent with a truth record."""
+    records = {r['respondent_id']: r for r in truth['respondents']}
+    fixed = truth.get('fixed_profile_alternatives', [])
+    respondent_ids = [r for r in pd.unique(data['respondent_id']) if r in records][:max_respondents]
+
+    prepared = []
+    for resp_id in respondent_ids:
+        resp_rows = data[data['respondent_id'] == resp_id]
+        X, y, feature_names, resp_data = conjoint_engine.build_design_matrix(
+            resp_rows, settings['attribute_metadata'], resp_id,
+            settings['none_alternative_id'], settings['competitor_alternative_ids']
+        )
+        task_ids = resp_data['task_id'].to_numpy()
+        tasks = pd.unique(task_ids)
+        holdout = np.isin(task_ids, tasks[len(tasks) - holdout_tasks:]) if holdout_tasks else np.zeros(len(y), bool)
+        utility = true_utilities(records[resp_id], resp_data, fixed)
+        prepared.append({
+            "respondent_id": resp_id,
+            "segment": records[resp_id]['segment'],
+            "X": X, "y": y, "task_ids": task_ids, "feature_names": feature_names,
+            "resp_data": resp_data, "train": ~holdout,
+            "utility": utility,
+            "beta_true": true_coefficients(X, task_ids, utility)
+        })
+    return prepared
+
+
+def segment_ari(coefficient_dicts, segments, seed=0):
+    """ARI of k-means segments of the part-worths against the true segments (None without labels)."""
+    if any(s is None for s in segments) or len(set(segments)) < 2:
+        return None
+    M, _ = conjoint_engine.build_coefficient_matrix(coefficient_dicts)
+    k = len(set(segments))
+    fit = conjoint_engine.run_segmentation(M, k_values=[k], n_init=5, seed=seed)
+    return adjusted_rand_index(fit['labels'][k], segments)
+
+
+def evaluate_variant(prepared, options, reg_strength=1.0):
+    """Fit every respondent with one solver setting and score it against the truth."""
+    errors, correlations = [], []
+    train_hits, holdout_hits = [], []
+    coefficient_dicts, convergence = [], []
+    fit_seconds = 0.0
+
+    for p in prepared:
+        train = p['train']
+        start = time.perf_counter()
+        coefficients, _, _, _, conv = conjoint_engine.estimate_respondent_mnl(
+            p['X'][train], p['y'][train], p['resp_data'][train], reg_strength=reg_strength, **options
+        )
+        fit_seconds += time.perf_counter() - start
+
+        errors.append(coefficients - p['beta_true'])
+        if np.std(coefficients) > 0 and np.std(p['beta_true']) > 0:
+            correlations.append(np.corrcoef(coefficients, p['beta_true'])[0, 1])
+        train_hits += hits(p['X'][train], p['y'][train], p['task_ids'][train], coefficients)
+        holdout_hits += hits(p['X'][~train], p['y'][~train], p['task_ids'][~train], coefficients)
+        coefficient_dicts.append(dict(zip(p['feature_names'], coefficients)))
+        convergence.append(conv)
+
+    errors = np.concatenate(errors)
+    return {
+        "options": options,
+        "seconds_per_respondent": fit_seconds / len(prepared),
+        "coef_rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "coef_mae": float(np.mean(np.abs(errors))),
+        "coef_median_abs_error": float(np.median(np.abs(errors))),
+        "coef_correlation": float(np.mean(correlations)) if correlations else None,
+        "hit_rate_train": float(np.mean(train_hits)) if train_hits else None,
+        "hit_rate_holdout": float(np.mean(holdout_hits)) if holdout_hits else None,
+        "segment_ari": segment_ari(coefficient_dicts, [p['segment'] for p in prepared]),
+        "converged_share": float(np.mean([c['converged'] for c in convergence])),
+        "nelder_mead_share": float(np.mean([c['method'] == 'Nelder-Mead' for c in convergence]))
+    }
+
+
+def reference_metrics(prepared):
+    """Hit rates and segment recovery of the true parameters: the ceiling for any estimator."""
+    train_hits, holdout_hits = [], []
+    for p in prepared:
+        train = p['train']
+        train_hits += hits(p['X'][train], p['y'][train], p['task_ids'][train], p['utility'][train], True)
+        holdout_hits += hits(p['X'][~train], p['y'][~train], p['task_ids'][~train], p['utility'][~train], True)
+    return {
+        "hit_rate_train": float(np.mean(train_hits)) if train_hits else None,
+        "hit_rate_holdout": float(np.mean(holdout_hits)) if holdout_hits else None,
+        "segment_ari": segment_ari([dict(zip(p['feature_names'], p['beta_true'])) for p in prepared],
+                                   [p['segment'] for p in prepared])
+    }
+
+
+def run_recovery_benchmark(csv_path, settings, truth, variants=VARIANTS, max_respondents=None, holdout_tasks=2):
+    data = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    prepared = prepare_respondents(data, truth, settings, max_respondents, holdout_tasks)
+    if not prepared:
+        raise ValueError(f"No respondents of {csv_path} have a truth record")
+    return {
+        "study": os.path.basename(csv_path),
+        "respondents": len(prepared),
+        "holdout_tasks": holdout_tasks,
+        "reference": reference_metrics(prepared),
+        "variants": {name: evaluate_variant(prepared, options) for name, options in variants.items()}
+    }
+
+
+def format_metric(value, spec='.3f'):
+    return 'n/a' if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimator speed versus parameter recovery on generated data.")
+    parser.add_argument('csv', help='Generated CBC file; settings come from studies.STUDIES')
+    parser.add_argument('--truth', default=None, help='Ground-truth JSON (default: <csv stem>_truth.json)')
+    parser.add_argument('--respondents', type=int, default=40, help='Use the first N respondents')
+    parser.add_argument('--holdout-tasks', type=int, default=2, help='Tasks per respondent left out of the fit')
+    parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--output', default=None, help='Write the results JSON here')
+    args = parser.parse_args()
+
+    truth = load_truth(args.truth or truth_path(args.csv))
+    result = run_recovery_benchmark(
+        args.csv, STUDIES[os.path.basename(args.csv)], truth,
+        {name: VARIANTS[name] for name in args.variants}, args.respondents, args.holdout_tasks
+    )
+
+    print(f"{result['study']}: {result['respondents']} respondents, {result['holdout_tasks']} holdout tasks each")
+    print(f"{'variant':<10} {'s/resp':>8} {'RMSE':>7} {'MAE':>7} {'MedAE':>7} {'corr':>6} "
+          f"{'hit(in)':>8} {'hit(out)':>8} {'ARI':>6} {'NM':>5}")
+    for name, m in sorted(result['variants'].items(), key=lambda item: item[1]['seconds_per_respondent']):
+        print(f"{name:<10} {m['seconds_per_respondent']:>8.3f} {m['coef_rmse']:>7.3f} {m['coef_mae']:>7.3f} "
+              f"{m['coef_median_abs_error']:>7.3f} {format_metric(m['coef_correlation']):>6} {format_metric(m['hit_rate_train']):>8} "
+              f"{format_metric(m['hit_rate_holdout']):>8} {format_metric(m['segment_ari']):>6} "
+              f"{m['nelder_mead_share']:>5.2f}")
+    ref = result['reference']
+    print(f"{'truth':<10} {'':>8} {'':>7} {'':>7} {'':>7} {'':>6} {format_metric(ref['hit_rate_train']):>8} "
+          f"{format_metric(ref['hit_rate_holdout']):>8} {format_metric(ref['segment_ari']):>6}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Respondent offset index for long-format CBC CSV files.
+
+One streaming pass over the raw bytes records, for every respondent, the
+byte offset, byte length and row count of each contiguous run of their rows.
+The index is saved next to the CSV (smartphone_cbc.csv -> smartphone_cbc.csv.idx.json)
+and rebuilt automatically when the CSV changes size or modification time.
+
+Subsets, random samples and train/holdout splits then seek straight to the
+selected respondents instead of parsing the whole file, and extracted files
+are byte-for-byte copies of the original rows.
+
+The respondent_id field must not contain quoted commas (true for every file
+written by the generators in this folder).
+
+Usage:
+    python respondent_index.py build smartphone_cbc.csv
+    python respondent_index.py subset smartphone_cbc.csv --first 20 -o smartphone_cbc_small.csv
+    python respondent_index.py subset smartphone_cbc.csv --ids R001 R007 R042 -o picked.csv
+    python respondent_index.py sample smartphone_cbc.csv -n 50 --seed 1 -o sample.csv
+    python respondent_index.py split smartphone_cbc.csv --holdout 0.2 --seed 1 -o train.csv holdout.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+
+INDEX_FORMAT = 'cbc-respondent-index'
+INDEX_VERSION = 1
+
+
+def index_path(csv_path):
+    return f"{csv_path}.idx.json"
+
+
+def build_index(csv_path, id_column='respondent_id'):
+    """Scan csv_path once and return its respondent index (not saved)."""
+    stat = os.stat(csv_path)
+    respondent_ids, position = [], {}
+    segments = []  # [respondent position, byte offset, byte length, rows]
+
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        columns = next(csv.reader([header.decode('utf-8-sig')]))
+        col = columns.index(id_column)
+
+        offset = len(header)
+        current = None
+        for line in f:
+            if not line.strip():
+                offset += len(line)
+                continue
+            field = line.split(b',', col + 1)[col].strip(b'\r\n"')
+            if field != current:
+                current = field
+                resp_id = field.decode('utf-8')
+                if resp_id not in position:
+                    position[resp_id] = len(respondent_ids)
+                    respondent_ids.append(resp_id)
+                segments.append([position[resp_id], offset, 0, 0])
+            segments[-1][2] += len(line)
+            segments[-1][3] += 1
+            offset += len(line)
+
+    return {
+        "format": INDEX_FORMAT,
+        "version": INDEX_VERSION,
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "id_column": id_column,
+        "header_bytes": len(header),
+        "respondent_ids": respondent_ids,
+        "segments": segments
+    }
+
+
+def save_index(index, csv_path):
+    with open(index_path(csv_path), 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+
+def load_index(csv_path, rebuild=True):
+    """Load the sidecar index, (re)building it if it is missing or stale."""
+    stat = os.stat(csv_path)
+    try:
+        with open(index_path(csv_path)) as f:
+            index = json.load(f)
+        fresh = (index.get('format') == INDEX_FORMAT and index.get('version') == INDEX_VERSION
+                 and index['source_size'] == stat.st_size and index['source_mtime'] == stat.st_mtime)
+    except (OSError, ValueError, KeyError):
+        index, fresh = None, False
+
+    if not fresh:
+        if not rebuild:
+            raise ValueError(f"Respondent index for {csv_path} is missing or stale")
+        index = build_index(csv_path)
+        save_index(index, csv_path)
+    return index
+
+
+def respondent_segments(index, respondent_ids):
+    """Byte segments for the given respondents, in file order."""
+    wanted = set(respondent_ids)
+    missing = wanted.difference(index['respondent_ids'])
+    if missing:
+        raise KeyError(f"Respondents not in file: {sorted(missing)[:10]}")
+    positions = {i for i, r in enumerate(index['respondent_ids']) if r in wanted}
+    return [(offset, length, rows) for pos, offset, length, rows in index['segments'] if pos in positions]
+
+
+def read_segments(csv_path, index, segments):
+    """Raw bytes of the header plus the given segments."""
+    with open(csv_path, 'rb') as f:
+        header = f.read(index['header_bytes'])
+        newline = b'\r\n' if header.endswith(b'\r\n') else b'\n'
+        parts = [header]
+        for offset, length, _ in segments:
+            f.seek(offset)
+            part = f.read(length)
+            # Only the file's last line can lack a terminator
+            parts.append(part if part.endswith(b'\n') else part + newline)
+    return b''.join(parts)
+
+
+def read_respondents(csv_path, respondent_ids, index=None):
+    """Rows (csv.DictReader dicts) of the given respondents, reading only their byte ranges."""
+    index = index or load_index(csv_path)
+    data = read_segments(csv_path, index, respondent_segments(index, respondent_ids))
+    return list(csv.DictReader(io.StringIO(data.decode('utf-8-sig'), newline='')))
+
+
+def write_respondents(csv_path, respondent_ids, out_path, index=None):
+    """Copy the header and the given respondents' rows byte-for-byte into out_path."""
+    index = index or load_index(csv_path)
+    segments = respondent_segments(index, respondent_ids)
+    with open(out_path, 'wb') as out:
+        out.write(read_segments(csv_path, index, segments))
+    return sum(rows for _, _, rows in segments)
+
+
+def sample_respondents(index, n, seed=None):
+    """n respondent ids drawn without replacement, returned in file order."""
+    chosen = set(random.Random(seed).sample(index['respondent_ids'], min(n, len(index['respondent_ids']))))
+    return [r for r in index['respondent_ids'] if r in chosen]
+
+
+def train_holdout_split(index, holdout_fraction=0.2, seed=None):
+    """Split respondents (not rows) into (train_ids, holdout_ids), each in file order."""
+    n_holdout = int(round(holdout_fraction * len(index['respondent_ids'])))
+    holdout = set(sample_respondents(index, n_holdout, seed))
+    train = [r for r in index['respondent_ids'] if r not in holdout]
+    return train, [r for r in index['respondent_ids'] if r in holdout]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respondent offset index for CBC CSV files.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Build (or refresh) the sidecar index')
+    build.add_argument('csv')
+
+    subset = sub.add_parser('subset', help='Extract specific respondents')
+    subset.add_argument('csv')
+    group = subset.add_mutually_exclusive_group(required=True)
+    group.add_argument('--ids', nargs='+', help='Respondent ids to keep')
+    group.add_argument('--first', type=int, help='Keep the first N respondents in file order')
+    subset.add_argument('-o', '--output', required=True)
+
+    sample = sub.add_parser('sample', help='Extract a random sample of respondents')
+    sample.add_argument('csv')
+    sample.add_argument('-n', type=int, required=True)
+    sample.add_argument('--seed', type=int, default=None)
+    sample.add_argument('-o', '--output', required=True)
+
+    split = sub.add_parser('split', help='Write train and holdout files split by respondent')
+    split.add_argument('csv')
+    split.add_argument('--holdout', type=float, default=0.2, help='Fraction of respondents held out')
+    split.add_argument('--seed', type=int, default=None)
+    split.add_argument('-o', '--output', nargs=2, required=True, metavar=('TRAIN', 'HOLDOUT'))
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        index = build_index(args.csv)
+        save_index(index, args.csv)
+        print(f"✓ Indexed {len(index['respondent_ids'])} respondents "
+              f"({len(index['segments'])} segments) -> {index_path(args.csv)}")
+        return
+
+    index = load_index(args.csv)
+    if args.command == 'subset':
+        ids = args.ids or index['respondent_ids'][:args.first]
+        outputs = [(ids, args.output)]
+    elif args.command == 'sample':
+        outputs = [(sample_respondents(index, args.n, args.seed), args.output)]
+    else:
+        train, holdout = train_holdout_split(index, args.holdout, args.seed)
+        outputs = [(train, args.output[0]), (holdout, args.output[1])]
+
+    for ids, out_path in outputs:
+        n_rows = write_respondents(args.csv, ids, out_path, index)
+        print(f"✓ Saved {n_rows} rows from {len(ids)} respondents to {out_path}")
+
+
+if __name__ == '__main__':
+    main()
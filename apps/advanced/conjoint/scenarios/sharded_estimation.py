@@ -0,0 +1,233 @@
+"""
+Multi-process sharded conjoint estimation over a shared-memory design.
+
+The whole study is encoded once into flat NumPy arrays (category codes,
+numeric attribute values, ASC flags, choices, task codes, respondent row
+offsets) packed into a single multiprocessing.shared_memory block. Worker
+processes attach to the block at start-up and fit contiguous ranges of
+respondents from zero-copy slices, so only (start, end) pairs and result
+records cross process boundaries.
+
+Per-respondent design matrices are rebuilt from the codes exactly as
+build_design_matrix does (baseline = first sorted level the respondent saw),
+and the fit itself is the engine's fit_respondent, so results match
+estimate_respondents respondent for respondent.
+
+Usage:
+    python sharded_estimation.py smartphone_cbc.csv --workers 4
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import conjoint_engine
+from studies import STUDIES
+
+_ALIGN = 64
+
+
+def encode_design(data, attribute_metadata, none_alt_id, competitor_alt_ids):
+    """Encode long-format choice data into flat arrays plus a small schema.
+
+    Rows are regrouped by respondent (in order of first appearance, keeping
+    row order within each respondent); offsets[r]:offsets[r + 1] are the rows
+    of respondent r.
+    """
+    resp_codes, respondent_ids = pd.factorize(data['respondent_id'])
+    order = np.argsort(resp_codes, kind='stable')
+    data = data.iloc[order]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(resp_codes, minlength=len(respondent_ids)))])
+
+    arrays = {"offsets": offsets.astype(np.int64)}
+    attributes = []
+    for attr_name, attr_config in attribute_metadata.items():
+        attr_type = attr_config.get('type', 'categorical')
+        if attr_name not in data.columns:
+            continue
+
+        column = data[attr_name]
+        if attr_type == 'categorical':
+            valid = column.notna() & (column != '')
+            categories = sorted(pd.unique(column[valid]))
+            codes = pd.Categorical(column.where(valid), categories=categories).codes
+            arrays[f"cat:{attr_name}"] = codes.astype(np.int32)
+            attributes.append((attr_name, attr_type, [str(c) for c in categories]))
+        elif attr_type in ['numeric_linear', 'price', 'numeric_quadratic']:
+            arrays[f"num:{attr_name}"] = pd.to_numeric(column, errors='coerce').fillna(0).to_numpy(np.float64)
+            attributes.append((attr_name, attr_type, None))
+
+    asc_names = []
+    if none_alt_id:
+        asc_names.append('ASC_None')
+        arrays['asc:ASC_None'] = (data['alternative_id'] == none_alt_id).to_numpy(np.float64)
+    for comp_id in competitor_alt_ids:
+        name = f'ASC_Competitor_{comp_id}'
+        asc_names.append(name)
+        arrays[f'asc:{name}'] = (data['alternative_id'] == comp_id).to_numpy(np.float64)
+
+    arrays['chosen'] = pd.to_numeric(data['chosen'], errors='coerce').fillna(0).astype(int).to_numpy(np.int64)
+    # Sorted codes keep np.unique's task order identical to sorting the original task ids
+    arrays['task'] = pd.factorize(data['task_id'], sort=True)[0].astype(np.int64)
+
+    schema = {
+        "respondent_ids": [str(r) for r in respondent_ids],
+        "attributes": attributes,
+        "asc_names": asc_names,
+        "attribute_metadata": attribute_metadata
+    }
+    return arrays, schema
+
+
+class SharedDesign:
+    """Owner of one shared-memory block holding every encoded array."""
+
+    def __init__(self, arrays, schema):
+        layout, size = {}, 0
+        for key, array in arrays.items():
+            layout[key] = (size, array.dtype.str, array.shape)
+            size += -(-array.nbytes // _ALIGN) * _ALIGN
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for key, array in arrays.items():
+            view_array(self.shm.buf, *layout[key])[...] = array
+        self.spec = {"name": self.shm.name, "layout": layout, "schema": schema}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def view_array(buf, offset, dtype, shape):
+    """NumPy view onto part of a shared buffer (no copy)."""
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=buf, offset=offset)
+
+
+_worker_design = None
+
+
+def _init_worker(spec):
+    """Pool initializer: attach once and keep zero-copy views for every task."""
+    global _worker_design
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not schedule a second unlink; SharedDesign.close() owns cleanup
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    arrays = {key: view_array(shm.buf, *loc) for key, loc in spec['layout'].items()}
+    _worker_design = (shm, arrays, spec['schema'])
+
+
+def respondent_design(arrays, schema, r):
+    """Rebuild respondent r's design matrix from its row slice, as build_design_matrix would."""
+    start, end = arrays['offsets'][r], arrays['offsets'][r + 1]
+    feature_names, X_parts = [], []
+    for attr_name, attr_type, categories in schema['attributes']:
+        if attr_type == 'categorical':
+            codes = arrays[f"cat:{attr_name}"][start:end]
+            present = np.unique(codes[codes >= 0])
+            for level in present[1:]:
+                feature_names.append(f"{attr_name}_{categories[level]}")
+                X_parts.append((codes == level).astype(float))
+        else:
+            values = arrays[f"num:{attr_name}"][start:end]
+            feature_names.append(attr_name)
+            X_parts.append(values)
+            if attr_type == 'numeric_quadratic':
+                feature_names.append(f"{attr_name}_sq")
+                X_parts.append(values ** 2)
+
+    for name in schema['asc_names']:
+        feature_names.append(name)
+        X_parts.append(arrays[f"asc:{name}"][start:end])
+
+    if len(X_parts) == 0:
+        raise ValueError(f"No features extracted for respondent {schema['respondent_ids'][r]}")
+
+    # fit_respondent only reads task ids from resp_data
+    resp_data = pd.DataFrame({'task_id': arrays['task'][start:end]})
+    return np.column_stack(X_parts), arrays['chosen'][start:end], feature_names, resp_data
+
+
+def fit_shard(first, last, reg_strength):
+    """Worker task: fit respondents first..last-1 of the attached design."""
+    _, arrays, schema = _worker_design
+    respondents_results, failed_respondents = [], []
+    for r in range(first, last):
+        resp_id = schema['respondent_ids'][r]
+        try:
+            X, y, feature_names, resp_data = respondent_design(arrays, schema, r)
+            respondents_results.append(conjoint_engine.fit_respondent(
+                resp_id, X, y, feature_names, resp_data, schema['attribute_metadata'], reg_strength
+            ))
+        except Exception as e:
+            failed_respondents.append({"respondent_id": resp_id, "error": str(e)})
+    return respondents_results, failed_respondents
+
+
+def estimate_sharded(data, attribute_metadata, none_alt_id, competitor_alt_ids, reg_strength,
+                     n_workers=None, shard_size=None):
+    """Drop-in parallel estimate_respondents: returns (respondents_results, failed_respondents)."""
+    n_workers = n_workers or os.cpu_count()
+    arrays, schema = encode_design(data, attribute_metadata, none_alt_id, competitor_alt_ids)
+    n_respondents = len(schema['respondent_ids'])
+    # Several shards per worker so slow respondents do not leave cores idle
+    shard_size = shard_size or max(1, -(-n_respondents // (n_workers * 8)))
+    bounds = list(range(0, n_respondents, shard_size)) + [n_respondents]
+
+    respondents_results, failed_respondents = [], []
+    with SharedDesign(arrays, schema) as design:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(design.spec,)) as pool:
+            shards = pool.map(fit_shard, bounds[:-1], bounds[1:], [reg_strength] * (len(bounds) - 1))
+            for shard_results, shard_failed in shards:
+                respondents_results.extend(shard_results)
+                failed_respondents.extend(shard_failed)
+    return respondents_results, failed_respondents
+
+
+def run_sharded_estimation(data, attribute_metadata, none_alt_id, competitor_alt_ids, reg_strength,
+                           n_workers=None, n_bootstrap=1000):
+    """Sharded counterpart of run_conjoint_estimation, returning the result dict."""
+    start_time = time.time()
+    respondents_results, failed_respondents = estimate_sharded(
+        data, attribute_metadata, none_alt_id, competitor_alt_ids, reg_strength, n_workers
+    )
+    return conjoint_engine.summarize_estimation(respondents_results, failed_respondents, start_time, n_bootstrap)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded multi-process conjoint estimation.")
+    parser.add_argument('csv', help='Long-format CBC file; settings come from studies.STUDIES')
+    parser.add_argument('--workers', type=int, nargs='+', default=[os.cpu_count()],
+                        help='One or more worker counts to time')
+    parser.add_argument('--respondents', type=int, default=None, help='Use only the first N respondents')
+    args = parser.parse_args()
+
+    study = STUDIES[os.path.basename(args.csv)]
+    data = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    if args.respondents:
+        keep = data['respondent_id'].unique()[:args.respondents]
+        data = data[data['respondent_id'].isin(keep)]
+
+    for n_workers in args.workers:
+        start = time.perf_counter()
+        results, failed = estimate_sharded(
+            data, study['attribute_metadata'], study['none_alternative_id'],
+            study['competitor_alternative_ids'], 1.0, n_workers
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{n_workers:3d} workers: {len(results)} respondents ({len(failed)} failed) "
+              f"in {elapsed:.2f}s ({len(results) / elapsed:.1f} respondents/s)")
+
+
+if __name__ == '__main__':
+    main()
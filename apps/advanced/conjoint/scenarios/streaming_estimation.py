@@ -0,0 +1,146 @@
+"""
+Streaming, respondent-chunked estimation straight from a long-format CBC CSV.
+
+The CSV is read in fixed-size row chunks. Rows are regrouped into batches of
+complete respondents as they arrive, and each batch is fitted while the next
+chunks are parsed on a background thread (or, with --workers, while several
+batches are fitted in other processes). Only a bounded number of parsed
+batches is ever held, so memory stays flat however large the file is; only
+the per-respondent result records accumulate.
+
+The input must be grouped by respondent (every respondent's rows
+contiguous), which is how the generators in this folder write it.
+
+Usage:
+    python streaming_estimation.py smartphone_cbc.csv --batch 50 --workers 4 --output result.json
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import conjoint_engine
+from studies import STUDIES
+
+
+def respondent_runs(ids):
+    """Start index of each run of equal consecutive ids."""
+    return np.concatenate([[0], np.flatnonzero(ids[1:] != ids[:-1]) + 1])
+
+
+def iter_respondent_batches(path, batch_respondents=50, chunk_rows=20000):
+    """Yield DataFrames of batch_respondents complete respondents from a respondent-grouped CSV."""
+    pending = None
+    seen = set()
+    last_id = None
+    for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+        ids = chunk['respondent_id'].to_numpy()
+        new_ids = ids[respondent_runs(ids)]
+        if new_ids[0] == last_id:
+            new_ids = new_ids[1:]  # continues the respondent cut off by the previous chunk
+        for resp_id in new_ids:
+            if resp_id in seen:
+                raise ValueError(f"Respondent {resp_id} is not contiguous in {path}; "
+                                 f"sort the file by respondent_id first")
+            seen.add(resp_id)
+        last_id = ids[-1]
+
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        starts = respondent_runs(chunk['respondent_id'].to_numpy())
+        # The last run may continue in the next chunk; batch only the complete ones
+        n_batched = ((len(starts) - 1) // batch_respondents) * batch_respondents
+        for i in range(0, n_batched, batch_respondents):
+            yield chunk.iloc[starts[i]:starts[i + batch_respondents]]
+        pending = chunk.iloc[starts[n_batched]:]
+
+    if pending is not None and len(pending):
+        starts = np.append(respondent_runs(pending['respondent_id'].to_numpy()), len(pending))
+        for i in range(0, len(starts) - 1, batch_respondents):
+            yield pending.iloc[starts[i]:starts[min(i + batch_respondents, len(starts) - 1)]]
+
+
+def prefetch(iterable, size=2):
+    """Run iterable on a background thread, keeping at most size items buffered."""
+    buffer = queue.Queue(maxsize=size)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        except BaseException as e:
+            buffer.put(e)
+        buffer.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def stream_estimate(path, attribute_metadata, none_alt_id, competitor_alt_ids, reg_strength=1.0,
+                    batch_respondents=50, n_workers=1, chunk_rows=20000, n_bootstrap=1000):
+    """Estimate every respondent in a CSV without loading it whole; returns the result dict."""
+    start_time = time.time()
+    respondents_results, failed_respondents = [], []
+
+    def collect(batch_result):
+        respondents_results.extend(batch_result[0])
+        failed_respondents.extend(batch_result[1])
+
+    batches = prefetch(iter_respondent_batches(path, batch_respondents, chunk_rows))
+    args = (attribute_metadata, none_alt_id, competitor_alt_ids, reg_strength)
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            in_flight = deque()
+            for batch in batches:
+                in_flight.append(pool.submit(conjoint_engine.estimate_respondents, batch, *args))
+                # Bound the batches held by the pool, keeping results in file order
+                if len(in_flight) >= 2 * n_workers:
+                    collect(in_flight.popleft().result())
+            while in_flight:
+                collect(in_flight.popleft().result())
+    else:
+        for batch in batches:
+            collect(conjoint_engine.estimate_respondents(batch, *args))
+
+    return conjoint_engine.summarize_estimation(respondents_results, failed_respondents, start_time, n_bootstrap)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming conjoint estimation from a CBC CSV.")
+    parser.add_argument('csv', help='Respondent-grouped long-format CBC file; settings come from studies.STUDIES')
+    parser.add_argument('--batch', type=int, default=50, help='Respondents per fitted batch')
+    parser.add_argument('--chunk-rows', type=int, default=20000, help='CSV rows parsed per read')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', default=None, help='Write the result JSON here')
+    args = parser.parse_args()
+
+    study = STUDIES[os.path.basename(args.csv)]
+    result = stream_estimate(
+        args.csv, study['attribute_metadata'], study['none_alternative_id'],
+        study['competitor_alternative_ids'], batch_respondents=args.batch,
+        n_workers=args.workers, chunk_rows=args.chunk_rows
+    )
+    print(f"{len(result['respondents'])} respondents ({len(result['failed_respondents'])} failed) "
+          f"in {result['estimation_time_seconds']:.2f}s, mean pseudo-R² {result['mean_pseudo_r2']:.3f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
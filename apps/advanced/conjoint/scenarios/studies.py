@@ -0,0 +1,41 @@
+"""
+Estimation settings (attribute types, None and competitor alternatives) for each
+scenario CSV, keyed by file name. Kept free of dependencies so any script can
+import it.
+"""
+
+STUDIES = {
+    'smartphone_cbc.csv': {
+        "attribute_metadata": {
+            "brand": {"type": "categorical"},
+            "screen_size": {"type": "numeric_linear"},
+            "storage": {"type": "categorical"},
+            "battery_life": {"type": "numeric_linear"},
+            "camera": {"type": "categorical"},
+            "price": {"type": "price"}
+        },
+        "none_alternative_id": "None",
+        "competitor_alternative_ids": ["iPhone", "Samsung"]
+    },
+    'streaming_service_cbc.csv': {
+        "attribute_metadata": {
+            "library_size": {"type": "categorical"},
+            "original_content": {"type": "categorical"},
+            "ad_experience": {"type": "categorical"},
+            "simultaneous_streams": {"type": "numeric_linear"},
+            "video_quality": {"type": "categorical"},
+            "price": {"type": "price"}
+        },
+        "none_alternative_id": "None",
+        "competitor_alternative_ids": ["Netflix", "DisneyPlus"]
+    },
+    'course_design_cbc.csv': {
+        "attribute_metadata": {
+            "course_format": {"type": "categorical"},
+            "weekly_hours": {"type": "numeric_linear"},
+            "assessment_style": {"type": "categorical"}
+        },
+        "none_alternative_id": "None",
+        "competitor_alternative_ids": []
+    }
+}
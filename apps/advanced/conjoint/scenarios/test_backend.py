@@ -3,27 +3,165 @@ Test the conjoint estimation endpoint locally.
 This script sends a small sample of CBC data to the backend to verify the estimation works.
 """
 import requests
+import base64
 import csv
+import gzip
 import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from respondent_index import load_index, read_respondents
+from studies import STUDIES
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Read a subset of the smartphone data
 def load_sample_data(filename, max_respondents=5):
-    """Load a sample of CBC data for testing."""
-    data = []
-    with open(filename, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.append(row)
-    
-    # Get unique respondents
-    respondents = list(set(row['respondent_id'] for row in data))[:max_respondents]
-    
-    # Filter to only those respondents
-    sample_data = [row for row in data if row['respondent_id'] in respondents]
+    """Load a sample of CBC data for testing (only the sampled respondents' rows are read)."""
+    index = load_index(filename)
+    respondents = index['respondent_ids'][:max_respondents]
+    sample_data = read_respondents(filename, respondents, index)
     
     print(f"Loaded {len(sample_data)} observations from {len(respondents)} respondents")
     return sample_data
 
+def build_payload(sample_data, study='smartphone_cbc.csv'):
+    """Build the estimation payload for one of the scenario studies."""
+    return {
+        "data": sample_data,
+        **STUDIES[study],
+        "model_options": {
+            "regularization": "L2",
+            "reg_strength": 1.0
+        }
+    }
+
+def build_columnar_payload(sample_data, study='smartphone_cbc.csv'):
+    """Build a columnar-v1 payload: dictionary-encoded strings and float64 arrays.
+    
+    Numeric columns are sent as base64 little-endian float64 ('' becomes NaN,
+    which the engine treats like an unparseable string). Everything else,
+    including task ids and numeric levels of categorical attributes, keeps
+    its original strings in the dictionary so tasks and levels sort exactly
+    as in the row format.
+    """
+    payload = build_payload([], study)
+    del payload['data']
+    numeric_columns = {'chosen'} | {
+        attr for attr, config in payload['attribute_metadata'].items()
+        if config.get('type') in ('numeric_linear', 'numeric_quadratic', 'price')
+    }
+    
+    columns = {}
+    for name in (sample_data[0].keys() if sample_data else []):
+        values = [row[name] for row in sample_data]
+        if name in numeric_columns:
+            try:
+                array = np.array([float(v) if v != '' else np.nan for v in values], dtype='<f8')
+                columns[name] = {"kind": "numeric", "values": base64.b64encode(array.tobytes()).decode('ascii')}
+                continue
+            except ValueError:
+                pass  # non-numeric entries; fall back to dictionary encoding
+        categories = {}
+        codes = np.array([categories.setdefault(v, len(categories)) for v in values], dtype='<i4')
+        columns[name] = {
+            "kind": "dictionary",
+            "categories": list(categories),
+            "codes": base64.b64encode(codes.tobytes()).decode('ascii')
+        }
+    
+    payload.update({"format": "columnar-v1", "n_rows": len(sample_data), "columns": columns})
+    return payload
+
+def encode_body(payload, compression=None):
+    """Serialize a payload; returns (body bytes, request headers)."""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if compression == 'gzip':
+        body = gzip.compress(body, compresslevel=6)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+    elif compression is not None:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression:
+        headers['Content-Encoding'] = compression
+    return body, headers
+
+def server_timing(response, metric='decode'):
+    """Read a duration (seconds) from the Server-Timing response header, if present."""
+    for entry in response.headers.get('Server-Timing', '').split(','):
+        name, _, params = entry.strip().partition(';')
+        if name == metric and params.startswith('dur='):
+            return float(params[4:]) / 1000
+    return None
+
+def compare_payload_formats(api_url, study='streaming_service_cbc.csv', max_respondents=250,
+                            compression='gzip'):
+    """POST the same study as row JSON and as compressed columnar JSON; compare bytes and decode time."""
+    print(f"\n1. Loading {study}...")
+    sample_data = load_sample_data(study, max_respondents=max_respondents)
+    
+    variants = [
+        ("rows", build_payload(sample_data, study), None),
+        (f"columnar+{compression}", build_columnar_payload(sample_data, study), compression)
+    ]
+    
+    print(f"\n2. Sending both formats to {api_url}...")
+    results = {}
+    for label, payload, codec in variants:
+        body, headers = encode_body(payload, codec)
+        response = requests.post(api_url, data=body, headers=headers, timeout=600)
+        if response.status_code != 200:
+            print(f"\n✗ ERROR: {label} request failed ({response.status_code}): {response.text[:500]}")
+            return False
+        decode = server_timing(response)
+        results[label] = response.json()
+        print(f"   - {label:>16}: {len(body) / 1024:8.1f} KiB, server decode "
+              f"{decode * 1000 if decode is not None else float('nan'):7.1f} ms")
+    
+    row_result, col_result = results.values()
+    same = (row_result['aggregate_summaries']['mean_attribute_importance'] ==
+            col_result['aggregate_summaries']['mean_attribute_importance'])
+    print(f"\n3. Identical importances from both formats: {'yes' if same else 'NO'}")
+    return same
+
+def report_result(result):
+    """Print a summary of an estimation result and save it to test_result.json."""
+    print(f"\n4. Results summary:")
+    print(f"   - Respondents estimated: {len(result.get('respondents', []))}")
+    print(f"   - Mean pseudo-R²: {result.get('mean_pseudo_r2', 'N/A'):.3f}")
+    print(f"   - Mean tasks/respondent: {result.get('mean_tasks_per_respondent', 'N/A'):.1f}")
+    print(f"   - Estimation time: {result.get('estimation_time_seconds', 'N/A'):.2f}s")
+    
+    # Show attribute importance
+    importance = result.get('aggregate_summaries', {}).get('mean_attribute_importance', {})
+    if importance:
+        print(f"\n5. Attribute importance:")
+        for attr, imp in sorted(importance.items(), key=lambda x: x[1], reverse=True):
+            print(f"   - {attr}: {imp:.1f}%")
+    
+    # Show sample utilities for first respondent
+    if result.get('respondents'):
+        first_resp = result['respondents'][0]
+        print(f"\n6. Sample coefficients for {first_resp['respondent_id']}:")
+        for coef_name, coef_val in list(first_resp['coefficients'].items())[:5]:
+            print(f"   - {coef_name}: {coef_val:.4f}")
+        print(f"   ... ({len(first_resp['coefficients'])} total coefficients)")
+    
+    # Save full result to file
+    with open('test_result.json', 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n✓ Full result saved to test_result.json")
+
 def test_conjoint_endpoint(api_url, use_local=True):
     """Test the conjoint estimation endpoint."""
     
@@ -33,23 +171,7 @@ def test_conjoint_endpoint(api_url, use_local=True):
     
     # Build payload
     print("\n2. Building API payload...")
-    payload = {
-        "data": sample_data,
-        "attribute_metadata": {
-            "brand": {"type": "categorical"},
-            "screen_size": {"type": "numeric_linear"},
-            "storage": {"type": "categorical"},
-            "battery_life": {"type": "numeric_linear"},
-            "camera": {"type": "categorical"},
-            "price": {"type": "price"}
-        },
-        "none_alternative_id": "None",
-        "competitor_alternative_ids": ["iPhone", "Samsung"],
-        "model_options": {
-            "regularization": "L2",
-            "reg_strength": 1.0
-        }
-    }
+    payload = build_payload(sample_data)
     
     print(f"   - {len(sample_data)} observations")
     print(f"   - {len(set(r['respondent_id'] for r in sample_data))} respondents")
@@ -70,31 +192,7 @@ def test_conjoint_endpoint(api_url, use_local=True):
         if response.status_code == 200:
             result = response.json()
             print("\n✓ SUCCESS! Estimation completed.")
-            print(f"\n4. Results summary:")
-            print(f"   - Respondents estimated: {len(result.get('respondents', []))}")
-            print(f"   - Mean pseudo-R²: {result.get('mean_pseudo_r2', 'N/A'):.3f}")
-            print(f"   - Mean tasks/respondent: {result.get('mean_tasks_per_respondent', 'N/A'):.1f}")
-            print(f"   - Estimation time: {result.get('estimation_time_seconds', 'N/A'):.2f}s")
-            
-            # Show attribute importance
-            importance = result.get('aggregate_summaries', {}).get('mean_attribute_importance', {})
-            if importance:
-                print(f"\n5. Attribute importance:")
-                for attr, imp in sorted(importance.items(), key=lambda x: x[1], reverse=True):
-                    print(f"   - {attr}: {imp:.1f}%")
-            
-            # Show sample utilities for first respondent
-            if result.get('respondents'):
-                first_resp = result['respondents'][0]
-                print(f"\n6. Sample coefficients for {first_resp['respondent_id']}:")
-                for coef_name, coef_val in list(first_resp['coefficients'].items())[:5]:
-                    print(f"   - {coef_name}: {coef_val:.4f}")
-                print(f"   ... ({len(first_resp['coefficients'])} total coefficients)")
-            
-            # Save full result to file
-            with open('test_result.json', 'w') as f:
-                json.dump(result, f, indent=2)
-            print(f"\n✓ Full result saved to test_result.json")
+            report_result(result)
             
             return True
         else:
@@ -108,6 +206,165 @@ def test_conjoint_endpoint(api_url, use_local=True):
         traceback.print_exc()
         return False
 
+def test_conjoint_job_queue(base_url, max_respondents=50, poll_interval=1.0, max_wait=600):
+    """Submit an estimation job and poll it until the result is ready.
+
+    Works against local_estimation_server.py, which splits the respondents
+    into chunks on a process pool instead of holding one long request open.
+    """
+    
+    print("\n1. Loading sample smartphone CBC data...")
+    sample_data = load_sample_data('smartphone_cbc.csv', max_respondents=max_respondents)
+    payload = build_payload(sample_data)
+    
+    print(f"\n2. Submitting job to {base_url}jobs/...")
+    try:
+        response = requests.post(f"{base_url}jobs/", json=payload, timeout=30)
+        if response.status_code != 202:
+            print(f"\n✗ ERROR: Submit failed ({response.status_code})")
+            print(f"   Response: {response.text[:500]}")
+            return False
+        job = response.json()
+        print(f"   - Job id: {job['job_id']}")
+        
+        print("\n3. Polling job status...")
+        with requests.Session() as session:
+            deadline = time.time() + max_wait
+            while time.time() < deadline:
+                status = session.get(f"{base_url}jobs/{job['job_id']}/", timeout=30).json()
+                print(f"   - {status['status']}: {status['respondents_done']}/{status['respondents_total']} "
+                      f"respondents ({status['elapsed_seconds']:.1f}s)")
+                if status['status'] in ('completed', 'failed'):
+                    break
+                time.sleep(poll_interval)
+            
+            response = session.get(f"{base_url}jobs/{job['job_id']}/result/", timeout=30)
+        
+        if response.status_code == 200:
+            print("\n✓ SUCCESS! Job completed.")
+            report_result(response.json())
+            return True
+        print(f"\n✗ ERROR: Job did not complete ({response.status_code})")
+        print(f"   Response: {response.text[:500]}")
+        return False
+    
+    except Exception as e:
+        print(f"\n✗ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def build_load_payloads(studies, payload_sizes, n_payloads, seed=42, payload_format='rows', compression=None):
+    """Pre-encode request bodies of varying respondent counts drawn from the scenario CSVs."""
+    rng = random.Random(seed)
+    by_study = {}
+    for study in studies:
+        respondents = {}
+        with open(study, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                respondents.setdefault(row['respondent_id'], []).append(row)
+        by_study[study] = list(respondents.values())
+    
+    payloads = []
+    for i in range(n_payloads):
+        study = studies[i % len(studies)]
+        size = payload_sizes[i % len(payload_sizes)]
+        chosen = rng.sample(by_study[study], min(size, len(by_study[study])))
+        rows = [row for resp_rows in chosen for row in resp_rows]
+        builder = build_columnar_payload if payload_format == 'columnar' else build_payload
+        body, headers = encode_body(builder(rows, study), compression)
+        payloads.append({"study": study, "respondents": len(chosen), "body": body, "headers": headers})
+    return payloads
+
+def run_load_test(api_url, n_clients=8, requests_per_client=4, payload_sizes=(5, 20),
+                  studies=('smartphone_cbc.csv', 'streaming_service_cbc.csv', 'course_design_cbc.csv'),
+                  timeout=300, payload_format='rows', compression=None):
+    """Drive n_clients concurrent clients against the estimation endpoint and report latency stats.
+    
+    Each client thread keeps one requests.Session, so its requests reuse a
+    pooled keep-alive connection. Payloads are built up front so JSON encoding
+    is not part of the measured time.
+    """
+    studies = list(studies)
+    payload_sizes = list(payload_sizes)
+    n_total = n_clients * requests_per_client
+    
+    print(f"\n1. Building {n_total} payloads ({payload_sizes} respondents, {len(studies)} studies)...")
+    payloads = build_load_payloads(studies, payload_sizes, n_total,
+                                   payload_format=payload_format, compression=compression)
+    
+    def client(client_idx):
+        records = []
+        with requests.Session() as session:
+            for j in range(requests_per_client):
+                payload = payloads[client_idx * requests_per_client + j]
+                record = {"respondents": payload['respondents'], "bytes": len(payload['body'])}
+                start = time.perf_counter()
+                try:
+                    response = session.post(api_url, data=payload['body'], headers=payload['headers'],
+                                            timeout=timeout)
+                    record['status'] = response.status_code
+                    if response.status_code == 200:
+                        record['server_seconds'] = response.json().get('estimation_time_seconds')
+                except requests.RequestException as e:
+                    record['status'] = None
+                    record['error'] = type(e).__name__
+                record['seconds'] = time.perf_counter() - start
+                records.append(record)
+        return records
+    
+    print(f"\n2. Running {n_clients} concurrent clients x {requests_per_client} requests against {api_url}...")
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(n_clients, 1)) as pool:
+        records = [r for client_records in pool.map(client, range(n_clients)) for r in client_records]
+    wall = time.perf_counter() - wall_start
+    
+    ok = [r for r in records if r['status'] == 200]
+    latencies = sorted(r['seconds'] for r in ok)
+    server_times = [r['server_seconds'] for r in ok if r.get('server_seconds') is not None]
+    throughput = len(records) / wall if records and wall > 0 else 0.0
+    
+    print("\n3. Load test results:")
+    if not records:
+        print("   - No requests were run")
+    else:
+        print(f"   - Requests: {len(records)} in {wall:.2f}s ({throughput:.2f} req/s, "
+              f"{sum(r['respondents'] for r in ok) / wall:.1f} respondents/s)")
+        print(f"   - Errors: {len(records) - len(ok)} ({(len(records) - len(ok)) / len(records) * 100:.1f}%)")
+    errors = {}
+    for r in records:
+        if r['status'] != 200:
+            key = r.get('error') or f"HTTP {r['status']}"
+            errors[key] = errors.get(key, 0) + 1
+    for key, count in errors.items():
+        print(f"       {key}: {count}")
+    if ok:
+        print(f"   - Latency p50/p95/p99: {percentile(latencies, 50):.2f}s / "
+              f"{percentile(latencies, 95):.2f}s / {percentile(latencies, 99):.2f}s (max {latencies[-1]:.2f}s)")
+    if server_times:
+        mean_e2e = sum(r['seconds'] for r in ok if r.get('server_seconds') is not None) / len(server_times)
+        mean_server = sum(server_times) / len(server_times)
+        print(f"   - Mean end-to-end: {mean_e2e:.2f}s, server estimation_time_seconds: {mean_server:.2f}s "
+              f"({(1 - mean_server / mean_e2e) * 100:.0f}% queueing/transfer overhead)")
+    
+    return {
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "wall_seconds": wall,
+        "throughput_rps": throughput,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "records": records
+    }
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Conjoint Analysis Endpoint Test")
@@ -115,6 +372,12 @@ if __name__ == '__main__':
     
     # Test options
     USE_LOCAL = True  # Set to False to test production server
+    USE_JOB_QUEUE = False  # Set to True to test local_estimation_server.py job mode
+    USE_LOAD_TEST = False  # Set to True to simulate a whole class hitting the endpoint at once
+    COMPARE_PAYLOAD_FORMATS = False  # Set to True to compare row JSON with compressed columnar payloads
+    LOAD_CLIENTS = 8
+    LOAD_REQUESTS_PER_CLIENT = 4
+    LOAD_PAYLOAD_SIZES = [5, 20]  # respondents per request
     
     if USE_LOCAL:
         # Local development server
@@ -129,7 +392,16 @@ if __name__ == '__main__':
     print(f"\nEndpoint: {api_url}")
     
     # Run test
-    success = test_conjoint_endpoint(api_url, use_local=USE_LOCAL)
+    if COMPARE_PAYLOAD_FORMATS:
+        success = compare_payload_formats(api_url)
+    elif USE_LOAD_TEST:
+        result = run_load_test(api_url, LOAD_CLIENTS, LOAD_REQUESTS_PER_CLIENT, LOAD_PAYLOAD_SIZES)
+        success = result['errors'] == 0
+    elif USE_JOB_QUEUE:
+        print("   (job queue mode: python local_estimation_server.py)")
+        success = test_conjoint_job_queue(api_url.replace('estimate/', ''))
+    else:
+        success = test_conjoint_endpoint(api_url, use_local=USE_LOCAL)
     
     print("\n" + "=" * 60)
     if success:
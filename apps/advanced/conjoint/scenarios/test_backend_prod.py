@@ -115,6 +115,7 @@ if __name__ == '__main__':
     
     # Test options
     USE_LOCAL = False  # Set to False to test production server
+    USE_LOAD_TEST = False  # Set to True to run the concurrent load test from test_backend.py
     
     if USE_LOCAL:
         # Local development server
@@ -129,7 +130,11 @@ if __name__ == '__main__':
     print(f"\nEndpoint: {api_url}")
     
     # Run test
-    success = test_conjoint_endpoint(api_url, use_local=USE_LOCAL)
+    if USE_LOAD_TEST:
+        from test_backend import run_load_test
+        success = run_load_test(api_url, n_clients=4, requests_per_client=2, payload_sizes=[5])['errors'] == 0
+    else:
+        success = test_conjoint_endpoint(api_url, use_local=USE_LOCAL)
     
     print("\n" + "=" * 60)
     if success:
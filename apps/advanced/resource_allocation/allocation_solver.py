@@ -0,0 +1,518 @@
+"""
+Exact discrete allocation for the resource allocation optimizer.
+
+Each resource gets its lower bound plus a whole number of budget units
+(default unit: the largest power of ten that still gives at least 1,000
+units of budget, e.g. $100 for the bundled scenarios; --unit 1 for the
+app's whole-dollar constraint), up to its upper bound. Bounds combine the
+app's min/max per resource, historical range (without extrapolation) and
+baseline deviation limits. Each allocation contributes its fitted model's
+output (response_models). The solver maximizes total output subject to:
+
+    budget        total allocation <= budget
+    cardinality   min <= number of funded resources <= max
+                  (funded = above the minimum per resource, as in the app)
+    equity        largest funded allocation <= ratio x smallest funded one
+
+This is a multiple-choice knapsack. It is solved by dynamic programming over
+resources, with a table indexed by [funded count, budget units]. The count
+axis only exists when cardinality limits are set. Each resource's options
+update the table with whole-array shifts, so the cost is
+(options x counts x budget units) array work per resource, with no Python
+loop over budget values. Response curves need not be concave.
+
+Equity limits are handled by branch-and-bound over m, the smallest funded
+allocation. A node covering m in [m1, m2] solves the DP with funded
+allocations restricted to [m1, ratio x m2]. That relaxation bounds every
+solution in the node. Restricting allocations to [m1, ratio x m1] gives a
+feasible solution. Nodes are explored best bound first. A node is closed
+when its relaxation is feasible or its bound cannot beat the incumbent.
+
+Large portfolios degrade gracefully:
+
+  - When the count axis makes the table too large, cardinality is relaxed
+    with a Lagrangian penalty per funded resource. Bisection on the penalty
+    gives both an upper bound and count-feasible solutions.
+  - When the table is still too large for the time budget, budget units
+    are grouped g at a time. Two DPs are run on the coarse grid. Rounding
+    each option's cost down gives an upper bound. Rounding it up gives a
+    feasible allocation, whose leftover units are then spent greedily.
+    g is halved while time allows.
+
+At g = 1 with every node closed, the answer is proven optimal. Otherwise the
+result reports the gap between the bounds. The time limit is checked
+between nodes, so a node already started runs to completion.
+
+    python allocation_solver.py scenarios/regional_field_marketing.csv
+    python allocation_solver.py scenarios/sales_team_travel.csv --unit 1 --time-limit 5
+    python allocation_solver.py --stress 2000 --budget 40000000 --min-per-resource 5000 \\
+        --max-per-resource 60000 --max-resources 500 --time-limit 20
+"""
+
+import argparse
+import heapq
+import json
+import math
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+import response_models
+
+DEFAULT_TIME_LIMIT = 10.0
+# Array cells per DP pass aimed for when picking the first grid
+WORK_TARGET = 1e8
+TOLERANCE = 1e-9
+# Bisection steps on the cardinality penalty when the count axis is relaxed
+LAGRANGE_STEPS = 30
+
+
+def default_unit(budget):
+    """Largest power of ten giving at least 1,000 budget units (at least 1)."""
+    return float(10 ** max(0, math.floor(math.log10(max(budget, 1) / 1000))))
+
+
+def historical_inputs(resource_ids, inputs):
+    """{resource_id: {"min", "max", "first"}} of historical inputs."""
+    history = {}
+    for resource_id, x in zip(resource_ids, inputs):
+        h = history.setdefault(resource_id, {"min": x, "max": x, "first": x})
+        h['min'], h['max'] = min(h['min'], x), max(h['max'], x)
+    return history
+
+
+def allocation_bounds(history, constraints):
+    """Per-resource (min, max) allocations.
+
+    As in the app's projectOntoConstraints, the baseline band is applied last
+    and wins when it does not overlap the other bounds.
+    """
+    c = constraints
+    bounds = {}
+    for resource_id, h in history.items():
+        low, high = c.get('minPerResource', 0.0), c.get('maxPerResource') or math.inf
+        if not c.get('allowExtrapolation', True):
+            low, high = max(low, h['min']), min(high, h['max'])
+        if c.get('baselineEnabled'):
+            change = h['first'] * c.get('baselineDeviation', 50) / 100
+            band = (h['first'] - change, h['first'] + change)
+            low, high = min(max(low, band[0]), band[1]), min(max(high, band[0]), band[1])
+        bounds[resource_id] = (low, high)
+    return bounds
+
+
+def build_problem(models, bounds, constraints, unit):
+    """Options per resource: allocations (lower bound + k units), outputs and funded flags.
+
+    models maps resource ids to {"type", "params"} (response_models.select_models).
+    """
+    c = constraints
+    ids = list(models)
+    infeasible = [i for i in ids if bounds[i][1] < bounds[i][0]]
+    if infeasible:
+        raise ValueError(f"No allocation satisfies the bounds of: {', '.join(infeasible)}")
+    spare = c['totalBudget'] - sum(bounds[i][0] for i in ids)
+    if spare < -TOLERANCE:
+        raise ValueError('Minimum allocations exceed the total budget')
+    capacity = math.floor(spare / unit + TOLERANCE)
+
+    resources = []
+    for i in ids:
+        low, high = bounds[i]
+        steps = min(capacity, math.floor((high - low) / unit + TOLERANCE) if math.isfinite(high) else capacity)
+        allocations = low + unit * np.arange(steps + 1)
+        resources.append({
+            "id": i,
+            "allocations": allocations,
+            "values": response_models.predict(models[i]['type'], models[i]['params'], allocations),
+            "funded": allocations > c.get('minPerResource', 0.0) + TOLERANCE
+        })
+
+    counting = bool(c.get('cardinalityEnabled'))
+    return {
+        "resources": resources,
+        "unit": unit,
+        "capacity": capacity,
+        "counts": (int(c.get('minResources', 0)), int(min(c.get('maxResources', len(ids)), len(ids))))
+                  if counting else None,
+        "equity_ratio": c.get('equityRatio') if c.get('equityEnabled') else None
+    }
+
+
+def _grouped_options(resource, window, grid, round_up):
+    """Options allowed in the funded allocation window, with costs in grid steps.
+
+    Keeps the best option per (cost, funded). Rounding costs down (round_up
+    False) relaxes the budget; rounding up keeps it.
+    """
+    allocations, funded = resource['allocations'], resource['funded']
+    if window:
+        allowed = ~funded | ((allocations >= window[0] - TOLERANCE) & (allocations <= window[1] + TOLERANCE))
+    else:
+        allowed = np.ones(len(allocations), bool)
+    k = np.flatnonzero(allowed)
+    values, flags = resource['values'][allowed], funded[allowed]
+    costs = -(-k // grid) if round_up else k // grid
+
+    # Highest value first within each (cost, funded) pair, cheapest cost first overall
+    order = np.lexsort((-values, flags, costs))
+    costs, values, flags, k = costs[order], values[order], flags[order], k[order]
+    first = np.ones(len(costs), bool)
+    first[1:] = (costs[1:] != costs[:-1]) | (flags[1:] != flags[:-1])
+    keep = first & np.isfinite(values)
+    return costs[keep], values[keep], flags[keep], k[keep]
+
+
+def knapsack(problem, window=None, grid=1, round_up=True, penalty=None):
+    """Best allocation with funded allocations in window, or None if infeasible.
+
+    With a penalty, cardinality limits are dropped and every funded resource
+    costs penalty output instead (Lagrangian relaxation of the count axis).
+    Returns (total output less penalties, option index per resource).
+    """
+    capacity = problem['capacity'] // grid
+    counts = problem['counts'] if penalty is None else None
+    n_counts = counts[1] + 1 if counts else 1
+
+    table = np.full((n_counts, capacity + 1), -np.inf)
+    table[0] = 0.0
+    picks, options = [], []
+    for resource in problem['resources']:
+        costs, values, flags, offsets = _grouped_options(resource, window, grid, round_up)
+        if penalty:
+            values = values - penalty * flags
+        updated = np.full_like(table, -np.inf)
+        pick = np.full(table.shape, -1, dtype=np.int16 if len(costs) < 2 ** 15 else np.int32)
+        for j in range(len(costs)):
+            cost, step = int(costs[j]), int(flags[j]) if counts else 0
+            if cost > capacity or step >= n_counts:
+                continue
+            candidate = table[:n_counts - step, :capacity + 1 - cost] + values[j]
+            better = candidate > updated[step:, cost:]
+            np.copyto(updated[step:, cost:], candidate, where=better)
+            np.copyto(pick[step:, cost:], j, where=better)
+        table = updated
+        picks.append(pick)
+        options.append((costs, flags, offsets))
+
+    allowed = np.arange(counts[0], n_counts) if counts else np.array([0])
+    if not len(allowed) or not np.isfinite(table[allowed, capacity]).any():
+        return None
+    count = int(allowed[np.argmax(table[allowed, capacity])])
+    best = float(table[count, capacity])
+
+    budget, chosen = capacity, []
+    for pick, (costs, flags, offsets) in zip(reversed(picks), reversed(options)):
+        j = pick[count, budget]
+        chosen.append(int(offsets[j]))
+        budget -= int(costs[j])
+        count -= int(flags[j]) if counts else 0
+    return best, np.array(chosen[::-1])
+
+
+def _lagrangian_counts(problem, window, grid, round_up):
+    """Cardinality limits by Lagrangian relaxation: (upper bound, best count-feasible solution or None).
+
+    For any penalty mu, the penalized optimum plus mu x max count (mu >= 0) or
+    mu x min count (mu < 0) bounds the constrained optimum. The number funded
+    falls as mu grows, so mu is bisected towards the limit that binds.
+    """
+    min_count, max_count = problem['counts']
+    state = {"bound": np.inf, "best": None}
+
+    def run(mu):
+        result = knapsack(problem, window, grid, round_up, penalty=mu)
+        if result is None:
+            return None
+        value, indices = result
+        count = sum(int(r['funded'][k]) for r, k in zip(problem['resources'], indices))
+        state['bound'] = min(state['bound'], value + mu * (max_count if mu >= 0 else min_count))
+        if min_count <= count <= max_count and (state['best'] is None or value + mu * count > state['best'][0]):
+            state['best'] = (value + mu * count, indices)
+        return count
+
+    count = run(0.0)
+    if count is None:
+        return -np.inf, None
+    if not min_count <= count <= max_count:
+        # Beyond the largest output span no resource is worth funding (or leaving unfunded)
+        span = max(float(np.ptp(r['values'])) for r in problem['resources']) + 1.0
+        too_many = count > max_count
+        low, high = (0.0, span) if too_many else (-span, 0.0)
+        for _ in range(LAGRANGE_STEPS):
+            mu = (low + high) / 2
+            count = run(mu)
+            if count is None:
+                break
+            if (count > max_count) if too_many else (count >= min_count):
+                low = mu
+            else:
+                high = mu
+    return state['bound'], state['best']
+
+
+def _evaluate(problem, window, grid, round_up, relax_counts):
+    """(upper bound, best solution found or None) for one funded window."""
+    if relax_counts:
+        return _lagrangian_counts(problem, window, grid, round_up)
+    result = knapsack(problem, window, grid, round_up)
+    return (result[0], result) if result else (-np.inf, None)
+
+
+def _fill(problem, solution, ratio=None):
+    """Spend budget units left over by a coarse grid on funded resources, best marginal gain first.
+
+    Funded resources stay funded and below ratio x the smallest funded
+    allocation, so the solution stays feasible.
+    """
+    resources, indices = problem['resources'], solution[1].copy()
+    funded = [i for i, (r, k) in enumerate(zip(resources, indices)) if r['funded'][k]]
+    if not funded:
+        return solution
+    limit = ratio * min(resources[i]['allocations'][indices[i]] for i in funded) if ratio else np.inf
+    leftover = problem['capacity'] - int(indices.sum())
+
+    queue = []
+
+    def push(i):
+        r, k = resources[i], indices[i]
+        if k + 1 < len(r['allocations']) and r['allocations'][k + 1] <= limit + TOLERANCE:
+            gain = r['values'][k + 1] - r['values'][k]
+            if gain > 0:
+                heapq.heappush(queue, (-gain, i))
+
+    for i in funded:
+        push(i)
+    value = solution[0]
+    while leftover > 0 and queue:
+        gain, i = heapq.heappop(queue)
+        indices[i] += 1
+        value -= gain
+        leftover -= 1
+        push(i)
+    return value, indices
+
+
+def _equity_feasible(problem, offsets, ratio):
+    funded = [r['allocations'][k] for r, k in zip(problem['resources'], offsets) if r['funded'][k]]
+    return len(funded) < 2 or max(funded) <= ratio * min(funded) + TOLERANCE
+
+
+def _dp_work(problem, grid, relax_counts=False):
+    """Table cells touched to evaluate one node."""
+    passes = LAGRANGE_STEPS + 1 if relax_counts else 1
+    counts = problem['counts'][1] + 1 if problem['counts'] and not relax_counts else 1
+    options = sum(len(r['allocations']) // grid + 2 for r in problem['resources'])
+    return passes * options * counts * (problem['capacity'] // grid + 1)
+
+
+def _search(problem, grid, deadline, incumbent, relax_counts=False):
+    """Branch-and-bound at one grid. Returns (incumbent, upper bound, complete, nodes).
+
+    incumbent is (output, option indices) or None. Nodes are index ranges
+    into the sorted distinct funded allocations (candidates for the smallest
+    one); without equity limits there is a single node covering everything.
+    """
+    ratio = problem['equity_ratio']
+    exact = grid == 1
+    candidates = np.unique(np.concatenate([r['allocations'][r['funded']] for r in problem['resources']]))
+    if ratio and len(candidates):
+        root = (0, len(candidates) - 1)
+    else:
+        root, ratio = None, None
+
+    def beats(bound):
+        return incumbent is None or bound > incumbent[0] + TOLERANCE * max(1.0, abs(incumbent[0]))
+
+    open_upper, nodes, complete = -np.inf, 0, True
+    queue = [(-np.inf, root)]
+    while queue:
+        parent_bound, node = heapq.heappop(queue)
+        if not beats(-parent_bound):
+            continue
+        if time.perf_counter() > deadline:
+            open_upper = max(open_upper, -parent_bound)
+            open_upper = max([open_upper] + [-b for b, _ in queue])
+            complete = False
+            break
+        nodes += 1
+
+        window = (candidates[node[0]], ratio * candidates[node[1]]) if node else None
+        bound, relaxed = _evaluate(problem, window, grid, False, relax_counts)
+        if not beats(bound):
+            continue
+        # At grid 1 the relaxation's solution respects the budget; if it also meets the
+        # equity limit and attains the bound, the node is solved
+        if exact and relaxed and (not node or _equity_feasible(problem, relaxed[1], ratio)):
+            if beats(relaxed[0]):
+                incumbent = relaxed
+            if relaxed[0] >= bound - TOLERANCE * max(1.0, abs(bound)):
+                continue
+
+        smallest = candidates[node[0]] if node else None
+        if node or not exact:
+            _, feasible = _evaluate(problem, (smallest, ratio * smallest) if node else None, grid, True,
+                                    relax_counts)
+            if feasible and not exact:
+                feasible = _fill(problem, feasible, ratio)
+            if feasible and beats(feasible[0]):
+                incumbent = feasible
+
+        if node and node[0] < node[1] and (exact or candidates[node[1]] - smallest >= grid * problem['unit']):
+            middle = (node[0] + node[1]) // 2
+            heapq.heappush(queue, (-bound, (node[0], middle)))
+            heapq.heappush(queue, (-bound, (middle + 1, node[1])))
+        else:
+            open_upper = max(open_upper, bound)
+
+    upper = max(open_upper, incumbent[0] if incumbent else -np.inf)
+    return incumbent, upper, complete, nodes
+
+
+def solve(problem, time_limit=DEFAULT_TIME_LIMIT, grid=None):
+    """Best allocation found within time_limit seconds, with a proven upper bound.
+
+    Cardinality limits get a count axis in the DP unless that makes a pass
+    larger than WORK_TARGET cells, in which case they are relaxed with a
+    Lagrangian penalty. Starts at the finest grid (power of two) whose node
+    evaluation fits WORK_TARGET cells, or at grid, and halves it while the
+    next pass is expected to finish in time. status is 'optimal' once the
+    search at grid 1 closes every node, 'gap' otherwise, or 'infeasible'.
+    """
+    start = time.perf_counter()
+    deadline = start + time_limit
+    relax_counts = bool(problem['counts']) and _dp_work(problem, 1) > WORK_TARGET
+    if grid is None:
+        grid = 1
+        while _dp_work(problem, grid, relax_counts) > WORK_TARGET and grid < max(problem['capacity'], 1):
+            grid *= 2
+
+    incumbent, upper, nodes, status, history = None, np.inf, 0, 'gap', []
+    while True:
+        round_start = time.perf_counter()
+        incumbent, round_upper, complete, round_nodes = _search(problem, grid, deadline, incumbent, relax_counts)
+        nodes += round_nodes
+        upper = min(upper, round_upper)
+        history.append({"grid": grid, "nodes": round_nodes, "seconds": time.perf_counter() - round_start,
+                        "lower": incumbent[0] if incumbent else None, "upper": float(round_upper)})
+        if round_upper == -np.inf:
+            status = 'infeasible'
+            break
+        if grid == 1 and complete and incumbent and upper <= incumbent[0] + TOLERANCE * max(1.0, abs(upper)):
+            status, upper = 'optimal', incumbent[0]
+            break
+        # A pass at half the grid costs about four times as much
+        elapsed = time.perf_counter() - round_start
+        if grid == 1 or time.perf_counter() + 4 * elapsed > deadline:
+            break
+        grid //= 2
+
+    result = _result(problem, incumbent, upper, status, nodes, history, time.perf_counter() - start)
+    result['cardinality'] = ('lagrangian' if relax_counts else 'exact') if problem['counts'] else None
+    return result
+
+
+def _result(problem, incumbent, upper, status, nodes, history, seconds):
+    unit = problem['unit']
+    allocations = {}
+    if incumbent:
+        for resource, k in zip(problem['resources'], incumbent[1]):
+            allocations[resource['id']] = float(resource['allocations'][k])
+    funded = (sum(bool(r['funded'][k]) for r, k in zip(problem['resources'], incumbent[1]))
+              if incumbent else 0)
+    lower = incumbent[0] if incumbent else None
+    return {
+        "status": status,
+        "allocations": allocations,
+        "totalOutput": lower,
+        "totalAllocated": sum(allocations.values()),
+        "fundedResources": funded,
+        "upperBound": float(upper) if lower is not None else None,
+        "gap": (float(upper - lower) / max(abs(upper), 1e-12)) if lower is not None else None,
+        "unit": unit,
+        "nodes": nodes,
+        "grids": history,
+        "seconds": seconds
+    }
+
+
+def manifest_constraints(csv_path):
+    """suggestedConstraints of the bundled scenario with this data file (empty if none)."""
+    manifest = Path(__file__).resolve().parent / 'scenarios' / 'scenario_manifest.js'
+    if not manifest.exists():
+        return {}
+    text = manifest.read_text(encoding='utf-8')
+    match = re.search(r"dataFile:\s*'scenarios/" + re.escape(Path(csv_path).name)
+                      + r"',\s*suggestedConstraints:\s*\{([^}]*)\}", text)
+    if not match:
+        return {}
+    constraints = {}
+    for key, value in re.findall(r"(\w+):\s*([\w.]+)", match.group(1)):
+        constraints[key] = value == 'true' if value in ('true', 'false') else float(value)
+    return constraints
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact integer allocation with cardinality and equity limits.")
+    parser.add_argument('csv', nargs='?', help='resource_id,input,output file (bundled scenarios use their suggested constraints)')
+    parser.add_argument('--stress', type=int, default=None, metavar='N', help='Use N synthetic resources instead')
+    parser.add_argument('--strategy', default='auto-individual', choices=['auto-individual', 'auto-unified', 'manual'])
+    parser.add_argument('--model', default='linear', choices=response_models.MODEL_TYPES)
+    parser.add_argument('--budget', type=float, default=None)
+    parser.add_argument('--min-per-resource', type=float, default=None)
+    parser.add_argument('--max-per-resource', type=float, default=None)
+    parser.add_argument('--min-resources', type=int, default=None, help='Cardinality: fund at least this many')
+    parser.add_argument('--max-resources', type=int, default=None, help='Cardinality: fund at most this many')
+    parser.add_argument('--equity-ratio', type=float, default=None, help='Largest / smallest funded allocation')
+    parser.add_argument('--baseline-deviation', type=float, default=None, help='Max %% change from the first historical input')
+    parser.add_argument('--no-extrapolation', action='store_true', help='Keep allocations within historical inputs')
+    parser.add_argument('--unit', type=float, default=None, help='Budget unit (default: see module docstring)')
+    parser.add_argument('--time-limit', type=float, default=DEFAULT_TIME_LIMIT, help='Seconds')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args()
+
+    if args.stress:
+        data = response_models.stress_rows(args.stress)
+        constraints = {}
+    elif args.csv:
+        data = response_models.read_rows(args.csv)
+        constraints = manifest_constraints(args.csv)
+    else:
+        parser.error('give a CSV file or --stress N')
+
+    overrides = {
+        'totalBudget': args.budget, 'minPerResource': args.min_per_resource, 'maxPerResource': args.max_per_resource,
+        'minResources': args.min_resources, 'maxResources': args.max_resources, 'equityRatio': args.equity_ratio,
+        'baselineDeviation': args.baseline_deviation
+    }
+    constraints.update({k: v for k, v in overrides.items() if v is not None})
+    constraints['cardinalityEnabled'] = constraints.get('cardinalityEnabled') or (
+        args.min_resources is not None or args.max_resources is not None)
+    constraints['equityEnabled'] = constraints.get('equityEnabled') or args.equity_ratio is not None
+    constraints['baselineEnabled'] = constraints.get('baselineEnabled') or args.baseline_deviation is not None
+    constraints['allowExtrapolation'] = not args.no_extrapolation
+    if 'totalBudget' not in constraints:
+        parser.error('--budget is required for data without suggested constraints')
+
+    fitted = response_models.select_models(*data, args.strategy, args.model)
+    bounds = allocation_bounds(historical_inputs(data[0], data[1]), constraints)
+    unit = args.unit or default_unit(constraints['totalBudget'])
+    result = solve(build_problem(fitted['models'], bounds, constraints, unit), args.time_limit)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['status']}: output {result['totalOutput']:,.1f} (upper bound {result['upperBound']:,.1f}, "
+          f"gap {100 * result['gap']:.3f}%), ${result['totalAllocated']:,.0f} allocated in ${unit:g} units, "
+          f"{result['fundedResources']} funded, {result['nodes']} nodes, {result['seconds']:.2f} s")
+    for step in result['grids']:
+        print(f"  grid {step['grid']:>5} x ${unit:g}: {step['nodes']} nodes, {step['seconds']:.2f} s")
+    if not args.stress:
+        for resource_id, allocation in result['allocations'].items():
+            print(f"  {resource_id:<22} ${allocation:>12,.0f}  {fitted['models'][resource_id]['type']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -35,7 +35,8 @@
 
   const OPTIMIZATION_METHODS = {
     GREEDY: 'greedy',
-    NUMERICAL: 'numerical'  // Will use custom gradient-based optimizer
+    NUMERICAL: 'numerical',  // Will use custom gradient-based optimizer
+    WATER_FILLING: 'water_filling'  // Exact Lagrangian solver for concave curves
   };
 
   // Template CSV for download
@@ -1098,7 +1099,13 @@
     if (invalidModels.length > 0) {
       throw new Error(`Model fitting failed for resources: ${invalidModels.join(', ')}. Please re-fit models before optimizing.`);
     }
-    
+
+    // Concave curves with only bound and budget constraints have an exact solution
+    const waterFillingResult = optimizeWaterFilling();
+    if (waterFillingResult) {
+      return waterFillingResult;
+    }
+
     // Check if we have non-linear models that might benefit from numerical optimization
     const hasNonLinear = resources.some(id => {
       const type = models[id].type;
@@ -1546,6 +1553,267 @@
     }
   }
 
+  function getHistoricalInputs() {
+    // One pass over the data: {resource_id: {min, max, first}} of historical inputs
+    const history = {};
+    state.rawData.forEach(d => {
+      const h = history[d.resource_id];
+      if (!h) {
+        history[d.resource_id] = { min: d.input, max: d.input, first: d.input || 0 };
+      } else {
+        h.min = Math.min(h.min, d.input);
+        h.max = Math.max(h.max, d.input);
+      }
+    });
+    return history;
+  }
+
+  function getAllocationBounds(id, c, history) {
+    // Per-resource box constraints, combined as projectOntoConstraints applies them
+    let min = c.minPerResource;
+    let max = c.maxPerResource;
+
+    if (!state.allowExtrapolation) {
+      min = Math.max(min, history[id].min);
+      max = Math.min(max, history[id].max);
+    }
+
+    if (c.baselineEnabled) {
+      const baseline = history[id].first;
+      const maxChange = baseline * (c.baselineDeviation / 100);
+      min = Math.max(min, baseline - maxChange);
+      max = Math.min(max, baseline + maxChange);
+    }
+
+    return { min, max };
+  }
+
+  function createMaxHeap() {
+    // Binary max-heap of {key, index}. Equal keys pop in index order, which matches a
+    // left-to-right scan that keeps the first best entry.
+    const items = [];
+    const before = (a, b) => a.key > b.key || (a.key === b.key && a.index < b.index);
+    const swap = (i, j) => { const t = items[i]; items[i] = items[j]; items[j] = t; };
+
+    return {
+      size: () => items.length,
+      push(key, index) {
+        items.push({ key, index });
+        let i = items.length - 1;
+        while (i > 0) {
+          const parent = (i - 1) >> 1;
+          if (!before(items[i], items[parent])) break;
+          swap(i, parent);
+          i = parent;
+        }
+      },
+      pop() {
+        const top = items[0];
+        const last = items.pop();
+        if (items.length > 0) {
+          items[0] = last;
+          let i = 0;
+          while (true) {
+            const left = 2 * i + 1;
+            let next = i;
+            if (left < items.length && before(items[left], items[next])) next = left;
+            if (left + 1 < items.length && before(items[left + 1], items[next])) next = left + 1;
+            if (next === i) break;
+            swap(i, next);
+            i = next;
+          }
+        }
+        return top;
+      }
+    };
+  }
+
+  function concaveResponse(model) {
+    // Marginal return of a concave response curve and its inverse, or null if the curve
+    // is not concave. inverse(lambda) maximizes f(x) - lambda * x without bounds and may
+    // be +/-Infinity (all or nothing), as for linear curves.
+    const p = model.params || {};
+    const constantSlope = (slope) => ({
+      derivative: () => slope,
+      inverse: (lambda) => (lambda < slope ? Infinity : -Infinity)
+    });
+    // Solves derivative(x) = lambda where scale / lambda > 0; otherwise the curve's slope
+    // never reaches lambda and the answer is one of the bounds
+    const solveWhere = (scale, solve) => (lambda) => {
+      const ratio = scale / lambda;
+      if (ratio > 0) return solve(ratio);
+      return scale > 0 ? Infinity : -Infinity;
+    };
+
+    switch (model.type) {
+      case MODEL_TYPES.LINEAR:
+        return constantSlope(p.b);
+      case MODEL_TYPES.LOG:
+        // Y = a + b*ln(X): concave for b >= 0, marginal b/X
+        if (!(p.b >= 0)) return null;
+        return {
+          derivative: (x) => p.b / Math.max(x, 0.001),
+          inverse: solveWhere(p.b, ratio => ratio)
+        };
+      case MODEL_TYPES.SQRT:
+        // Y = a + b*sqrt(X): concave for b >= 0, marginal b / (2 sqrt(X))
+        if (!(p.b >= 0)) return null;
+        return {
+          derivative: (x) => p.b / (2 * Math.sqrt(Math.max(x, 1e-12))),
+          inverse: solveWhere(p.b, ratio => ratio * ratio / 4)
+        };
+      case MODEL_TYPES.POWER: {
+        // Y = a*X^b: concave when a*b*(b-1) <= 0, marginal a*b*X^(b-1)
+        const slope = p.a * p.b;
+        if (p.b === 1 || slope === 0) return constantSlope(slope);
+        if (!(slope * (p.b - 1) < 0)) return null;
+        return {
+          derivative: (x) => slope * Math.pow(Math.max(x, 0.001), p.b - 1),
+          inverse: solveWhere(slope, ratio => Math.pow(ratio, 1 / (1 - p.b)))
+        };
+      }
+      case MODEL_TYPES.QUADRATIC:
+        // Y = a + b*X + c*X^2: concave for c <= 0, marginal b + 2cX
+        if (p.c === 0) return constantSlope(p.b);
+        if (!(p.c < 0)) return null;
+        return {
+          derivative: (x) => p.b + 2 * p.c * x,
+          inverse: (lambda) => (lambda - p.b) / (2 * p.c)
+        };
+      case MODEL_TYPES.BOUNDED_LOG: {
+        // Y = ceiling - (ceiling - a)*e^(-bX): concave for ceiling >= a, marginal s*e^(-bX)
+        const s = (p.ceiling - p.a) * p.b;
+        if (s === 0) return constantSlope(0);
+        if (!(p.ceiling - p.a > 0)) return null;
+        return {
+          derivative: (x) => s * Math.exp(-p.b * x),
+          inverse: solveWhere(s, ratio => Math.log(ratio) / p.b)
+        };
+      }
+      default:
+        // Logistic curves are convex below their midpoint
+        return null;
+    }
+  }
+
+  function optimizeWaterFilling() {
+    const resources = Object.keys(state.fittedModels);
+    const c = state.constraints;
+    const models = state.fittedModels;
+
+    // Cardinality and equity limits make the problem non-convex; the other methods handle them
+    if (c.cardinalityEnabled || c.equityEnabled) return null;
+
+    const curves = resources.map(id => concaveResponse(models[id]));
+    if (curves.some(curve => !curve)) return null;
+
+    const history = getHistoricalInputs();
+    const bounds = resources.map(id => getAllocationBounds(id, c, history));
+    if (bounds.some(b => !(b.min <= b.max))) return null;
+
+    const sum = (values) => values.reduce((total, v) => total + v, 0);
+    const minTotal = sum(bounds.map(b => b.min));
+    const maxTotal = sum(bounds.map(b => b.max));
+    if (minTotal > c.totalBudget) return null;
+
+    const diagnostics = {
+      method: OPTIMIZATION_METHODS.WATER_FILLING,
+      iterations: 0,
+      convergence: 'exact',
+      constraintsSatisfied: true,
+      warnings: []
+    };
+
+    // KKT conditions: every resource sits where its marginal return equals the budget
+    // multiplier lambda, or at a bound. Spending is non-increasing in lambda, so lambda
+    // is found by bisection between the smallest and largest marginal return at the bounds.
+    const allocateAt = (lambda) =>
+      bounds.map((b, i) => Math.max(b.min, Math.min(b.max, curves[i].inverse(lambda))));
+
+    let allocationValues;
+    if (maxTotal <= c.totalBudget) {
+      allocationValues = bounds.map(b => b.max);
+      if (c.totalBudget - maxTotal >= 1) {
+        diagnostics.warnings.push(`All resources at their maximum; $${formatNumber(c.totalBudget - maxTotal, 0)} of budget left unallocated`);
+      }
+    } else {
+      let lambdaLow = curves.reduce((m, curve, i) => Math.min(m, curve.derivative(bounds[i].max)), Infinity);
+      let lambdaHigh = curves.reduce((m, curve, i) => Math.max(m, curve.derivative(bounds[i].min)), -Infinity);
+      if (!isFinite(lambdaLow) || !isFinite(lambdaHigh)) return null;
+      lambdaLow -= Math.abs(lambdaLow) * 1e-9 + 1e-12;
+      lambdaHigh += Math.abs(lambdaHigh) * 1e-9 + 1e-12;
+
+      let spendLow = allocateAt(lambdaLow);    // spends at least the budget
+      let spendHigh = allocateAt(lambdaHigh);  // spends at most the budget
+      const MAX_BISECTIONS = 200;
+      while (diagnostics.iterations < MAX_BISECTIONS &&
+             lambdaHigh - lambdaLow > 1e-12 * Math.max(1, Math.abs(lambdaLow), Math.abs(lambdaHigh))) {
+        diagnostics.iterations++;
+        const lambda = (lambdaLow + lambdaHigh) / 2;
+        const candidate = allocateAt(lambda);
+        if (sum(candidate) >= c.totalBudget) {
+          lambdaLow = lambda;
+          spendLow = candidate;
+        } else {
+          lambdaHigh = lambda;
+          spendHigh = candidate;
+        }
+      }
+
+      // Only resources whose marginal return lies between the two multipliers differ
+      // (e.g. linear curves with equal slopes), so blending the allocations spends the
+      // budget exactly without leaving the optimum
+      const totalLow = sum(spendLow);
+      const totalHigh = sum(spendHigh);
+      const t = totalLow > totalHigh ? (c.totalBudget - totalHigh) / (totalLow - totalHigh) : 0;
+      allocationValues = spendHigh.map((x, i) => x + t * (spendLow[i] - x));
+
+      diagnostics.multiplier = (lambdaLow + lambdaHigh) / 2;
+      diagnostics.convergence = `exact (marginal return equalized at ${formatNumber(diagnostics.multiplier, 4)} per unit)`;
+    }
+
+    if (c.integerConstraint) {
+      allocationValues = roundAllocations(allocationValues, bounds, resources.map(id => models[id]), c.totalBudget);
+    }
+
+    const allocations = {};
+    resources.forEach((id, i) => {
+      allocations[id] = allocationValues[i];
+    });
+
+    return {
+      allocations,
+      totalOutput: resources.reduce((total, id) => total + models[id].predict(allocations[id]), 0),
+      totalAllocated: sum(allocationValues),
+      method: OPTIMIZATION_METHODS.WATER_FILLING,
+      diagnostics
+    };
+  }
+
+  function roundAllocations(values, bounds, models, budget) {
+    // Round down within bounds, then hand the leftover whole units to the resources with
+    // the highest return on one more unit (at most one unit per resource per round)
+    const rounded = values.map((x, i) =>
+      Math.min(Math.floor(bounds[i].max), Math.max(Math.ceil(bounds[i].min), Math.floor(x))));
+    let leftover = Math.floor(budget - rounded.reduce((total, x) => total + x, 0));
+
+    const queue = createMaxHeap();
+    const enqueue = (i) => {
+      if (rounded[i] + 1 <= bounds[i].max) {
+        queue.push(models[i].predict(rounded[i] + 1) - models[i].predict(rounded[i]), i);
+      }
+    };
+    rounded.forEach((x, i) => enqueue(i));
+
+    while (leftover > 0 && queue.size() > 0) {
+      const best = queue.pop();
+      rounded[best.index] += 1;
+      leftover--;
+      enqueue(best.index);
+    }
+    return rounded;
+  }
+
   function optimizeGreedy() {
     const resources = Object.keys(state.fittedModels);
     const c = state.constraints;
@@ -1568,53 +1836,53 @@
       warnings: []
     };
 
-    // Greedy allocation: repeatedly allocate to resource with highest marginal return
-    while (remainingBudget >= INCREMENT) {
-      diagnostics.iterations++;
-      
-      let bestResource = null;
-      let bestMarginalReturn = -Infinity;
+    const history = getHistoricalInputs();
 
-      for (const id of resources) {
-        const currentAllocation = allocations[id];
-        
-        // Determine effective max for this resource
-        let effectiveMax = c.maxPerResource;
-        
-        // Extrapolation constraint overrides max per resource
-        if (!state.allowExtrapolation) {
-          const historicalData = state.rawData.filter(d => d.resource_id === id);
-          const maxHistoricalInput = Math.max(...historicalData.map(d => d.input));
-          effectiveMax = Math.min(effectiveMax, maxHistoricalInput);
-        }
-        
-        // Check constraints
-        if (currentAllocation + INCREMENT > effectiveMax) continue;
-        
-        if (c.baselineEnabled) {
-          const baseline = state.rawData.find(d => d.resource_id === id)?.input || 0;
-          const maxChange = baseline * (c.baselineDeviation / 100);
-          if (Math.abs(currentAllocation + INCREMENT - baseline) > maxChange) continue;
-        }
-
-        // Calculate marginal return
-        const currentOutput = models[id].predict(currentAllocation);
-        const newOutput = models[id].predict(currentAllocation + INCREMENT);
-        const marginalReturn = (newOutput - currentOutput) / INCREMENT;
+    // Effective max per resource (extrapolation constraint overrides max per resource)
+    const effectiveMax = {};
+    resources.forEach(id => {
+      effectiveMax[id] = state.allowExtrapolation ? c.maxPerResource : Math.min(c.maxPerResource, history[id].max);
+    });
 
-        if (marginalReturn > bestMarginalReturn) {
-          bestMarginalReturn = marginalReturn;
-          bestResource = id;
-        }
+    const canIncrement = (id) => {
+      const next = allocations[id] + INCREMENT;
+      if (next > effectiveMax[id]) return false;
+      if (c.baselineEnabled) {
+        const baseline = history[id].first;
+        const maxChange = baseline * (c.baselineDeviation / 100);
+        if (Math.abs(next - baseline) > maxChange) return false;
       }
+      return true;
+    };
+
+    const incrementReturn = (id) =>
+      (models[id].predict(allocations[id] + INCREMENT) - models[id].predict(allocations[id])) / INCREMENT;
+
+    // Priority queue of each resource's return on its next increment. Allocations only
+    // grow, so a resource that cannot take an increment never can again, and only the
+    // resource that just received budget needs its key recomputed.
+    const queue = createMaxHeap();
+    const enqueue = (index) => {
+      const id = resources[index];
+      if (!canIncrement(id)) return;
+      const marginalReturn = incrementReturn(id);
+      if (marginalReturn > -Infinity) queue.push(marginalReturn, index);
+    };
+    resources.forEach((id, index) => enqueue(index));
+
+    // Greedy allocation: repeatedly allocate to resource with highest marginal return
+    while (remainingBudget >= INCREMENT) {
+      diagnostics.iterations++;
 
-      if (!bestResource) {
+      if (queue.size() === 0) {
         diagnostics.warnings.push('No feasible allocations found with remaining budget');
         break;
       }
 
-      allocations[bestResource] += INCREMENT;
+      const best = queue.pop();
+      allocations[resources[best.index]] += INCREMENT;
       remainingBudget -= INCREMENT;
+      enqueue(best.index);
 
       // Safety check
       if (diagnostics.iterations > 100000) {
@@ -1936,7 +2204,8 @@
         <div class="diagnostic-item">
           <span class="diagnostic-label">Method used:</span>
           <span class="diagnostic-value">
-            ${diag.method === OPTIMIZATION_METHODS.GREEDY ? 'Greedy marginal returns allocator' : 'Numerical optimization'}
+            ${diag.method === OPTIMIZATION_METHODS.GREEDY ? 'Greedy marginal returns allocator' :
+              diag.method === OPTIMIZATION_METHODS.WATER_FILLING ? 'Exact water-filling (Lagrangian)' : 'Numerical optimization'}
             <span class="diagnostic-status info">Primary</span>
           </span>
         </div>
@@ -1948,9 +2217,13 @@
           </span>
         </div>
         <div class="diagnostic-item">
+          ${diag.method === OPTIMIZATION_METHODS.WATER_FILLING ? `
+          <p><strong>About iterations:</strong> Each iteration halves the search interval for the budget multiplier (the common 
+          marginal return every resource below its maximum and above its minimum is allocated to). The solver stops once the 
+          interval is negligible, typically after 40-80 iterations regardless of budget size.</p>` : `
           <p><strong>About iterations:</strong> Each iteration allocates $100 to the resource with highest marginal return. 
           Iteration count = (budget allocated) / $100. The optimizer stops when: (1) budget exhausted, (2) all resources hit constraints, 
-          or (3) 100,000 iteration safety limit reached.</p>
+          or (3) 100,000 iteration safety limit reached.</p>`}
         </div>
         <div class="diagnostic-item">
           <p><strong>Why this method?</strong> ${getMethodExplanation(diag.method)}</p>
@@ -2084,7 +2357,13 @@
   }
 
   function getMethodExplanation(method) {
-    if (method === OPTIMIZATION_METHODS.GREEDY) {
+    if (method === OPTIMIZATION_METHODS.WATER_FILLING) {
+      return `Every response curve is concave (diminishing or constant returns) and only budget and per-resource bounds apply, 
+              so the optimum is known exactly: each resource is funded until its marginal return falls to a common level, 
+              or it reaches a bound. The solver finds that level by bisection, which takes the same few dozen passes over the 
+              resources at any budget size or granularity. Whole-unit allocations, when required, are rounded down and the 
+              leftover units go to the resources with the highest return on one more unit.`;
+    } else if (method === OPTIMIZATION_METHODS.GREEDY) {
       return `The greedy allocator iteratively assigns budget increments to whichever resource offers the highest marginal return 
               at that moment. This method is transparent, always respects constraints, and works well for most marketing allocation problems. 
               It may not find the absolute global optimum for complex non-linear models, but it produces sensible, actionable results.`;
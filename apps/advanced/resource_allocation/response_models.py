@@ -0,0 +1,429 @@
+"""
+Response-curve fitting for the resource allocation optimizer, vectorized
+across resources.
+
+Fits the app's seven response models (resource_allocation_app.js) to every
+resource in one call. Observations are grouped by resource_id into padded
+(resources x points) arrays with a mask, so each model is a handful of
+batched array operations instead of a loop over resources:
+
+    linear       Y = a + bX                 batched least squares
+    log          Y = a + b ln X             batched least squares
+    sqrt         Y = a + b sqrt X           batched least squares
+    quadratic    Y = a + bX + cX^2          batched least squares
+    power        Y = a X^b                  log-log fit, then Gauss-Newton
+    bounded_log  Y = C - (C - a) e^(-bX)    log-linear fit, then Gauss-Newton
+    logistic     Y = L / (1 + e^(-k(X - X0)))   Gauss-Newton from the app's start
+
+Gauss-Newton runs with Levenberg-Marquardt damping on the original scale,
+so power and bounded_log minimize the same residual sum of squares AIC is
+computed from (the app stops at the linearized fits). Logistic keeps the
+app's bounds L in [max Y, 3 max Y] and k in [1e-4, 1e-2]. R² and AIC
+(2k + n ln(2 pi RSS / n) + n, k as in the app) come back as
+(model x resource) tables. Resources with one observation get the app's
+single-point models (R² = 1, AIC = 0).
+
+The module needs only NumPy, so it runs in CPython and Pyodide
+(fit_models_json takes and returns the app's JSON shapes):
+
+    python response_models.py scenarios/social_media_influencers.csv
+    python response_models.py --stress 2000
+"""
+
+import argparse
+import csv
+import json
+import math
+import time
+
+import numpy as np
+
+MODEL_TYPES = ['linear', 'log', 'power', 'quadratic', 'sqrt', 'logistic', 'bounded_log']
+
+# Parameter counts used in AIC (calculateAIC's k in the app)
+AIC_PARAMETERS = {'linear': 2, 'log': 2, 'power': 2, 'quadratic': 3, 'sqrt': 2, 'logistic': 3, 'bounded_log': 2}
+
+# Parameters predict() reads for each model type
+MODEL_PARAMETERS = {'linear': ('a', 'b'), 'log': ('a', 'b'), 'power': ('a', 'b'), 'quadratic': ('a', 'b', 'c'),
+                    'sqrt': ('a', 'b'), 'logistic': ('L', 'k', 'X0'), 'bounded_log': ('ceiling', 'a', 'b')}
+
+GN_MAX_ITER = 100
+GN_TOL = 1e-10
+
+
+def group_observations(resource_ids, inputs, outputs):
+    """Padded (R x m) input/output arrays and a 0/1 mask, resources in order of first appearance."""
+    resource_ids = np.asarray(resource_ids).astype(str)
+    ids, first, inverse = np.unique(resource_ids, return_index=True, return_inverse=True)
+    order_of_first = np.argsort(first)
+    rank = np.empty_like(order_of_first)
+    rank[order_of_first] = np.arange(len(ids))
+    group = rank[inverse.reshape(-1)]
+
+    order = np.argsort(group, kind='stable')
+    counts = np.bincount(group, minlength=len(ids))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    sorted_group = group[order]
+    position = np.arange(len(order)) - starts[sorted_group]
+
+    m = int(counts.max()) if len(counts) else 0
+    X, Y, W = np.zeros((len(ids), m)), np.zeros((len(ids), m)), np.zeros((len(ids), m))
+    X[sorted_group, position] = np.asarray(inputs, dtype=float)[order]
+    Y[sorted_group, position] = np.asarray(outputs, dtype=float)[order]
+    W[sorted_group, position] = 1.0
+    return ids[order_of_first].tolist(), X, Y, W
+
+
+def batched_least_squares(D, Y, W):
+    """Per-resource weighted least squares: D (R x m x p), Y and W (R x m) -> coefficients (R x p).
+
+    Uses the pseudo-inverse of each weighted design, so resources with too
+    few distinct points get the minimum-norm solution instead of failing.
+    """
+    sw = np.sqrt(W)
+    return np.einsum('rpm,rm->rp', np.linalg.pinv(D * sw[..., None]), Y * sw)
+
+
+def fit_statistics(Y, W, predicted, n_params):
+    """R², AIC and RSS per resource on the original scale."""
+    n = W.sum(axis=1)
+    rss = (W * (Y - predicted) ** 2).sum(axis=1)
+    mean = (W * Y).sum(axis=1) / np.maximum(n, 1)
+    sst = (W * (Y - mean[:, None]) ** 2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = 1 - rss / sst
+        aic = 2 * n_params + n * np.log(2 * math.pi * rss / n) + n
+    return r2, aic, rss
+
+
+def levenberg_marquardt(model, theta, X, Y, W, lower=None, upper=None, max_iter=GN_MAX_ITER, tol=GN_TOL):
+    """Damped Gauss-Newton for every resource at once.
+
+    model(theta, X) returns predictions (R x m) and the Jacobian
+    (R x m x p). Each resource keeps its own damping, accepts only steps
+    that lower its RSS and stops once its relative improvement is below tol.
+    Bounds, when given, are enforced by clipping each step.
+    """
+    theta = theta.copy()
+    f, J = model(theta, X)
+    rss = (W * (Y - f) ** 2).sum(axis=1)
+    damping = np.full(len(theta), 1e-3)
+    active = np.isfinite(rss)
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        JW = J * W[..., None]
+        A = np.einsum('rmp,rmq->rpq', JW, J)
+        g = np.einsum('rmp,rm->rp', JW, Y - f)
+        diag = np.einsum('rpp->rp', A)
+        A_damped = A + damping[:, None, None] * (np.eye(A.shape[1]) * (diag + 1e-12)[:, None, :])
+        try:
+            step = np.linalg.solve(A_damped, g[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            step = np.einsum('rpq,rq->rp', np.linalg.pinv(A_damped), g)
+
+        candidate = theta + np.where(active[:, None], step, 0.0)
+        if lower is not None:
+            candidate = np.maximum(candidate, lower)
+        if upper is not None:
+            candidate = np.minimum(candidate, upper)
+        f_new, J_new = model(candidate, X)
+        rss_new = (W * (Y - f_new) ** 2).sum(axis=1)
+
+        better = active & np.isfinite(rss_new) & (rss_new < rss)
+        improvement = np.where(better, (rss - rss_new) / np.maximum(rss, 1e-300), 0.0)
+        theta[better], f[better], J[better] = candidate[better], f_new[better], J_new[better]
+        rss = np.where(better, rss_new, rss)
+        damping = np.where(better, damping / 10, damping * 10)
+        active &= ~(better & (improvement < tol)) & (damping < 1e12)
+    return theta
+
+
+def _power_model(theta, X):
+    log_x = np.log(np.maximum(X, 0.001))
+    f = np.exp(theta[:, [0]] + theta[:, [1]] * log_x)
+    return f, np.stack([f, f * log_x], axis=-1)
+
+
+def _logistic_model(theta, X):
+    L, k, x0 = theta[:, [0]], theta[:, [1]], theta[:, [2]]
+    e = np.exp(np.clip(-k * (X - x0), -700, 700))
+    s = 1 / (1 + e)
+    ds = L * s * s * e
+    return L * s, np.stack([s, ds * (X - x0), -ds * k], axis=-1)
+
+
+def _bounded_log_model(ceiling):
+    def model(theta, X):
+        # theta = (ln(C - a), b): Y = C - exp(theta0 - b X)
+        g = np.exp(np.clip(theta[:, [0]] - theta[:, [1]] * X, -700, 700))
+        return ceiling[:, None] - g, np.stack([-g, X * g], axis=-1)
+    return model
+
+
+def _linear_in(features, X, Y, W):
+    D = np.stack([np.ones_like(X)] + features, axis=-1)
+    coef = batched_least_squares(D, Y, W)
+    return coef, np.einsum('rmp,rp->rm', D, coef)
+
+
+def fit_linear_family(model_type, X, Y, W):
+    """Models linear in their parameters: (params dict, predictions)."""
+    if model_type == 'linear':
+        coef, pred = _linear_in([X], X, Y, W)
+        return {"a": coef[:, 0], "b": coef[:, 1]}, pred
+    if model_type == 'log':
+        coef, pred = _linear_in([np.log(np.maximum(X, 0.001))], X, Y, W)
+        return {"a": coef[:, 0], "b": coef[:, 1]}, pred
+    if model_type == 'sqrt':
+        coef, pred = _linear_in([np.sqrt(np.maximum(X, 0))], X, Y, W)
+        return {"a": coef[:, 0], "b": coef[:, 1]}, pred
+    # Quadratic on X scaled per resource, for conditioning
+    scale = np.maximum(np.abs(X * W).max(axis=1), 1e-12)[:, None]
+    coef, pred = _linear_in([X / scale, (X / scale) ** 2], X, Y, W)
+    return {"a": coef[:, 0], "b": coef[:, 1] / scale[:, 0], "c": coef[:, 2] / scale[:, 0] ** 2}, pred
+
+
+def fit_power(X, Y, W):
+    valid = W * ((X > 0) & (Y > 0))
+    enough = valid.sum(axis=1) >= 2
+    start = batched_least_squares(
+        np.stack([np.ones_like(X), np.log(np.where(valid > 0, X, 1.0))], axis=-1),
+        np.log(np.where(valid > 0, Y, 1.0)), valid
+    )
+    theta = levenberg_marquardt(_power_model, start, X, Y, W)
+    pred, _ = _power_model(theta, X)
+    params = {"a": np.exp(theta[:, 0]), "b": theta[:, 1]}
+    return params, pred, enough
+
+
+def fit_bounded_log(X, Y, W, output_ceiling=None):
+    ceiling = (np.full(len(X), float(output_ceiling)) if output_ceiling
+               else np.where(W > 0, Y, -np.inf).max(axis=1) * 1.5)
+    valid = W * (Y < ceiling[:, None] * 0.99)
+    enough = valid.sum(axis=1) >= 2
+    # ln(C - Y) = ln(C - a) - bX on the points below the ceiling
+    coef = batched_least_squares(
+        np.stack([np.ones_like(X), X], axis=-1),
+        np.log(np.where(valid > 0, ceiling[:, None] - Y, 1.0)), valid
+    )
+    start = np.column_stack([coef[:, 0], -coef[:, 1]])
+    model = _bounded_log_model(ceiling)
+    theta = levenberg_marquardt(model, start, X, Y, W)
+    pred, _ = model(theta, X)
+    params = {"ceiling": ceiling, "a": ceiling - np.exp(theta[:, 0]), "b": theta[:, 1]}
+    return params, pred, enough
+
+
+def fit_logistic(X, Y, W):
+    n = np.maximum(W.sum(axis=1), 1)
+    max_y = np.where(W > 0, Y, -np.inf).max(axis=1)
+    start = np.column_stack([1.2 * max_y, np.full(len(X), 0.001), (W * X).sum(axis=1) / n])
+    lower = np.column_stack([max_y, np.full(len(X), 1e-4), np.full(len(X), -np.inf)])
+    upper = np.column_stack([3 * max_y, np.full(len(X), 1e-2), np.full(len(X), np.inf)])
+    theta = levenberg_marquardt(_logistic_model, start, X, Y, W, lower, upper)
+    pred, _ = _logistic_model(theta, X)
+    return {"L": theta[:, 0], "k": theta[:, 1], "X0": theta[:, 2]}, pred
+
+
+def predict(model_type, params, x):
+    """Model output at allocation(s) x, with the app's predict formulas."""
+    x = np.asarray(x, dtype=float)
+    p = params
+    if model_type == 'log':
+        return p['a'] + p['b'] * np.log(np.maximum(x, 0.001))
+    if model_type == 'power':
+        return p['a'] * np.maximum(x, 0.001) ** p['b']
+    if model_type == 'quadratic':
+        return p['a'] + p['b'] * x + p['c'] * x * x
+    if model_type == 'sqrt':
+        return p['a'] + p['b'] * np.sqrt(np.maximum(x, 0))
+    if model_type == 'logistic':
+        return p['L'] / (1 + np.exp(np.clip(-p['k'] * (x - p['X0']), -700, 700)))
+    if model_type == 'bounded_log':
+        return p['ceiling'] - (p['ceiling'] - p['a']) * np.exp(-p['b'] * x)
+    return p['a'] + p['b'] * x
+
+
+def _single_point_params(model_type, x, y, output_ceiling=None):
+    """The app's createSimpleModel parameters for one observation."""
+    ratio = y / x if x else 0.0
+    if model_type == 'log':
+        return {"a": y - ratio * math.log(max(x, 0.001)), "b": ratio}
+    if model_type == 'power':
+        return {"a": ratio, "b": 1.0}
+    if model_type == 'quadratic':
+        return {"a": 0.0, "b": ratio, "c": 0.0}
+    if model_type == 'sqrt':
+        return {"a": y - ratio * math.sqrt(max(x, 0)), "b": ratio}
+    if model_type == 'logistic':
+        return {"L": y * 2, "k": 0.001, "X0": x}
+    if model_type == 'bounded_log':
+        return {"ceiling": output_ceiling or y * 2, "a": 0.0, "b": 0.001}
+    return {"a": 0.0, "b": ratio}
+
+
+def fit_models(X, Y, W, model_types=MODEL_TYPES, output_ceiling=None):
+    """Fit every model type to every resource.
+
+    Returns {model_type: {"types": (R,), "params": {name: (R,)}, "r2": (R,),
+    "aic": (R,), "rss": (R,)}}. types is the model each resource actually
+    got: power and bounded_log fall back to the linear and log fits where
+    fewer than two points qualify for their transformation, as in the app,
+    and those resources report the fallback type and its parameters.
+    """
+    fits = {}
+    single = W.sum(axis=1) == 1
+    for model_type in model_types:
+        types = np.full(len(X), model_type, dtype=object)
+        if model_type in ('linear', 'log', 'sqrt', 'quadratic'):
+            params, pred = fit_linear_family(model_type, X, Y, W)
+        elif model_type == 'logistic':
+            params, pred = fit_logistic(X, Y, W)
+        else:
+            fit = fit_power if model_type == 'power' else (lambda *a: fit_bounded_log(*a, output_ceiling))
+            params, pred, enough = fit(X, Y, W)
+            # Single observations get the model's own single-point parameters below
+            enough = enough | single
+            if not enough.all():
+                fallback = 'linear' if model_type == 'power' else 'log'
+                fb_params, fb_pred = fit_linear_family(fallback, X, Y, W)
+                types = np.where(enough, types, fallback)
+                pred = np.where(enough[:, None], pred, fb_pred)
+                params = {name: np.where(enough, values, fb_params.get(name, np.nan))
+                          for name, values in params.items()}
+        r2, aic, rss = fit_statistics(Y, W, pred, AIC_PARAMETERS[model_type])
+        fits[model_type] = {"types": types, "params": params, "r2": r2, "aic": aic, "rss": rss}
+
+    for model_type, fit in fits.items():
+        for r in np.flatnonzero(single):
+            for name, value in _single_point_params(model_type, X[r, 0], Y[r, 0], output_ceiling).items():
+                fit["params"][name][r] = value
+            fit["r2"][r], fit["aic"][r], fit["rss"][r] = 1.0, 0.0, 0.0
+    return fits
+
+
+def select_models(resource_ids, inputs, outputs, strategy='auto-individual', model_type='linear',
+                  output_ceiling=None):
+    """The app's fitModelsToData: one chosen model per resource plus the full AIC/R² tables.
+
+    strategy is 'auto-individual' (lowest AIC per resource), 'auto-unified'
+    (the model with the lowest AIC on all data pooled, fitted per resource)
+    or 'manual' (model_type for every resource).
+    """
+    ids, X, Y, W = group_observations(resource_ids, inputs, outputs)
+    fits = fit_models(X, Y, W, MODEL_TYPES, output_ceiling)
+    aic = np.array([fits[m]["aic"] for m in MODEL_TYPES])
+
+    if strategy == 'manual':
+        chosen = [model_type] * len(ids)
+    elif strategy == 'auto-unified':
+        pooled = fit_models(*group_observations(np.zeros(len(inputs)), inputs, outputs)[1:],
+                            MODEL_TYPES, output_ceiling)
+        best = min(MODEL_TYPES, key=lambda m: pooled[m]["aic"][0])
+        chosen = [best] * len(ids)
+    else:
+        # NaN AIC (e.g. a failed fit) never wins
+        chosen = [MODEL_TYPES[i] for i in np.argmin(np.where(np.isnan(aic), np.inf, aic), axis=0)]
+
+    models = {}
+    for r, (resource_id, m) in enumerate(zip(ids, chosen)):
+        fitted_type = fits[m]["types"][r]
+        models[resource_id] = {
+            "type": fitted_type,
+            "params": {name: float(fits[m]["params"][name][r]) for name in MODEL_PARAMETERS[fitted_type]},
+            "r2": float(fits[m]["r2"][r]),
+            "aic": float(fits[m]["aic"][r]),
+            "n": int(W[r].sum())
+        }
+    return {
+        "models": models,
+        "resource_ids": ids,
+        "r2_table": {m: fits[m]["r2"] for m in MODEL_TYPES},
+        "aic_table": {m: fits[m]["aic"] for m in MODEL_TYPES}
+    }
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _jsonable(value.tolist())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def fit_models_json(rows_json, options_json='{}'):
+    """Pyodide entry point: rows as [{resource_id, input, output}], result as JSON.
+
+    Options: strategy, modelType, outputCeiling.
+    """
+    rows = json.loads(rows_json)
+    options = json.loads(options_json)
+    result = select_models(
+        [row['resource_id'] for row in rows], [row['input'] for row in rows], [row['output'] for row in rows],
+        options.get('strategy', 'auto-individual'), options.get('modelType', 'linear'),
+        options.get('outputCeiling')
+    )
+    return json.dumps(_jsonable(result))
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = [row for row in csv.DictReader(f)]
+    return ([row['resource_id'] for row in rows], [float(row['input']) for row in rows],
+            [float(row['output']) for row in rows])
+
+
+def stress_rows(n_resources, seed=0):
+    """Synthetic data from the scenario generator, for timing large fits."""
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent / 'scenarios'))
+    from generate_scenarios import build_scenario, stress_resources
+
+    rng = np.random.default_rng(seed)
+    rows = build_scenario(stress_resources(n_resources, rng), rng, verbose=False)
+    return [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the allocation app's response models to every resource.")
+    parser.add_argument('csv', nargs='?', help='resource_id,input,output file')
+    parser.add_argument('--strategy', default='auto-individual', choices=['auto-individual', 'auto-unified', 'manual'])
+    parser.add_argument('--model', default='linear', choices=MODEL_TYPES, help='Model for --strategy manual')
+    parser.add_argument('--ceiling', type=float, default=None, help='Known output ceiling for bounded_log')
+    parser.add_argument('--stress', type=int, default=None, metavar='N', help='Time a fit of N synthetic resources')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args()
+
+    if args.stress:
+        data = stress_rows(args.stress)
+    elif args.csv:
+        data = read_rows(args.csv)
+    else:
+        parser.error('give a CSV file or --stress N')
+
+    start = time.perf_counter()
+    result = select_models(*data, args.strategy, args.model, args.ceiling)
+    seconds = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(_jsonable(result), indent=2))
+        return
+
+    print(f"{len(result['resource_ids'])} resources, {len(MODEL_TYPES)} models in {1000 * seconds:.1f} ms")
+    if args.stress:
+        return
+    print(f"{'resource':<22}" + ''.join(f"{m:>13}" for m in MODEL_TYPES) + "   best (R²)")
+    for r, resource_id in enumerate(result['resource_ids']):
+        model = result['models'][resource_id]
+        print(f"{resource_id:<22}" + ''.join(f"{result['aic_table'][m][r]:>13.1f}" for m in MODEL_TYPES)
+              + f"   {model['type']} ({model['r2']:.3f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Checks for response_models.py:
+
+    python -m pytest test_response_models.py
+"""
+
+import numpy as np
+
+import response_models
+
+
+def test_power_falls_back_to_linear_when_outputs_are_not_positive():
+    inputs, outputs = [100, 200, 300], [-5, 0, 50]
+    fitted = response_models.select_models(['A'] * 3, inputs, outputs, 'manual', 'power')
+    model = fitted['models']['A']
+    linear = response_models.select_models(['A'] * 3, inputs, outputs, 'manual', 'linear')['models']['A']
+
+    assert model['type'] == 'linear'
+    assert set(model['params']) == {'a', 'b'}
+    assert np.isclose(model['r2'], linear['r2'])
+    # The reported curve is the one the R² was measured on
+    np.testing.assert_allclose(response_models.predict(model['type'], model['params'], inputs),
+                               response_models.predict('linear', linear['params'], inputs))
+
+
+def test_bounded_log_falls_back_to_log_at_the_ceiling():
+    fitted = response_models.select_models(['A'] * 3, [100, 200, 300], [50, 60, 70], 'manual',
+                                           'bounded_log', output_ceiling=50)
+    model = fitted['models']['A']
+
+    assert model['type'] == 'log'
+    assert set(model['params']) == {'a', 'b'}
+    assert all(np.isfinite(value) for value in model['params'].values())
+
+
+def test_single_observation_keeps_the_requested_model():
+    fitted = response_models.select_models(['A'], [100], [-5], 'manual', 'power')
+    assert fitted['models']['A']['type'] == 'power'
@@ -24,6 +24,10 @@ let mnlogEffectState = { focal: null, catLevels: {}, continuousOverrides: {} };
 let mnlogEffectFocal = null;
 let mnlogRangeMode = 'sd';
 let mnlogCustomRange = { min: null, max: null };
+
+// NumPy (Newton/IRLS) engine in Pyodide: used on request and for large designs
+const MNLOG_NUMPY_AUTO_ROWS = 20000;
+let mnlogPyodidePromise = null;
 const mnlogSummaryMessage = 'Provide data to see summary statistics.';
 
 // Scenario builders: generate moderately large, realistic-looking multinomial datasets
@@ -1585,6 +1589,58 @@ function buildDesignMatrixAndResponse() {
   return { X, y, classLabels, referenceIndex, predictorInfo, colMeans, rowIndices, predictorStats: computedStats };
 }
 
+/**
+ * Load Pyodide with NumPy and import mn_log_model.py once; later calls reuse the same
+ * module. A failed load stays cached so each fit does not re-download Pyodide.
+ */
+function initMnlogNumpyEngine() {
+  if (!mnlogPyodidePromise) {
+    mnlogPyodidePromise = (async () => {
+      const startTime = performance.now();
+      const pyodide = await loadPyodide();
+      await pyodide.loadPackage(['numpy']);
+      const response = await fetch('mn_log_model.py');
+      if (!response.ok) throw new Error(`Failed to fetch mn_log_model.py (${response.status})`);
+      // Import under its own name; running the file as __main__ would start its CLI
+      pyodide.FS.writeFile('/home/pyodide/mn_log_model.py', await response.text());
+      const module = pyodide.pyimport('mn_log_model');
+      console.log(`✓ NumPy multinomial engine ready in ${((performance.now() - startTime) / 1000).toFixed(1)}s`);
+      return module;
+    })();
+  }
+  return mnlogPyodidePromise;
+}
+
+/**
+ * Fit with mn_log_model.fit_buffers; the design goes over as typed arrays and the
+ * result has the same shape as MNLogit.fit's
+ */
+async function fitWithNumpyEngine(design, options) {
+  const engine = await initMnlogNumpyEngine();
+  const n = design.X.length;
+  const p = design.X[0].length;
+  const xFlat = new Float64Array(n * p);
+  for (let i = 0; i < n; i++) {
+    xFlat.set(design.X[i], i * p);
+  }
+  const yArray = Int32Array.from(design.y);
+
+  const fitBuffers = engine.fit_buffers;
+  try {
+    const resultJson = fitBuffers(xFlat, yArray, n, p, JSON.stringify({
+      classLabels: design.classLabels,
+      referenceIndex: design.referenceIndex,
+      l2: options.l2,
+      tol: 1e-8,
+      maxIter: 50,
+      confidenceLevel: options.confidenceLevel
+    }));
+    return JSON.parse(resultJson);
+  } finally {
+    fitBuffers.destroy();
+  }
+}
+
 function runMultinomialModel() {
   const statusEl = document.getElementById('mnlog-run-status');
   if (statusEl) statusEl.textContent = '';
@@ -1622,25 +1678,38 @@ function runMultinomialModel() {
       ? stepSizeValue
       : 0.2;
   const momentum = momentumInput && momentumInput.checked ? 0.8 : 0;
+  const numpyInput = document.getElementById('mnlog-use-numpy');
+  const useNumpy = typeof loadPyodide === 'function'
+    && ((numpyInput && numpyInput.checked) || design.X.length >= MNLOG_NUMPY_AUTO_ROWS);
 
   showMnlogLoading();
 
   // Defer heavy fitting work to allow the UI (button state, overlay)
   // to paint before MNLogit.fit runs synchronously.
-  setTimeout(() => {
+  setTimeout(async () => {
     try {
-      const fitResult = MNLogit.fit({
-        X: design.X,
-        y: design.y,
-        classLabels: design.classLabels,
-        referenceIndex: design.referenceIndex,
-        maxIter,
-        stepSize,
-        l2: 1e-4,
-        tol: 1e-4,
-        confidenceLevel,
-        momentum
-      });
+      let fitResult = null;
+      if (useNumpy) {
+        try {
+          fitResult = await fitWithNumpyEngine(design, { l2: 1e-4, confidenceLevel });
+        } catch (error) {
+          console.error('NumPy engine unavailable, using the JavaScript fitter:', error);
+        }
+      }
+      if (!fitResult) {
+        fitResult = MNLogit.fit({
+          X: design.X,
+          y: design.y,
+          classLabels: design.classLabels,
+          referenceIndex: design.referenceIndex,
+          maxIter,
+          stepSize,
+          l2: 1e-4,
+          tol: 1e-4,
+          confidenceLevel,
+          momentum
+        });
+      }
 
       mnlogLastModel = fitResult;
       mnlogLastDesign = design;
@@ -2254,8 +2323,9 @@ function updateMnlogDiagnostics(design) {
 let iterNote = '';
 
     if (window.StatsUtils && typeof window.StatsUtils.buildEstimationDetailsHtml === 'function') {
+      const newton = fit.optimizer === 'newton_irls';
       const coreHtml = window.StatsUtils.buildEstimationDetailsHtml({
-        engine: 'gradient_ascent',
+        engine: newton ? 'irls' : 'gradient_ascent',
         iterations: fit.iterations,
         maxIter: fit.maxIter,
         stepSize: fit.stepSize,
@@ -2265,8 +2335,9 @@ let iterNote = '';
         logLikChanges: fit.logLikChanges
       });
       if (coreHtml) {
-        const prefix =
-          '<p><strong>Estimator:</strong> Baseline-category multinomial logistic regression fitted via gradient ascent on the penalized log-likelihood with L2 (ridge) regularization on non-intercept terms.</p>';
+        const prefix = newton
+          ? '<p><strong>Estimator:</strong> Baseline-category multinomial logistic regression fitted by Newton-Raphson (IRLS) with the full block Hessian in NumPy, on the penalized log-likelihood with L2 (ridge) regularization on non-intercept terms.</p>'
+          : '<p><strong>Estimator:</strong> Baseline-category multinomial logistic regression fitted via gradient ascent on the penalized log-likelihood with L2 (ridge) regularization on non-intercept terms.</p>';
         iterNote = prefix + coreHtml;
       }
     }
@@ -0,0 +1,282 @@
+"""
+Baseline-category multinomial logistic regression in NumPy (Newton / IRLS).
+
+The same model as MNLogit.fit in mn_log_model.js: classes other than the
+reference get a coefficient vector over the design columns (intercept
+first), the reference class is fixed at zero, and an optional L2 penalty
+l2 * beta^2 applies to every non-intercept coefficient. Instead of
+gradient ascent, each iteration takes a Newton step with the full block
+Hessian
+
+    H[k, l] = X' diag(p_k * (1[k == l] - p_l)) X + 2 * l2 * I    (k, l non-reference)
+
+with step halving when the penalized log-likelihood does not improve, so
+models converge in a handful of iterations. Gradient and Hessian are
+accumulated over row chunks, which bounds memory for very large datasets.
+
+The module only needs NumPy and the standard library, so the regression
+page loads it into Pyodide for large datasets (fit_buffers) and scripts
+import it in CPython:
+
+    python mn_log_model.py scenarios/funnel_stage_data.csv --outcome stage \\
+        --categorical channel frequency_segment age_band
+"""
+
+import argparse
+import csv
+import json
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+CHUNK_ROWS = 200_000
+
+
+def encode_design(columns, predictors):
+    """Treatment-coded design matrix from raw columns.
+
+    columns maps names to sequences; predictors is a list of
+    {"name", "type": "continuous" | "categorical", "levels", "reference"}.
+    Categorical levels default to the sorted distinct values and the
+    reference to the first level; the reference level gets no column.
+    Returns X (intercept first) and the column names.
+    """
+    n = len(next(iter(columns.values()))) if columns else 0
+    blocks, names = [np.ones((n, 1))], ['(Intercept)']
+    for info in predictors:
+        values = np.asarray(columns[info['name']])
+        if info.get('type', 'continuous') == 'continuous':
+            blocks.append(values.astype(float).reshape(-1, 1))
+            names.append(info['name'])
+            continue
+        values = values.astype(str)
+        levels = [str(v) for v in info.get('levels') or np.unique(values)]
+        reference = str(info.get('reference', levels[0]))
+        coded = [level for level in levels if level != reference]
+        position = {level: j for j, level in enumerate(coded)}
+        distinct, inverse = np.unique(values, return_inverse=True)
+        cols = np.array([position.get(v, -1) for v in distinct], dtype=np.int64)[inverse.reshape(-1)]
+        rows = np.flatnonzero(cols >= 0)
+        block = np.zeros((n, len(coded)))
+        block[rows, cols[rows]] = 1.0
+        blocks.append(block)
+        names.extend(f"{info['name']}={level}" for level in coded)
+    return np.hstack(blocks), names
+
+
+def class_probabilities(X, beta):
+    """Row-wise class probabilities for coefficients beta (K x p, reference row zero)."""
+    scores = X @ beta.T
+    scores -= scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def _penalty_mask(p, n_free):
+    mask = np.ones((n_free, p))
+    mask[:, 0] = 0.0
+    return mask
+
+
+def penalized_log_likelihood(X, y, beta, l2=0.0, chunk_rows=CHUNK_ROWS):
+    ll = 0.0
+    for start in range(0, len(y), chunk_rows):
+        probs = class_probabilities(X[start:start + chunk_rows], beta)
+        ll += np.log(np.maximum(probs[np.arange(len(probs)), y[start:start + chunk_rows]], 1e-300)).sum()
+    return ll - l2 * np.sum(beta[:, 1:] ** 2)
+
+
+def gradient_and_hessian(X, y, beta, free, chunk_rows=CHUNK_ROWS):
+    """Gradient ((K-1) x p) and block Hessian of the negative log-likelihood ((K-1)p x (K-1)p)."""
+    n_free, p = len(free), X.shape[1]
+    grad = np.zeros((n_free, p))
+    hessian = np.zeros((n_free * p, n_free * p))
+    for start in range(0, len(y), chunk_rows):
+        Xc = X[start:start + chunk_rows]
+        probs = class_probabilities(Xc, beta)[:, free]
+        indicator = (y[start:start + chunk_rows, None] == np.asarray(free)[None, :]).astype(float)
+        grad += (indicator - probs).T @ Xc
+        for a in range(n_free):
+            for b in range(a, n_free):
+                weights = probs[:, a] * ((a == b) - probs[:, b])
+                block = (Xc * weights[:, None]).T @ Xc
+                hessian[a * p:(a + 1) * p, b * p:(b + 1) * p] += block
+                if a != b:
+                    hessian[b * p:(b + 1) * p, a * p:(a + 1) * p] += block.T
+    return grad, hessian
+
+
+def fit(X, y, n_classes=None, reference_index=0, l2=1e-4, max_iter=50, tol=1e-8, confidence_level=0.95,
+        chunk_rows=CHUNK_ROWS):
+    """Fit by Newton-Raphson; returns a dict shaped like MNLogit.fit's result.
+
+    Converged when the largest Newton step is below tol (or the penalized
+    log-likelihood stops changing relative to its size).
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=np.int64)
+    n, p = X.shape
+    K = int(n_classes or y.max() + 1)
+    free = [k for k in range(K) if k != reference_index]
+    n_free = len(free)
+    penalty = 2 * l2 * _penalty_mask(p, n_free)
+
+    beta = np.zeros((K, p))
+    ll = penalized_log_likelihood(X, y, beta, l2, chunk_rows)
+    ll_changes, converged, iterations, max_change = [], False, 0, None
+
+    for iteration in range(max_iter):
+        grad, hessian = gradient_and_hessian(X, y, beta, free, chunk_rows)
+        grad -= penalty * beta[free]
+        hessian[np.diag_indices_from(hessian)] += penalty.ravel()
+        try:
+            step = np.linalg.solve(hessian, grad.ravel()).reshape(n_free, p)
+        except np.linalg.LinAlgError:
+            step = np.linalg.lstsq(hessian, grad.ravel(), rcond=None)[0].reshape(n_free, p)
+
+        # Step halving keeps the penalized log-likelihood non-decreasing
+        scale = 1.0
+        for _ in range(30):
+            candidate = beta.copy()
+            candidate[free] += scale * step
+            new_ll = penalized_log_likelihood(X, y, candidate, l2, chunk_rows)
+            if new_ll >= ll - 1e-12 * abs(ll):
+                break
+            scale /= 2
+        beta = candidate
+        iterations = iteration + 1
+        max_change = float(np.max(np.abs(scale * step))) if step.size else 0.0
+        ll_changes = (ll_changes + [new_ll - ll])[-5:]
+        previous_ll, ll = ll, new_ll
+        if max_change < tol or abs(ll - previous_ll) <= tol * (abs(ll) + 1):
+            converged = True
+            break
+
+    return _result(X, y, beta, free, K, reference_index, l2, max_iter, tol, confidence_level, chunk_rows,
+                   iterations, converged, max_change, ll, ll_changes)
+
+
+def _result(X, y, beta, free, K, reference_index, l2, max_iter, tol, confidence_level, chunk_rows,
+            iterations, converged, max_change, ll, ll_changes):
+    n_free, p = len(free), X.shape[1]
+    _, hessian = gradient_and_hessian(X, y, beta, free, chunk_rows)
+    hessian[np.diag_indices_from(hessian)] += (2 * l2 * _penalty_mask(p, n_free)).ravel()
+
+    z_score = NormalDist().inv_cdf(1 - (1 - confidence_level) / 2)
+    std_errors = p_values = intervals = covariance = None
+    try:
+        covariance = np.linalg.inv(hessian)
+        variances = np.diag(covariance).reshape(n_free, p)
+        std_errors, p_values = np.zeros((K, p)), np.zeros((K, p))
+        intervals = [[None] * p for _ in range(K)]
+        for a, k in enumerate(free):
+            for j in range(p):
+                if variances[a, j] >= 0:
+                    se = math.sqrt(variances[a, j])
+                    std_errors[k, j] = se
+                    z = beta[k, j] / se if se > 0 else 0.0
+                    p_values[k, j] = 2 * (1 - NormalDist().cdf(abs(z)))
+                    intervals[k][j] = [beta[k, j] - z_score * se, beta[k, j] + z_score * se]
+    except np.linalg.LinAlgError:
+        pass
+
+    return {
+        "coefficients": beta,
+        "referenceIndex": reference_index,
+        "stdErrors": std_errors,
+        "pValues": p_values,
+        "confidenceIntervals": intervals,
+        "covarianceMatrix": covariance,
+        "iterations": iterations,
+        "converged": converged,
+        "maxIter": max_iter,
+        "l2": l2,
+        "tol": tol,
+        "confidenceLevel": confidence_level,
+        "optimizer": 'newton_irls',
+        "lastMaxChange": max_change,
+        "logLikelihood": float(ll + l2 * np.sum(beta[:, 1:] ** 2)),
+        "logLikChanges": ll_changes,
+        "covarianceMethod": 'inverse_observed_fisher' if covariance is not None else None,
+        "nObservations": int(len(y))
+    }
+
+
+def predict(X, coefficients):
+    return class_probabilities(np.asarray(X, dtype=float), np.asarray(coefficients, dtype=float))
+
+
+def to_jsonable(result):
+    """Arrays to nested lists, with non-finite numbers as None (JSON has no NaN)."""
+    def convert(value):
+        if isinstance(value, np.ndarray):
+            return np.where(np.isfinite(value), value, None).tolist()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    return {key: convert(value) for key, value in result.items()}
+
+
+def fit_buffers(x_buffer, y_buffer, n_rows, n_cols, options_json='{}'):
+    """Pyodide entry point: X (row-major float64) and y (int32) as typed-array buffers, result as JSON.
+
+    Options: classLabels, referenceIndex, l2, maxIter, tol, confidenceLevel.
+    """
+    if hasattr(x_buffer, 'to_py'):
+        x_buffer, y_buffer = x_buffer.to_py(), y_buffer.to_py()
+    X = np.frombuffer(x_buffer, dtype=np.float64).reshape(int(n_rows), int(n_cols))
+    y = np.frombuffer(y_buffer, dtype=np.int32).astype(np.int64)
+    options = json.loads(options_json)
+    labels = options.get('classLabels')
+    result = fit(
+        X, y, n_classes=len(labels) if labels else None,
+        reference_index=options.get('referenceIndex', 0), l2=options.get('l2', 1e-4),
+        max_iter=options.get('maxIter', 50), tol=options.get('tol', 1e-8),
+        confidence_level=options.get('confidenceLevel', 0.95)
+    )
+    result['classLabels'] = labels
+    return json.dumps(to_jsonable(result))
+
+
+def read_columns(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        rows = [row for row in reader if row]
+    return {h: [row[i] for row in rows] for i, h in enumerate(headers)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a multinomial logistic regression with Newton/IRLS.")
+    parser.add_argument('csv')
+    parser.add_argument('--outcome', required=True)
+    parser.add_argument('--reference', default=None, help='Reference outcome level (default: first sorted)')
+    parser.add_argument('--categorical', nargs='*', default=[])
+    parser.add_argument('--continuous', nargs='*', default=[])
+    parser.add_argument('--l2', type=float, default=1e-4)
+    parser.add_argument('--max-iter', type=int, default=50)
+    args = parser.parse_args()
+
+    columns = read_columns(args.csv)
+    class_labels = sorted(set(columns[args.outcome]))
+    reference = args.reference or class_labels[0]
+    predictors = ([{"name": name, "type": "categorical"} for name in args.categorical]
+                  + [{"name": name, "type": "continuous"} for name in args.continuous])
+    X, names = encode_design(columns, predictors)
+    y = np.searchsorted(class_labels, columns[args.outcome])
+    result = fit(X, y, len(class_labels), class_labels.index(reference), args.l2, args.max_iter)
+
+    print(f"{result['nObservations']} rows, {len(names)} columns, {result['iterations']} iterations, "
+          f"converged: {result['converged']}, log-likelihood {result['logLikelihood']:.3f}")
+    for k, label in enumerate(class_labels):
+        if k == result['referenceIndex']:
+            continue
+        print(f"{label} vs {reference}:")
+        for j, name in enumerate(names):
+            print(f"  {name:<32} {result['coefficients'][k, j]:>9.4f}  (SE {result['stdErrors'][k, j]:.4f})")
+
+
+if __name__ == '__main__':
+    main()
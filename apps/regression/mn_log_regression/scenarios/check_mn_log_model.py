@@ -0,0 +1,88 @@
+"""
+Check the NumPy multinomial logit engine (mn_log_model.py) against the
+coefficients that generated the scenarios.
+
+Rows are drawn from each scenario spec in rebuild_scenarios.py. By default
+the score noise is switched off, so the data follow exactly the
+multinomial logit of spec_coefficients and every estimate should be
+within a few standard errors of the truth; --keep-noise keeps the
+bundled processes (their normal score noise attenuates the coefficients
+a little).
+
+    python check_mn_log_model.py --rows 200000
+"""
+
+import argparse
+import copy
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from mn_log_model import encode_design, fit
+from rebuild_scenarios import SPECS, compile_scenario, compiled_block, spec_coefficients
+
+MAX_ABS_Z = 4.5
+
+
+def check_scenario(spec, n_rows, seed=0, keep_noise=False, l2=0.0):
+    if not keep_noise:
+        spec = copy.deepcopy(spec)
+        spec["outcome"]["noise_sd"] = 0.0
+    frame = compiled_block(compile_scenario(spec))(np.random.default_rng(seed), 0, n_rows)
+
+    predictors = ([{"name": cov["column"], "type": "categorical", "levels": cov["levels"],
+                    "reference": cov["levels"][0]} for cov in spec.get("covariates", [])]
+                  + [{"name": cont["column"], "type": "continuous"} for cont in spec.get("continuous", [])])
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    X, names = encode_design(columns, predictors)
+    y = frame[spec["outcome"]["column"]].cat.codes.to_numpy()
+
+    start = time.perf_counter()
+    result = fit(X, y, len(spec["outcome"]["levels"]), reference_index=0, l2=l2)
+    seconds = time.perf_counter() - start
+
+    truth = spec_coefficients(spec)
+    free = slice(1, None)
+    z = (result["coefficients"][free] - truth[free]) / result["stdErrors"][free]
+    return {
+        "names": names,
+        "seconds": seconds,
+        "iterations": result["iterations"],
+        "converged": result["converged"],
+        "max_abs_error": float(np.max(np.abs(result["coefficients"] - truth))),
+        "max_abs_z": float(np.max(np.abs(z))),
+        "estimate": result["coefficients"],
+        "truth": truth
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recover the scenario coefficients with mn_log_model.fit.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SPECS), default=list(SPECS))
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-noise", action="store_true", help="Keep the score noise of the bundled processes")
+    parser.add_argument("--verbose", action="store_true", help="Print every coefficient")
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.scenarios:
+        check = check_scenario(SPECS[name], args.rows, args.seed, args.keep_noise)
+        ok = check["converged"] and (args.keep_noise or check["max_abs_z"] < MAX_ABS_Z)
+        failed |= not ok
+        print(f"{'✓' if ok else '✗'} {name}: {args.rows:,} rows, {check['iterations']} iterations in "
+              f"{check['seconds']:.2f}s, max |error| {check['max_abs_error']:.4f}, max |z| {check['max_abs_z']:.2f}")
+        if args.verbose:
+            labels = SPECS[name]["outcome"]["levels"]
+            for k in range(1, len(labels)):
+                print(f"  {labels[k]} vs {labels[0]}:")
+                for j, column in enumerate(check["names"]):
+                    print(f"    {column:<32} {check['estimate'][k, j]:>9.4f}  truth {check['truth'][k, j]:>9.4f}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,38 @@
+"""Rebuild the multinomial logistic regression scenario CSVs.
+
+    python rebuild_scenarios.py                      # the bundled files
+    python rebuild_scenarios.py --vectorized --rows 10000000 --output-dir /tmp/stress
+    python rebuild_scenarios.py --spec my_scenario.json --rows 1000000 --output my_scenario.csv
+
+Every scenario is a spec (FUNNEL_SPEC etc.): a plain JSON-compatible dict
+of covariate distributions and per-level effect vectors. compile_scenario
+turns a spec into a one-hot design layout and an effect matrix, and both
+draw paths read those tables, so there is one definition of each process.
+A new scenario is a new spec; --spec builds one from a JSON file.
+
+By default rows are drawn one at a time with the random module (the
+original generator's approach; the bundled CSVs were made by earlier
+hand-written versions of these processes, and reruns do not match them
+row for row). With vectorized=True (--vectorized) rows are drawn with
+NumPy a block at a time: covariates by inverse CDF (cumulative sums +
+searchsorted), outcomes by the Gumbel-max trick, so stress datasets of
+millions of rows take seconds.
+Vectorized output has the same distribution but not the same rows as the
+scalar path; it is reproducible for a given seed and block_size.
+"""
+
+import argparse
 import csv
+import json
 import math
+import os
 import random
+import time
+
+import numpy as np
+import pandas as pd
+
+VECTOR_BLOCK_SIZE = 1_000_000
 
 
 def softmax(scores):
@@ -20,329 +52,380 @@ def sample_category(probs):
     return len(probs) - 1
 
 
-def build_funnel_scenario_csv(path, n_rows=1500, seed=123):
-    random.seed(seed)
+def sample_levels(rng, probs, n):
+    """Draw n level codes with the given probabilities (inverse CDF, one searchsorted call)."""
+    cdf = np.cumsum(probs)
+    codes = np.searchsorted(cdf, rng.random(n) * cdf[-1], side="right")
+    return np.minimum(codes, len(probs) - 1)
 
-    stages = ["Awareness", "Consideration", "Purchase"]
-    channels = ["Email", "Social", "Search"]
-    freqs = ["Low", "Medium", "High"]
-    ages = ["18-24", "25-34", "35-44", "45-54", "55+"]
 
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["customer_id", "stage", "channel", "frequency_segment", "age_band"])
-
-        for i in range(n_rows):
-            customer_id = f"C{(i + 1):04d}"
-
-            r = random.random()
-            if r < 0.45:
-                channel = "Email"
-            elif r < 0.8:
-                channel = "Social"
-            else:
-                channel = "Search"
-
-            r = random.random()
-            if r < 0.55:
-                frequency_segment = "Low"
-            elif r < 0.85:
-                frequency_segment = "Medium"
-            else:
-                frequency_segment = "High"
-
-            r = random.random()
-            if r < 0.15:
-                age_band = "18-24"
-            elif r < 0.40:
-                age_band = "25-34"
-            elif r < 0.65:
-                age_band = "35-44"
-            elif r < 0.88:
-                age_band = "45-54"
-            else:
-                age_band = "55+"
-
-            # Baseline scores with very small systematic differences + higher noise
-            score_aw = 0.1 + random.gauss(0, 0.3)
-            score_cons = 0 + random.gauss(0, 0.3)
-            score_pur = -0.1 + random.gauss(0, 0.3)
-
-            if channel == "Social":
-                score_aw += 0.1
-                score_cons += 0.05
-            elif channel == "Search":
-                score_cons += 0.1
-                score_pur += 0.08
-            elif channel == "Email":
-                score_cons += 0.05
-                score_pur += 0.05
-
-            if frequency_segment == "Low":
-                score_aw += 0.05
-            elif frequency_segment == "Medium":
-                score_cons += 0.05
-            elif frequency_segment == "High":
-                score_cons += 0.1
-                score_pur += 0.12
-
-            if age_band in ("25-34", "35-44"):
-                score_cons += 0.05
-                score_pur += 0.05
-            elif age_band == "55+":
-                score_aw += 0.05
-
-            probs = softmax([score_aw, score_cons, score_pur])
-            stage_idx = sample_category(probs)
-            stage = stages[stage_idx]
-
-            writer.writerow([customer_id, stage, channel, frequency_segment, age_band])
-
-
-def build_brand_choice_scenario_csv(path, n_rows=1500, seed=456):
-    random.seed(seed)
+def sample_categories(rng, scores):
+    """Draw one category per row of scores with probabilities softmax(row) (Gumbel-max trick)."""
+    return np.argmax(scores + rng.gumbel(size=scores.shape), axis=1)
 
-    brands = ["Brand A", "Brand B", "Brand C", "Brand D"]
-    price_levels = ["Low", "Medium", "High"]
-    age_bands = ["18-24", "25-34", "35-44", "45-54", "55+"]
-    channels = ["Email", "Search", "Social"]
 
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["respondent_id", "brand_choice", "price_sensitivity", "age_band", "channel"])
-
-        for i in range(n_rows):
-            respondent_id = f"R{(i + 1):04d}"
-
-            r = random.random()
-            if r < 0.25:
-                price_sensitivity = "Low"
-            elif r < 0.65:
-                price_sensitivity = "Medium"
-            else:
-                price_sensitivity = "High"
-
-            r = random.random()
-            if r < 0.20:
-                age_band = "18-24"
-            elif r < 0.45:
-                age_band = "25-34"
-            elif r < 0.70:
-                age_band = "35-44"
-            elif r < 0.9:
-                age_band = "45-54"
-            else:
-                age_band = "55+"
-
-            r = random.random()
-            if r < 0.5:
-                channel = "Search"
-            elif r < 0.8:
-                channel = "Email"
-            else:
-                channel = "Social"
-
-            # Baseline scores with very small differences + higher noise
-            s_a = 0.1 + random.gauss(0, 0.35)
-            s_b = 0.05 + random.gauss(0, 0.35)
-            s_c = -0.05 + random.gauss(0, 0.35)
-            s_d = -0.1 + random.gauss(0, 0.35)
-
-            if price_sensitivity == "Low":
-                s_c += 0.1
-            elif price_sensitivity == "Medium":
-                s_a += 0.08
-                s_b += 0.08
-            elif price_sensitivity == "High":
-                s_a += 0.12
-                s_b += 0.08
-
-            if age_band == "18-24":
-                s_c += 0.08
-            elif age_band == "25-34":
-                s_a += 0.08
-                s_c += 0.05
-            elif age_band in ("45-54", "55+"):
-                s_b += 0.08
-                s_d += 0.1
-
-            if channel == "Search":
-                s_a += 0.05
-                s_b += 0.05
-            elif channel == "Email":
-                s_b += 0.05
-                s_d += 0.05
-            elif channel == "Social":
-                s_c += 0.05
-
-            probs = softmax([s_a, s_b, s_c, s_d])
-            brand_idx = sample_category(probs)
-            brand_choice = brands[brand_idx]
-
-            writer.writerow([respondent_id, brand_choice, price_sensitivity, age_band, channel])
-
-
-def build_esports_scenario_csv(path, n_rows=1000, seed=789):
-    random.seed(seed)
+def row_ids(prefix, start, n):
+    """Ids formatted like f"{prefix}{i:04d}" for rows start + 1 .. start + n."""
+    return prefix + pd.Series(np.arange(start + 1, start + n + 1)).astype(str).str.zfill(4)
 
-    segments = ["Casual", "Core", "Competitive"]
-    regions = ["NA", "EU", "APAC"]
-    platforms = ["PC", "Console", "Mobile"]
-    memberships = ["Free", "Standard", "Premium"]
 
+def labels(levels, codes):
+    return pd.Categorical.from_codes(codes, levels)
+
+
+def write_scenario_blocks(path, header, make_block, n_rows, seed, block_size=VECTOR_BLOCK_SIZE):
+    """Write a scenario CSV block by block; make_block(rng, start, n) returns the block as a DataFrame."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(header)
+        for start in range(0, n_rows, block_size):
+            n = min(block_size, n_rows - start)
+            frame = make_block(rng, start, n)
+            frame.to_csv(f, header=False, index=False, lineterminator="\r\n")
+
+
+# Data-generating processes as data. Each spec lists the outcome (levels,
+# intercepts, score noise), categorical covariates (level probabilities and
+# an effect vector per level, one entry per outcome level; omitted levels
+# have no effect) and continuous covariates (normal draw, level shifts,
+# clipping, and a slope per outcome level on the centered value).
+FUNNEL_SPEC = {
+    "id": {"column": "customer_id", "prefix": "C"},
+    "outcome": {"column": "stage", "levels": ["Awareness", "Consideration", "Purchase"],
+                "intercepts": [0.1, 0.0, -0.1], "noise_sd": 0.3},
+    "covariates": [
+        {"column": "channel", "levels": ["Email", "Social", "Search"], "probs": [0.45, 0.35, 0.20],
+         "effects": {"Email": [0.0, 0.05, 0.05], "Social": [0.1, 0.05, 0.0], "Search": [0.0, 0.1, 0.08]}},
+        {"column": "frequency_segment", "levels": ["Low", "Medium", "High"], "probs": [0.55, 0.30, 0.15],
+         "effects": {"Low": [0.05, 0.0, 0.0], "Medium": [0.0, 0.05, 0.0], "High": [0.0, 0.1, 0.12]}},
+        {"column": "age_band", "levels": ["18-24", "25-34", "35-44", "45-54", "55+"],
+         "probs": [0.15, 0.25, 0.25, 0.23, 0.12],
+         "effects": {"25-34": [0.0, 0.05, 0.05], "35-44": [0.0, 0.05, 0.05], "55+": [0.05, 0.0, 0.0]}}
+    ]
+}
+
+BRAND_CHOICE_SPEC = {
+    "id": {"column": "respondent_id", "prefix": "R"},
+    "outcome": {"column": "brand_choice", "levels": ["Brand A", "Brand B", "Brand C", "Brand D"],
+                "intercepts": [0.1, 0.05, -0.05, -0.1], "noise_sd": 0.35},
+    "covariates": [
+        {"column": "price_sensitivity", "levels": ["Low", "Medium", "High"], "probs": [0.25, 0.40, 0.35],
+         "effects": {"Low": [0.0, 0.0, 0.1, 0.0], "Medium": [0.08, 0.08, 0.0, 0.0],
+                     "High": [0.12, 0.08, 0.0, 0.0]}},
+        {"column": "age_band", "levels": ["18-24", "25-34", "35-44", "45-54", "55+"],
+         "probs": [0.20, 0.25, 0.25, 0.20, 0.10],
+         "effects": {"18-24": [0.0, 0.0, 0.08, 0.0], "25-34": [0.08, 0.0, 0.05, 0.0],
+                     "45-54": [0.0, 0.08, 0.0, 0.1], "55+": [0.0, 0.08, 0.0, 0.1]}},
+        {"column": "channel", "levels": ["Email", "Search", "Social"], "probs": [0.30, 0.50, 0.20],
+         "effects": {"Email": [0.0, 0.05, 0.0, 0.05], "Search": [0.05, 0.05, 0.0, 0.0],
+                     "Social": [0.0, 0.0, 0.05, 0.0]}}
+    ]
+}
+
+ESPORTS_SPEC = {
+    "id": {"column": "player_id", "prefix": "P"},
+    "outcome": {"column": "engagement_segment", "levels": ["Casual", "Core", "Competitive"],
+                "intercepts": [0.2, 0.1, -0.1], "noise_sd": 0.2},
+    "covariates": [
+        {"column": "region", "levels": ["NA", "EU", "APAC"], "probs": [0.5, 0.3, 0.2],
+         "effects": {"APAC": [0.0, 0.0, 0.3]}},
+        {"column": "platform", "levels": ["PC", "Console", "Mobile"], "probs": [0.6, 0.25, 0.15],
+         "effects": {"Console": [0.0, 0.25, 0.15], "Mobile": [0.3, -0.1, -0.2]}},
+        {"column": "membership_tier", "levels": ["Free", "Standard", "Premium"], "probs": [0.4, 0.4, 0.2],
+         "effects": {"Standard": [0.0, 0.35, 0.0], "Premium": [0.0, 0.25, 0.7]}}
+    ],
+    "continuous": [
+        {"column": "hours_per_week", "mean": 15.0, "sd": 4.0, "min": 1.0, "decimals": 1,
+         "shifts": {"membership_tier": {"Standard": 3.0, "Premium": 6.0}, "platform": {"Mobile": -3.0},
+                    "region": {"APAC": 4.0}},
+         "center": 12.0, "slopes": [0.0, 0.03, 0.05]},
+        {"column": "matches_per_week", "mean": 30.0, "sd": 8.0, "min": 3.0, "decimals": 1,
+         "shifts": {"membership_tier": {"Standard": 5.0, "Premium": 10.0}, "platform": {"Mobile": -8.0},
+                    "region": {"APAC": 6.0}},
+         "center": 20.0, "slopes": [0.0, 0.02, 0.035]},
+        {"column": "in_game_spend", "mean": 20.0, "sd": 15.0, "draw_min": 0.0, "min": 0.0, "decimals": 2,
+         "shifts": {"membership_tier": {"Standard": 10.0, "Premium": 40.0}, "platform": {"Mobile": -5.0}},
+         "center": 20.0, "slopes": [0.0, 0.0008, 0.0015]}
+    ]
+}
+
+SINGLE_CONTINUOUS_SPEC = {
+    "id": {"column": "id", "prefix": "S"},
+    "outcome": {"column": "segment", "levels": ["Low", "Medium", "High"],
+                "intercepts": [0.0, -0.3, -1.0], "noise_sd": 0.0},
+    "covariates": [],
+    "continuous": [
+        {"column": "score", "mean": 0.0, "sd": 1.0, "decimals": 3, "center": 0.0, "slopes": [0.0, 1.2, 2.0]}
+    ]
+}
+
+
+def compile_scenario(spec):
+    """Turn a scenario spec into the arrays simulate_compiled works with.
+
+    The design has one column for the intercept, one per categorical level
+    (one-hot) and one per centered continuous covariate; effects holds the
+    matching rows of per-outcome coefficients, so scores are design @ effects.
+    Continuous covariates get their level shifts the same way, from the
+    intercept and one-hot columns times shifts.
+    """
+    outcome = spec["outcome"]
+    k = len(outcome["levels"])
+    covariates = spec.get("covariates", [])
+    continuous = spec.get("continuous", [])
+
+    offsets, rows, probs = [], [np.asarray(outcome["intercepts"], dtype=float)], []
+    column = 1
+    for cov in covariates:
+        levels = cov["levels"]
+        if len(cov["probs"]) != len(levels):
+            raise ValueError(f"{cov['column']}: {len(levels)} levels but {len(cov['probs'])} probabilities")
+        unknown = set(cov.get("effects", {})) - set(levels)
+        if unknown:
+            raise ValueError(f"{cov['column']}: effects for unknown levels {sorted(unknown)}")
+        offsets.append(column)
+        probs.append(np.asarray(cov["probs"], dtype=float))
+        for level in levels:
+            rows.append(np.asarray(cov.get("effects", {}).get(level, [0.0] * k), dtype=float))
+        column += len(levels)
+    n_categorical = column
+
+    shifts = np.zeros((n_categorical, len(continuous)))
+    names = [cov["column"] for cov in covariates]
+    for j, cont in enumerate(continuous):
+        for name, level_shifts in cont.get("shifts", {}).items():
+            cov = covariates[names.index(name)]
+            for level, shift in level_shifts.items():
+                shifts[offsets[names.index(name)] + cov["levels"].index(level), j] = shift
+        rows.append(np.asarray(cont["slopes"], dtype=float))
+
+    effects = np.vstack(rows)
+    if effects.shape[1] != k:
+        raise ValueError(f"Every effect vector needs {k} entries, one per outcome level")
+
+    def continuous_array(key, default):
+        return np.array([cont.get(key, default) for cont in continuous], dtype=float)
+
+    return {
+        "spec": spec,
+        "k": k,
+        "offsets": np.array(offsets, dtype=np.int64),
+        "probs": probs,
+        "n_categorical": n_categorical,
+        "effects": effects,
+        "shifts": shifts,
+        "means": continuous_array("mean", 0.0),
+        "sds": continuous_array("sd", 1.0),
+        "draw_mins": continuous_array("draw_min", -np.inf),
+        "mins": continuous_array("min", -np.inf),
+        "centers": continuous_array("center", 0.0)
+    }
+
+
+def simulate_compiled(compiled, rng, n):
+    """Draw n rows: categorical level codes, continuous values and outcome codes."""
+    codes = np.zeros((n, len(compiled["probs"])), dtype=np.int64)
+    for j, probs in enumerate(compiled["probs"]):
+        codes[:, j] = sample_levels(rng, probs, n)
+
+    design = np.zeros((n, compiled["effects"].shape[0]))
+    design[:, 0] = 1.0
+    for j, offset in enumerate(compiled["offsets"]):
+        design[np.arange(n), offset + codes[:, j]] = 1.0
+
+    values = np.zeros((n, 0))
+    if len(compiled["means"]):
+        values = rng.normal(compiled["means"], compiled["sds"], (n, len(compiled["means"])))
+        values = np.maximum(values, compiled["draw_mins"])
+        values += design[:, :compiled["n_categorical"]] @ compiled["shifts"]
+        values = np.maximum(values, compiled["mins"])
+        design[:, compiled["n_categorical"]:] = values - compiled["centers"]
+
+    scores = design @ compiled["effects"]
+    noise_sd = compiled["spec"]["outcome"].get("noise_sd", 0.0)
+    if noise_sd:
+        scores += rng.normal(0, noise_sd, scores.shape)
+    return codes, values, sample_categories(rng, scores)
+
+
+def compiled_block(compiled):
+    """make_block for write_scenario_blocks that draws rows from a compiled spec."""
+    spec = compiled["spec"]
+
+    def make_block(rng, start, n):
+        codes, values, outcome = simulate_compiled(compiled, rng, n)
+        columns = {
+            spec["id"]["column"]: row_ids(spec["id"]["prefix"], start, n),
+            spec["outcome"]["column"]: labels(spec["outcome"]["levels"], outcome)
+        }
+        for j, cov in enumerate(spec.get("covariates", [])):
+            columns[cov["column"]] = labels(cov["levels"], codes[:, j])
+        for j, cont in enumerate(spec.get("continuous", [])):
+            columns[cont["column"]] = np.round(values[:, j], cont.get("decimals", 3))
+        return pd.DataFrame(columns)
+
+    return make_block
+
+
+def spec_header(spec):
+    return ([spec["id"]["column"], spec["outcome"]["column"]]
+            + [cov["column"] for cov in spec.get("covariates", [])]
+            + [cont["column"] for cont in spec.get("continuous", [])])
+
+
+def scalar_rows(compiled, n_rows):
+    """Draw n_rows one at a time with the random module (seed it first) from a compiled spec.
+
+    The same process as simulate_compiled, row by row: yields the level
+    codes, continuous values and outcome code of each row.
+    """
+    spec = compiled["spec"]
+    k = compiled["k"]
+    noise_sd = spec["outcome"].get("noise_sd", 0.0)
+    effects = compiled["effects"].tolist()
+    shifts = compiled["shifts"].tolist()
+    offsets = compiled["offsets"].tolist()
+    probs = [(p / p.sum()).tolist() for p in compiled["probs"]]
+    n_categorical = compiled["n_categorical"]
+    continuous = list(zip(compiled["means"].tolist(), compiled["sds"].tolist(), compiled["draw_mins"].tolist(),
+                          compiled["mins"].tolist(), compiled["centers"].tolist()))
+
+    for _ in range(n_rows):
+        codes = [sample_category(p) for p in probs]
+        # Active design columns: the intercept and one per categorical covariate
+        active = [0] + [offset + code for offset, code in zip(offsets, codes)]
+
+        values = []
+        for j, (mean, sd, draw_min, minimum, _) in enumerate(continuous):
+            value = max(random.gauss(mean, sd), draw_min)
+            value += sum(shifts[a][j] for a in active)
+            values.append(max(value, minimum))
+
+        scores = []
+        for c in range(k):
+            score = sum(effects[a][c] for a in active)
+            score += sum(effects[n_categorical + j][c] * (value - cont[4])
+                         for j, (value, cont) in enumerate(zip(values, continuous)))
+            if noise_sd:
+                score += random.gauss(0, noise_sd)
+            scores.append(score)
+        yield codes, values, sample_category(softmax(scores))
+
+
+def write_scenario_rows(path, compiled, n_rows, seed):
+    """Write a scenario CSV drawn row by row with the random module."""
+    spec = compiled["spec"]
+    covariates = spec.get("covariates", [])
+    continuous = spec.get("continuous", [])
+    random.seed(seed)
     with open(path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(
-            [
-                "player_id",
-                "engagement_segment",
-                "region",
-                "platform",
-                "membership_tier",
-                "hours_per_week",
-                "matches_per_week",
-                "in_game_spend",
-            ]
-        )
-
-        for i in range(n_rows):
-            player_id = f"P{(i + 1):04d}"
-
-            r = random.random()
-            if r < 0.5:
-                region = "NA"
-            elif r < 0.8:
-                region = "EU"
-            else:
-                region = "APAC"
-
-            r = random.random()
-            if r < 0.6:
-                platform = "PC"
-            elif r < 0.85:
-                platform = "Console"
-            else:
-                platform = "Mobile"
-
-            r = random.random()
-            if r < 0.4:
-                membership = "Free"
-            elif r < 0.8:
-                membership = "Standard"
-            else:
-                membership = "Premium"
-
-            # Generate continuous predictors with moderate noise
-            base_hours = random.gauss(15, 4)
-            base_matches = random.gauss(30, 8)
-            base_spend = max(0.0, random.gauss(20, 15))
-
-            if membership == "Premium":
-                base_hours += 6
-                base_matches += 10
-                base_spend += 40
-            elif membership == "Standard":
-                base_hours += 3
-                base_matches += 5
-                base_spend += 10
-
-            if platform == "Mobile":
-                base_hours -= 3
-                base_matches -= 8
-                base_spend -= 5
-
-            if region == "APAC":
-                base_hours += 4
-                base_matches += 6
-
-            hours = max(1.0, base_hours)
-            matches = max(3.0, base_matches)
-            spend = max(0.0, base_spend)
-
-            # Baseline scores with lower noise so predictors show clearer effects
-            score_casual = 0.2 + random.gauss(0, 0.2)
-            score_core = 0.1 + random.gauss(0, 0.2)
-            score_comp = -0.1 + random.gauss(0, 0.2)
-
-            # Stronger effects of continuous engagement metrics
-            score_core += 0.03 * (hours - 12) + 0.02 * (matches - 20) + 0.0008 * (spend - 20)
-            score_comp += 0.05 * (hours - 12) + 0.035 * (matches - 20) + 0.0015 * (spend - 20)
-
-            # Make membership tier a strong driver of Core/Competitive vs Casual
-            if membership == "Premium":
-                score_comp += 0.7
-                score_core += 0.25
-            elif membership == "Standard":
-                score_core += 0.35
-
-            # Platform tilt: PC/Console more engaged than Mobile
-            if platform == "Console":
-                score_core += 0.25
-                score_comp += 0.15
-            elif platform == "Mobile":
-                score_casual += 0.3
-                score_core -= 0.1
-                score_comp -= 0.2
-
-            # Region: APAC slightly more Competitive
-            if region == "APAC":
-                score_comp += 0.3
-
-            probs = softmax([score_casual, score_core, score_comp])
-            seg_idx = sample_category(probs)
-            engagement_segment = segments[seg_idx]
-
+        writer.writerow(spec_header(spec))
+        for i, (codes, values, outcome) in enumerate(scalar_rows(compiled, n_rows)):
             writer.writerow(
-                [
-                    player_id,
-                    engagement_segment,
-                    region,
-                    platform,
-                    membership,
-                    round(hours, 1),
-                    round(matches, 1),
-                    round(spend, 2),
-                ]
+                [f"{spec['id']['prefix']}{i + 1:04d}", spec["outcome"]["levels"][outcome]]
+                + [cov["levels"][code] for cov, code in zip(covariates, codes)]
+                + [round(value, cont.get("decimals", 3)) for cont, value in zip(continuous, values)]
             )
 
 
-def build_single_continuous_scenario_csv(path, n_rows=800, seed=321):
-    """Idealized scenario: one continuous predictor with clearly separated linear effects.
+def build_scenario_csv(path, spec, n_rows, seed, block_size=VECTOR_BLOCK_SIZE, vectorized=True):
+    """Write n_rows drawn from a scenario spec, block by block with NumPy or row by row."""
+    compiled = compile_scenario(spec)
+    if vectorized:
+        write_scenario_blocks(path, spec_header(spec), compiled_block(compiled), n_rows, seed, block_size)
+    else:
+        write_scenario_rows(path, compiled, n_rows, seed)
 
-    Outcome: segment with three levels: Low / Medium / High.
-    Predictor: score (roughly standard normal).
+
+def spec_coefficients(spec, reference_index=0):
+    """Generating coefficients in baseline-category form (K x p, reference outcome row zero).
+
+    Columns follow a treatment-coded design: intercept, every categorical
+    level except the covariate's first, then the raw (uncentered)
+    continuous values. With noise_sd = 0 the process is exactly this
+    multinomial logit; score noise attenuates the coefficients slightly.
     """
-    random.seed(seed)
+    compiled = compile_scenario(spec)
+    effects = compiled["effects"] - compiled["effects"][:, [reference_index]]
+    n_categorical = compiled["n_categorical"]
+    slopes = effects[n_categorical:]
 
-    segments = ["Low", "Medium", "High"]
+    intercept = effects[0] + sum(effects[offset] for offset in compiled["offsets"]) - compiled["centers"] @ slopes
+    columns = [intercept]
+    for offset, probs in zip(compiled["offsets"], compiled["probs"]):
+        columns.extend(effects[offset + j] - effects[offset] for j in range(1, len(probs)))
+    columns.extend(slopes)
+    return np.array(columns).T
 
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["id", "segment", "score"])
 
-        for i in range(n_rows):
-            pid = f"S{i + 1:04d}"
-            # Single continuous predictor with modest noise
-            score = random.gauss(0, 1)
+def build_funnel_scenario_csv(path, n_rows=1500, seed=123, vectorized=False, block_size=VECTOR_BLOCK_SIZE):
+    build_scenario_csv(path, FUNNEL_SPEC, n_rows, seed, block_size, vectorized)
+
+
+def build_brand_choice_scenario_csv(path, n_rows=1500, seed=456, vectorized=False, block_size=VECTOR_BLOCK_SIZE):
+    build_scenario_csv(path, BRAND_CHOICE_SPEC, n_rows, seed, block_size, vectorized)
+
+
+def build_esports_scenario_csv(path, n_rows=1000, seed=789, vectorized=False, block_size=VECTOR_BLOCK_SIZE):
+    build_scenario_csv(path, ESPORTS_SPEC, n_rows, seed, block_size, vectorized)
+
+
+def build_single_continuous_scenario_csv(path, n_rows=800, seed=321, vectorized=False,
+                                         block_size=VECTOR_BLOCK_SIZE):
+    """Idealized scenario: one continuous predictor with clearly separated linear effects.
+
+    Outcome: segment with three levels: Low / Medium / High.
+    Predictor: score (roughly standard normal).
+    """
+    build_scenario_csv(path, SINGLE_CONTINUOUS_SPEC, n_rows, seed, block_size, vectorized)
 
-            # Clean, strong linear structure on the logit scale
-            # Low is baseline (0); Medium and High are linear in score.
-            s_low = 0.0
-            s_med = -0.3 + 1.2 * score
-            s_high = -1.0 + 2.0 * score
 
-            probs = softmax([s_low, s_med, s_high])
-            seg_idx = sample_category(probs)
-            segment = segments[seg_idx]
+SPECS = {
+    "funnel": FUNNEL_SPEC,
+    "brand_choice": BRAND_CHOICE_SPEC,
+    "esports": ESPORTS_SPEC,
+    "single_continuous": SINGLE_CONTINUOUS_SPEC,
+}
 
-            writer.writerow([pid, segment, round(score, 3)])
+SCENARIOS = {
+    "funnel": (build_funnel_scenario_csv, "funnel_stage_data.csv", 1500),
+    "brand_choice": (build_brand_choice_scenario_csv, "brand_choice_data.csv", 1500),
+    "esports": (build_esports_scenario_csv, "esports_engagement_data.csv", 1000),
+    "single_continuous": (build_single_continuous_scenario_csv, "single_continuous_data.csv", 800),
+}
 
 
 def main():
-    build_funnel_scenario_csv("funnel_stage_data.csv", n_rows=1500)
-    build_brand_choice_scenario_csv("brand_choice_data.csv", n_rows=1500)
-    build_esports_scenario_csv("esports_engagement_data.csv", n_rows=1000)
-    build_single_continuous_scenario_csv("single_continuous_data.csv", n_rows=800)
+    parser = argparse.ArgumentParser(description="Rebuild the multinomial logistic regression scenario CSVs.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--rows", type=int, default=None, help="Rows per scenario (default: the bundled sizes)")
+    parser.add_argument("--vectorized", action="store_true", help="Draw with NumPy in blocks (stress datasets)")
+    parser.add_argument("--block-size", type=int, default=VECTOR_BLOCK_SIZE)
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--spec", default=None, help="Build one scenario from a JSON spec instead (vectorized)")
+    parser.add_argument("--output", default=None, help="Output CSV for --spec")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --spec")
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec, encoding="utf-8") as f:
+            spec = json.load(f)
+        path = args.output or os.path.splitext(args.spec)[0] + ".csv"
+        n_rows = args.rows or 1000
+        start = time.perf_counter()
+        build_scenario_csv(path, spec, n_rows, args.seed, args.block_size)
+        print(f"{path}: {n_rows:,} rows in {time.perf_counter() - start:.2f}s")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name in args.scenarios:
+        build, filename, default_rows = SCENARIOS[name]
+        path = os.path.join(args.output_dir, filename)
+        n_rows = args.rows or default_rows
+        start = time.perf_counter()
+        build(path, n_rows=n_rows, vectorized=args.vectorized, block_size=args.block_size)
+        print(f"{path}: {n_rows:,} rows in {time.perf_counter() - start:.2f}s")
 
 
 if __name__ == "__main__":